@@ -0,0 +1,120 @@
+"""Benchmark ingest data device: HTTP POST /recive vs WebSocket /ws/device/{did}.
+
+Server uvicorn dijalankan sebagai proses baru, lalu satu device mengirim
+--messages data berturut-turut dengan tiga cara:
+- http       : satu POST /recive per data, koneksi baru setiap kali (seperti IOT.cpp)
+- ws_ack     : satu koneksi WebSocket, setiap data ditunggu ack-nya
+- ws_stream  : satu koneksi WebSocket, data dikirim terus dan hanya data
+               terakhir yang ditunggu ack-nya
+
+Hasil: pesan per detik per koneksi dan latensi p50 (http dan ws_ack).
+
+Jalankan dari root project:
+    python benchmarks/device_ingest.py
+    python benchmarks/device_ingest.py --messages 5000 --json ingest.json
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import websockets
+
+from startup import ROOT, free_port, request
+
+DEVICE = "IOT_BENCH"
+
+
+def bench_http(base: str, messages: int) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for n in range(messages):
+        t = time.perf_counter()
+        request(base + "/recive", {"did": DEVICE, "tb": 80.0 + n % 10, "bb": 10.0})
+        latencies.append((time.perf_counter() - t) * 1000)
+    elapsed = time.perf_counter() - started
+    return {"messages_per_second": round(messages / elapsed), "p50_ms": round(statistics.median(latencies), 3)}
+
+
+async def bench_ws_ack(url: str, messages: int) -> dict:
+    latencies = []
+    async with websockets.connect(url) as ws:
+        started = time.perf_counter()
+        for n in range(messages):
+            t = time.perf_counter()
+            await ws.send(json.dumps({"tb": 80.0 + n % 10, "bb": 10.0, "id": n}))
+            while json.loads(await ws.recv()).get("ack") != n:
+                pass
+            latencies.append((time.perf_counter() - t) * 1000)
+        elapsed = time.perf_counter() - started
+    return {"messages_per_second": round(messages / elapsed), "p50_ms": round(statistics.median(latencies), 3)}
+
+
+async def bench_ws_stream(url: str, messages: int) -> dict:
+    async with websockets.connect(url) as ws:
+        started = time.perf_counter()
+        for n in range(messages - 1):
+            await ws.send(json.dumps({"tb": 80.0 + n % 10, "bb": 10.0}))
+        await ws.send(json.dumps({"tb": 80.0, "bb": 10.0, "id": "last"}))
+        while json.loads(await ws.recv()).get("ack") != "last":
+            pass
+        elapsed = time.perf_counter() - started
+    return {"messages_per_second": round(messages / elapsed)}
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark ingest HTTP vs WebSocket device")
+    p.add_argument("--messages", type=int, default=2000)
+    p.add_argument("--json", help="Simpan hasil ke file JSON")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    url = f"ws://127.0.0.1:{port}/ws/device/{DEVICE}"
+    env = dict(os.environ, PREDICT_WARMUP="0")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        started = time.perf_counter()
+        while True:
+            try:
+                urllib.request.urlopen(base + "/health", timeout=1).read()
+                break
+            except OSError:
+                if proc.poll() is not None or time.perf_counter() - started > 60:
+                    raise RuntimeError("server did not start")
+                time.sleep(0.05)
+        result = {
+            "messages": args.messages,
+            "http": bench_http(base, args.messages),
+            "ws_ack": asyncio.run(bench_ws_ack(url, args.messages)),
+            "ws_stream": asyncio.run(bench_ws_stream(url, args.messages))
+        }
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+    print(json.dumps(result, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Benchmark DeviceStore: latensi lookup device dan throughput tulis per backend.
+
+Untuk setiap backend (memory, sqlite) store diisi --devices device, lalu diukur:
+- get      : latensi get() device acak yang sudah di-flush ke database (p50/p99/max, mikrodetik)
+- get_hot  : latensi get() device yang baru ditulis (belum di-flush)
+- write    : set() per detik (update /recive), termasuk flush ke SQLite
+- all      : waktu all() untuk semua device (endpoint /devices)
+
+Jalankan dari root project:
+    python benchmarks/device_store.py
+    python benchmarks/device_store.py --devices 10000 --reads 50000 --json store.json
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.main.device_store import DeviceStore, SQLiteDeviceStore
+
+
+def percentiles(samples: list) -> dict:
+    samples = sorted(samples)
+    return {
+        "p50_us": round(samples[len(samples) // 2] * 1e6, 2),
+        "p99_us": round(samples[int(len(samples) * 0.99) - 1] * 1e6, 2),
+        "max_us": round(samples[-1] * 1e6, 2)
+    }
+
+
+def record(n: int) -> dict:
+    return {"tb": 80.0 + n % 20, "bb": 10.0 + n % 5, "status": "updated", "last_updated": time.time(), "triggered": False}
+
+
+async def measure(store: DeviceStore, devices: int, reads: int) -> dict:
+    await store.start()
+    try:
+        dids = [f"IOT_{n:06d}" for n in range(devices)]
+        started = time.perf_counter()
+        for n, did in enumerate(dids):
+            await store.set(did, record(n))
+        if isinstance(store, SQLiteDeviceStore):
+            await store.flush()
+        write_rate = devices / (time.perf_counter() - started)
+
+        samples = []
+        for did in random.choices(dids, k=reads):
+            t = time.perf_counter()
+            await store.get(did)
+            samples.append(time.perf_counter() - t)
+
+        hot = []
+        for n, did in enumerate(random.choices(dids, k=min(reads, 1000))):
+            await store.set(did, record(n))
+            t = time.perf_counter()
+            await store.get(did)
+            hot.append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        count = len(await store.all())
+        all_ms = (time.perf_counter() - t) * 1000
+        return {
+            "kind": store.kind,
+            "devices": count,
+            "get": percentiles(samples),
+            "get_hot": percentiles(hot),
+            "writes_per_second": round(write_rate),
+            "all_ms": round(all_ms, 2)
+        }
+    finally:
+        await store.close()
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark DeviceStore")
+    p.add_argument("--devices", type=int, default=5000)
+    p.add_argument("--reads", type=int, default=20000)
+    p.add_argument("--json", help="Simpan hasil ke file JSON")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for store in (DeviceStore(), SQLiteDeviceStore(path=str(Path(tmp) / "devices.db"))):
+            result = asyncio.run(measure(store, args.devices, args.reads))
+            results.append(result)
+            print(f"{result['kind']:<7} get p50 {result['get']['p50_us']:>7.1f} us  p99 {result['get']['p99_us']:>7.1f} us  "
+                  f"hot p50 {result['get_hot']['p50_us']:>6.1f} us  writes {result['writes_per_second']:>8}/s  "
+                  f"all {result['all_ms']:>7.2f} ms")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
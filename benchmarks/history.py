@@ -0,0 +1,108 @@
+"""Benchmark MeasurementHistory: throughput ingest, memori dan ukuran disk per juta sampel.
+
+Diukur untuk --samples sampel yang dibagi ke --devices device:
+- ingest     : append() per detik (yang dipanggil /recive untuk setiap data)
+- memori     : byte per juta sampel di ring buffer, dibandingkan dengan
+               menyimpan setiap data sebagai dict di list (tracemalloc)
+- flush      : waktu menulis semua sampel ke file kolom dan ukuran di disk
+- query      : latensi query satu device (semua data, rentang waktu dan
+               downsampling ke 500 titik)
+
+Jalankan dari root project:
+    python benchmarks/history.py
+    python benchmarks/history.py --samples 5000000 --devices 100 --json history.json
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.main.history import MeasurementHistory
+
+
+def dict_log_bytes(samples: int) -> int:
+    """Memori list of dict {ts, tb, bb} (cara data_devices menyimpan satu data)"""
+    tracemalloc.start()
+    log = [{"ts": 1.7e9 + n, "tb": 80.0 + n % 20, "bb": 10.0 + n % 5} for n in range(samples)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del log
+    return size
+
+
+def folder_bytes(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+async def timed(coro) -> float:
+    started = time.perf_counter()
+    await coro
+    return (time.perf_counter() - started) * 1000
+
+
+async def measure(samples: int, devices: int, directory: str) -> dict:
+    per_device = samples // devices
+    history = MeasurementHistory(capacity=per_device, directory=directory, flush_interval=3600, max_devices=devices)
+    history.start()
+    dids = [f"IOT_{n:04d}" for n in range(devices)]
+    base = 1.7e9
+
+    started = time.perf_counter()
+    for n in range(per_device):
+        ts = base + n
+        tb = 80.0 + n % 20 * 0.1
+        for did in dids:
+            history.append(did, ts, tb, 10.5)
+    ingest = time.perf_counter() - started
+    memory = history.stats()["memory_bytes"]
+
+    flush_ms = await timed(history.flush())
+    did = dids[0]
+    query_all_ms = await timed(history.query(did))
+    query_range_ms = await timed(history.query(did, start=base + per_device / 4, end=base + per_device / 2))
+    query_downsampled_ms = await timed(history.query(did, max_points=500))
+    await history.close()
+
+    million = 1_000_000 / (per_device * devices)
+    return {
+        "samples": per_device * devices,
+        "devices": devices,
+        "ingest_per_second": round(per_device * devices / ingest),
+        "memory_mib_per_million": round(memory * million / 2**20, 2),
+        "dict_log_mib_per_million": round(dict_log_bytes(1_000_000) / 2**20, 2),
+        "disk_mib_per_million": round(folder_bytes(Path(directory)) * million / 2**20, 2),
+        "flush_ms": round(flush_ms, 2),
+        "query_device_samples": per_device,
+        "query_all_ms": round(query_all_ms, 2),
+        "query_range_ms": round(query_range_ms, 2),
+        "query_downsampled_ms": round(query_downsampled_ms, 2)
+    }
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark MeasurementHistory")
+    p.add_argument("--samples", type=int, default=1_000_000)
+    p.add_argument("--devices", type=int, default=50)
+    p.add_argument("--json", help="Simpan hasil ke file JSON")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        result = asyncio.run(measure(args.samples, args.devices, tmp))
+    print(json.dumps(result, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""Load test: ribuan device IoT simulasi dan klien dashboard terhadap server lokal.
+
+Generator beban asyncio untuk endpoint yang sama dengan simulasi_iot.py dan
+test_prediction_flow.py:
+- device     : --devices device simulasi, masing-masing POST /reset/{did}
+               sekali lalu POST /recive setiap --interval detik (satu koneksi
+               HTTP keep-alive per device)
+- dashboard  : --subscribers klien WebSocket /ws/data/{device_id}, dibagi
+               rata ke semua device
+- predict    : --predict-clients klien yang memanggil POST /predict terus
+               menerus (berat diacak supaya tidak selalu kena cache)
+
+Device dan klien dashboard dinaikkan bertahap selama --ramp detik, lalu beban
+dijalankan --duration detik lagi. Laporan JSON berisi throughput, p50/p95/p99
+latensi per endpoint dan fan-out delay: waktu dari POST /recive dikirim
+sampai update diterima klien dashboard device tersebut.
+
+Tanpa --url, server uvicorn dijalankan sebagai proses baru (env WEB_CONCURRENCY,
+DEVICE_STORE, dst. diteruskan). Jalankan dari root project:
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --devices 2000 --subscribers 4000 --interval 1 --duration 30 --json load.json
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --devices 500
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import websockets
+
+from startup import ROOT, SAMPLE, free_port
+
+DEVICE_PREFIX = "LOAD_"
+
+
+def percentile(values: list, q: float):
+    """Persentil nearest-rank dari list yang sudah diurutkan"""
+    if not values:
+        return None
+    index = max(0, min(len(values), math.ceil(q / 100 * len(values))) - 1)
+    return round(values[index], 2)
+
+
+class Recorder:
+    """Latensi (ms), status HTTP dan error satu endpoint"""
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = 0
+
+    def report(self, elapsed: float) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies) + self.errors,
+            "errors": self.errors,
+            "status": {str(status): count for status, count in sorted(self.statuses.items())},
+            "throughput_per_second": round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": round(latencies[-1], 2) if latencies else None
+        }
+
+
+class HttpConnection:
+    """Koneksi HTTP/1.1 keep-alive minimal di atas asyncio streams (tanpa dependency tambahan)"""
+    def __init__(self, host: str, port: int, timeout: float):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def post(self, path: str, body: dict = None) -> int:
+        try:
+            return await asyncio.wait_for(self._post(path, body), self.timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    async def _post(self, path: str, body: dict = None) -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(
+            f"POST {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+        )
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        status = int(status_line.split()[1])
+        length = 0
+        keep_alive = True
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                keep_alive = False
+        await self.reader.readexactly(length)
+        if not keep_alive:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.reader = None
+
+
+class LoadTest:
+    def __init__(self, host: str, port: int, args):
+        self.host = host
+        self.port = port
+        self.args = args
+        self.stop = asyncio.Event()    # Device dan klien predict berhenti mengirim
+        self.closed = asyncio.Event()  # Klien dashboard ditutup
+        self.http = {"reset": Recorder(), "recive": Recorder(), "predict": Recorder()}
+        # (did, tb) -> waktu POST /recive dikirim, untuk fan-out delay
+        self.sent = {}
+        self.subscribed = Counter()  # did -> klien dashboard yang sedang terhubung
+        self.expected = 0            # Update yang seharusnya diterima klien dashboard
+        self.fanout = []
+        self.ws_connected = 0
+        self.ws_failed = 0
+        self.ws_messages = 0
+
+    def device_id(self, n: int) -> str:
+        return f"{DEVICE_PREFIX}{n:05d}"
+
+    async def timed(self, recorder: Recorder, conn: HttpConnection, path: str, body: dict = None):
+        started = time.perf_counter()
+        try:
+            status = await conn.post(path, body)
+        except Exception:
+            recorder.errors += 1
+            return
+        recorder.latencies.append((time.perf_counter() - started) * 1000)
+        recorder.statuses[status] += 1
+
+    async def device(self, n: int, delay: float):
+        await asyncio.sleep(delay)
+        did = self.device_id(n)
+        conn = HttpConnection(self.host, self.port, self.args.timeout)
+        try:
+            await self.timed(self.http["reset"], conn, f"/reset/{did}")
+            seq = 0
+            # Fase acak supaya device tidak mengirim bersamaan
+            await asyncio.sleep(random.uniform(0, self.args.interval))
+            while not self.stop.is_set():
+                # tb unik per device (berputar setiap 1000 data) sebagai penanda update
+                tb = round(50.0 + seq % 1000 * 0.1, 1)
+                seq += 1
+                self.sent[(did, tb)] = time.perf_counter()
+                await self.timed(self.http["recive"], conn, "/recive", {"did": did, "tb": tb, "bb": 10.0})
+                # Klien yang terhubung saat /recive selesai (perkiraan, selama ramp bisa meleset sedikit)
+                self.expected += self.subscribed[did]
+                await asyncio.sleep(self.args.interval)
+        finally:
+            conn.close()
+
+    async def subscriber(self, n: int, delay: float):
+        await asyncio.sleep(delay)
+        did = self.device_id(n % self.args.devices)
+        url = f"ws://{self.host}:{self.port}/ws/data/{did}"
+        try:
+            async with websockets.connect(url, max_queue=None, open_timeout=self.args.timeout) as ws:
+                self.ws_connected += 1
+                self.subscribed[did] += 1
+                try:
+                    while not self.closed.is_set():
+                        try:
+                            raw = await asyncio.wait_for(ws.recv(), timeout=0.5)
+                        except asyncio.TimeoutError:
+                            continue
+                        received = time.perf_counter()
+                        self.ws_messages += 1
+                        message = json.loads(raw)
+                        if message.get("source") != "iot_device":
+                            continue
+                        sent = self.sent.get((did, message.get("tb")))
+                        if sent is not None:
+                            self.fanout.append((received - sent) * 1000)
+                finally:
+                    self.subscribed[did] -= 1
+        except Exception:
+            self.ws_failed += 1
+
+    async def predictor(self, n: int, delay: float):
+        await asyncio.sleep(delay)
+        conn = HttpConnection(self.host, self.port, self.args.timeout)
+        try:
+            while not self.stop.is_set():
+                body = dict(SAMPLE, nama=f"load-{n}", berat=round(random.uniform(9.0, 14.0), 1))
+                await self.timed(self.http["predict"], conn, "/predict", body)
+        finally:
+            conn.close()
+
+    async def run(self) -> dict:
+        args = self.args
+        ramp = args.ramp
+        tasks = [
+            asyncio.create_task(self.subscriber(n, ramp * n / max(args.subscribers, 1)))
+            for n in range(args.subscribers)
+        ]
+        tasks += [
+            asyncio.create_task(self.device(n, ramp * n / max(args.devices, 1)))
+            for n in range(args.devices)
+        ]
+        tasks += [
+            asyncio.create_task(self.predictor(n, ramp * n / max(args.predict_clients, 1)))
+            for n in range(args.predict_clients)
+        ]
+        started = time.perf_counter()
+        await asyncio.sleep(ramp + args.duration)
+        self.stop.set()
+        elapsed = time.perf_counter() - started
+        # Beri waktu update terakhir sampai ke klien dashboard
+        await asyncio.sleep(args.drain)
+        self.closed.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        fanout = sorted(self.fanout)
+        return {
+            "config": {
+                "devices": args.devices,
+                "subscribers": args.subscribers,
+                "predict_clients": args.predict_clients,
+                "interval_seconds": args.interval,
+                "ramp_seconds": ramp,
+                "duration_seconds": args.duration
+            },
+            "elapsed_seconds": round(elapsed, 2),
+            "http": {name: recorder.report(elapsed) for name, recorder in self.http.items()},
+            "websocket": {
+                "connected": self.ws_connected,
+                "failed": self.ws_failed,
+                "messages": self.ws_messages,
+                "messages_per_second": round(self.ws_messages / elapsed, 1),
+                "fanout_expected": self.expected,
+                "fanout_delivered": len(fanout),
+                "fanout_p50_ms": percentile(fanout, 50),
+                "fanout_p95_ms": percentile(fanout, 95),
+                "fanout_p99_ms": percentile(fanout, 99),
+                "fanout_max_ms": round(fanout[-1], 2) if fanout else None
+            }
+        }
+
+
+def raise_file_limit(needed: int):
+    """Naikkan batas file descriptor (soft) untuk ribuan socket"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+def wait_ready(base: str, proc: subprocess.Popen = None, timeout: float = 60.0):
+    started = time.perf_counter()
+    while True:
+        try:
+            urllib.request.urlopen(base + "/health", timeout=1).read()
+            return
+        except OSError:
+            if (proc is not None and proc.poll() is not None) or time.perf_counter() - started > timeout:
+                raise RuntimeError("server did not start")
+            time.sleep(0.05)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Load test device IoT + dashboard WebSocket + /predict")
+    p.add_argument("--url", help="Server yang sudah berjalan (default: jalankan uvicorn baru)")
+    p.add_argument("--devices", type=int, default=1000)
+    p.add_argument("--subscribers", type=int, default=1000, help="Klien WebSocket /ws/data")
+    p.add_argument("--predict-clients", type=int, default=4, help="Klien POST /predict paralel")
+    p.add_argument("--interval", type=float, default=2.0, help="Detik antar POST /recive per device")
+    p.add_argument("--ramp", type=float, default=10.0, help="Detik untuk menaikkan semua klien")
+    p.add_argument("--duration", type=float, default=20.0, help="Detik beban penuh setelah ramp")
+    p.add_argument("--drain", type=float, default=2.0, help="Detik menunggu update terakhir sebelum klien dashboard ditutup")
+    p.add_argument("--timeout", type=float, default=30.0, help="Timeout satu request / koneksi")
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--json", help="Simpan hasil ke file JSON")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+    raise_file_limit(2 * (args.devices + args.subscribers + args.predict_clients) + 256)
+
+    proc = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = "127.0.0.1", free_port()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", host, "--port", str(port),
+             "--log-level", "warning", "--backlog", "4096"],
+            cwd=ROOT, env=dict(os.environ), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+    try:
+        wait_ready(f"http://{host}:{port}", proc)
+        result = asyncio.run(LoadTest(host, port, args).run())
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+    print(json.dumps(result, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""Microbenchmark jalur panas prediksi dan Z-score, hasil JSON untuk dibandingkan antar commit.
+
+Data uji diambil acak (dengan --seed) dari anak usia 1-5 tahun di
+stunting/data-stunting.csv. Usia
+di CSV ("X Tahun - Y Bulan - Z Hari") diubah menjadi tanggal lahir relatif
+terhadap hari ini, sehingga parse_tanggal_lahir menghasilkan usia yang sama
+setiap hari benchmark dijalankan. Benchmark:
+- parse_tanggal_lahir          : satu tanggal lahir -> tahun, bulan, hari
+- zscore.calculate_zscore      : Z-score satu anak
+- zscore.calculate_zscore_batch: Z-score semua --rows anak (per anak)
+- predict.single               : Prediction.predict satu anak
+- predict.batch                : Prediction.predict_batch semua anak (per anak)
+- handler.predict              : POST /predict lewat app ASGI di proses yang
+                                 sama (tanpa jaringan, cache dimatikan)
+
+Setiap benchmark diulang --repeat kali; yang dilaporkan waktu terbaik dan
+median per panggilan dalam mikrodetik. Dengan --compare, hasil dibandingkan
+dengan file JSON sebelumnya dan exit code 1 jika ada benchmark yang lebih
+lambat dari --max-regression.
+
+Jalankan dari root project:
+    python benchmarks/micro.py --json micro.json
+    python benchmarks/micro.py --compare micro.json --max-regression 0.15
+    python benchmarks/micro.py --only zscore --only parse
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+
+from lib.prediction import (  # noqa: E402
+    Prediction, FusedPrediction, PredictionInput, ZScoreCalculator,
+    parse_tanggal_lahir, parser_usia_from_string, parser_usia_tahun, parser_gender
+)
+
+warnings.filterwarnings('ignore')
+
+FIXTURE_CSV = ROOT / "stunting" / "data-stunting.csv"
+
+
+def load_fixture(path: Path, rows: int, seed: int) -> list:
+    """
+    Ambil `rows` baris acak dari CSV sebagai dict input /predict + Z-score dari CSV.
+    Hanya anak usia 1-5 tahun (batas validasi Prediction) yang dipakai.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        data = [row for row in csv.DictReader(f) if 1 <= parser_usia_from_string(row["Usia"]).tahun < 5]
+    sample = random.Random(seed).sample(data, min(rows, len(data)))
+    today = date.today()
+    fixture = []
+    for row in sample:
+        usia = parser_usia_from_string(row["Usia"])
+        # Kebalikan dari parse_tanggal_lahir (1 tahun = 365 hari, 1 bulan = 30 hari)
+        days = usia.tahun * 365 + usia.bulan * 30 + usia.hari
+        fixture.append({
+            "nama": "benchmark",
+            "jenis_kelamin": row["Jenis Kelamin"],
+            "bb_lahir": float(row["BB lahir"]),
+            "tb_lahir": float(row["TB lahir"]),
+            "tanggal_lahir": (today - timedelta(days=days)).isoformat(),
+            "berat": float(row["Berat"]),
+            "tinggi": float(row["Tinggi"]),
+            "usia_bulan": usia.tahun * 12 + usia.bulan,
+            "usia_tahun": parser_usia_tahun(usia.tahun, usia.bulan, usia.hari),
+            "zs_bbu": float(row["ZS BB/U"]),
+            "zs_tbu": float(row["ZS TB/U"]),
+            "zs_bbtb": float(row["ZS BB/TB"])
+        })
+    return fixture
+
+
+def prediction_inputs(fixture: list) -> list:
+    return [
+        PredictionInput(
+            usia=row["usia_tahun"], jenis_kelamin=row["jenis_kelamin"], bb_lahir=row["bb_lahir"],
+            tb_lahir=row["tb_lahir"], tanggal_lahir=row["tanggal_lahir"], berat=row["berat"],
+            tinggi=row["tinggi"], zs_bbu=row["zs_bbu"], zs_tbu=row["zs_tbu"], zs_bbtb=row["zs_bbtb"]
+        )
+        for row in fixture
+    ]
+
+
+def measure(fn, number: int, repeat: int, per_call: int = 1) -> dict:
+    """Waktu per panggilan (mikrodetik) dari `repeat` pengulangan `number` panggilan"""
+    fn()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - started) / (number * per_call) * 1e6)
+    return {
+        "best_us": round(min(times), 3),
+        "median_us": round(statistics.median(times), 3),
+        "calls": number * repeat * per_call
+    }
+
+
+async def asgi_post(app, path: str, body: dict) -> int:
+    """POST JSON langsung ke app ASGI, tanpa socket. Mengembalikan status HTTP"""
+    payload = json.dumps(body).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"content-type", b"application/json"),
+                                     (b"content-length", str(len(payload)).encode())],
+        "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80)
+    }
+    sent = False
+    status = 0
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def bench_handler(fixture: list, number: int, repeat: int) -> dict:
+    # Hasil cache akan membuat semua panggilan setelah putaran pertama instan
+    os.environ["PREDICT_CACHE_SIZE"] = "0"
+    os.environ.setdefault("PREDICT_WARMUP", "1")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    import main
+
+    bodies = itertools.cycle([
+        {key: row[key] for key in ("nama", "jenis_kelamin", "bb_lahir", "tb_lahir", "tanggal_lahir", "berat", "tinggi")}
+        for row in fixture
+    ])
+
+    async def one():
+        status = await asgi_post(main.app, "/predict", next(bodies))
+        if status != 200:
+            raise RuntimeError(f"/predict returned {status}")
+
+    async def run():
+        # Lifespan app (load model, inference pool) seperti saat server berjalan
+        async with main.app.router.lifespan_context(main.app):
+            await one()
+            times = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                for _ in range(number):
+                    await one()
+                times.append((time.perf_counter() - started) / number * 1e6)
+            return times
+
+    times = asyncio.run(run())
+    return {
+        "best_us": round(min(times), 3),
+        "median_us": round(statistics.median(times), 3),
+        "calls": number * repeat
+    }
+
+
+def run_benchmarks(fixture: list, args) -> dict:
+    selected = lambda name: not args.only or any(part in name for part in args.only)  # noqa: E731
+    results = {}
+    number, repeat = args.number, args.repeat
+
+    if selected("parse_tanggal_lahir"):
+        dates = itertools.cycle([row["tanggal_lahir"] for row in fixture])
+        results["parse_tanggal_lahir"] = measure(lambda: parse_tanggal_lahir(next(dates)), number * 10, repeat)
+
+    if selected("zscore"):
+        calculator = ZScoreCalculator()
+        rows = itertools.cycle(fixture)
+
+        def zscore_single():
+            row = next(rows)
+            calculator.calculate_zscore(row["usia_bulan"], row["berat"], row["tinggi"], parser_gender(row["jenis_kelamin"]))
+
+        results["zscore.calculate_zscore"] = measure(zscore_single, number, repeat)
+        columns = (
+            [row["usia_bulan"] for row in fixture], [row["berat"] for row in fixture],
+            [row["tinggi"] for row in fixture], [parser_gender(row["jenis_kelamin"]) for row in fixture]
+        )
+        results["zscore.calculate_zscore_batch"] = measure(
+            lambda: calculator.calculate_zscore_batch(*columns), max(1, number // 20), repeat, per_call=len(fixture)
+        )
+
+    if selected("predict."):
+        # Backend sama seperti main.py (PREDICT_BACKEND / PREDICT_MODEL_FORMAT)
+        prediction = FusedPrediction(lazy=True) if os.getenv("PREDICT_BACKEND") == "fused" else Prediction(lazy=True)
+        prediction.load()
+        inputs = prediction_inputs(fixture)
+        rows = itertools.cycle(inputs)
+        results["predict.single"] = measure(lambda: prediction.predict(next(rows)), number, repeat)
+        results["predict.batch"] = measure(
+            lambda: prediction.predict_batch(inputs), max(1, number // 20), repeat, per_call=len(inputs)
+        )
+
+    if selected("handler.predict"):
+        results["handler.predict"] = bench_handler(fixture, number, repeat)
+    return results
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list:
+    """Cetak perbandingan dengan hasil sebelumnya, kembalikan nama benchmark yang regresi"""
+    regressions = []
+    print(f"{'benchmark':<32} {'before (us)':>12} {'after (us)':>12} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<32} {'-':>12} {result['best_us']:>12.2f} {'new':>8}")
+            continue
+        change = result["best_us"] / before["best_us"] - 1
+        flag = " REGRESSION" if change > max_regression else ""
+        print(f"{name:<32} {before['best_us']:>12.2f} {result['best_us']:>12.2f} {change:>+7.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Microbenchmark prediksi dan Z-score")
+    p.add_argument("--fixture", default=str(FIXTURE_CSV), help="CSV sumber data uji")
+    p.add_argument("--rows", type=int, default=200, help="Jumlah baris acak dari CSV")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--number", type=int, default=200, help="Panggilan per pengulangan")
+    p.add_argument("--repeat", type=int, default=5, help="Jumlah pengulangan")
+    p.add_argument("--only", action="append", help="Hanya benchmark yang namanya mengandung teks ini (bisa diulang)")
+    p.add_argument("--json", help="Simpan hasil ke file JSON")
+    p.add_argument("--compare", help="File JSON hasil sebelumnya")
+    p.add_argument("--max-regression", type=float, default=0.2, help="Batas perlambatan (0.2 = 20%%) untuk --compare")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fixture = load_fixture(Path(args.fixture), args.rows, args.seed)
+    results = run_benchmarks(fixture, args)
+
+    import xgboost
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "xgboost": xgboost.__version__,
+            "backend": os.getenv("PREDICT_BACKEND", "sklearn"),
+            "fixture": Path(args.fixture).name,
+            "rows": len(fixture),
+            "seed": args.seed,
+            "number": args.number,
+            "repeat": args.repeat
+        },
+        "results": results
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        if compare(results, baseline, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
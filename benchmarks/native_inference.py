@@ -0,0 +1,99 @@
+"""Benchmark latensi per baris untuk backend prediksi model.
+
+Membandingkan waktu evaluasi satu anak (dan satu batch) untuk ketiga model
+dengan backend:
+- sklearn : XGBClassifier.predict (perilaku lama)
+- inplace : Booster.inplace_predict
+- native  : NativeTreeModel (array NumPy, lihat export_models.py)
+
+Bagian kedua membandingkan Prediction.predict end-to-end (ketiga model +
+decode label) untuk setiap backend dan FusedPrediction.
+
+Jalankan dari root project:
+    python benchmarks/native_inference.py
+    python benchmarks/native_inference.py --repeat 7 --number 300 --batch 256
+"""
+from __future__ import annotations
+import argparse
+import sys
+import timeit
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from lib.prediction import Prediction, FusedPrediction, PredictionInput  # noqa: E402
+from lib.prediction.native import NativeTreeModel  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+MODEL_NAMES = ("tbu", "bbu", "bbtb")
+SAMPLE_ROW = [0, 3.0, 50.0, 2.3, 11.0, 85.0, -0.5, -0.9, 0.1]
+
+
+def best_time(fn, number: int, repeat: int) -> float:
+    """Waktu terbaik per panggilan dalam mikrodetik"""
+    fn()
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark backend prediksi XGBoost")
+    p.add_argument("--models-dir", default="models")
+    p.add_argument("--number", type=int, default=200, help="Panggilan per pengulangan")
+    p.add_argument("--repeat", type=int, default=5, help="Jumlah pengulangan (diambil yang terbaik)")
+    p.add_argument("--batch", type=int, default=256, help="Ukuran batch untuk benchmark batch")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    models_dir = Path(args.models_dir)
+    row = np.array([SAMPLE_ROW], dtype=float)
+    batch = np.repeat(row, args.batch, axis=0) * np.random.default_rng(0).uniform(0.9, 1.1, (args.batch, 9))
+    batch[:, 0] = np.round(batch[:, 0])
+
+    print(f"{'model':<6} {'backend':<8} {'1 row (us)':>12} {'speedup':>8} {f'{args.batch} rows (us/row)':>20}")
+    for name in MODEL_NAMES:
+        model = joblib.load(models_dir / f"model_{name}.pkl")
+        booster = model.get_booster()
+        best_iteration = booster.attr("best_iteration")
+        iteration_range = (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+        native_file = models_dir / f"model_{name}.npz"
+        native = NativeTreeModel.load(native_file) if native_file.exists() else NativeTreeModel.from_booster(booster)
+
+        backends = {
+            "sklearn": lambda X: model.predict(X),
+            "inplace": lambda X: np.argmax(booster.inplace_predict(X, iteration_range=iteration_range), axis=1),
+            "native": lambda X: native.predict(X),
+        }
+        baseline = None
+        for backend, fn in backends.items():
+            single = best_time(lambda: fn(row), args.number, args.repeat)
+            many = best_time(lambda: fn(batch), max(1, args.number // 20), args.repeat) / args.batch
+            baseline = baseline or single
+            print(f"{name:<6} {backend:<8} {single:>12.1f} {baseline / single:>7.2f}x {many:>20.2f}")
+
+    data = PredictionInput(
+        usia=2.3, jenis_kelamin='L', bb_lahir=3.0, tb_lahir=50.0, tanggal_lahir='',
+        berat=11.0, tinggi=85.0, zs_bbu=-0.5, zs_tbu=-0.9, zs_bbtb=0.1
+    )
+    rows = [data] * args.batch
+    predictors = {backend: Prediction(backend) for backend in ("sklearn", "inplace", "native")}
+    predictors["fused"] = FusedPrediction()
+
+    print()
+    print(f"{'Prediction':<10} {'predict (us)':>14} {'speedup':>8} {f'predict_batch {args.batch} (us/row)':>30}")
+    baseline = None
+    for backend, predictor in predictors.items():
+        single = best_time(lambda: predictor.predict(data), args.number, args.repeat)
+        many = best_time(lambda: predictor.predict_batch(rows), max(1, args.number // 20), args.repeat) / args.batch
+        baseline = baseline or single
+        print(f"{backend:<10} {single:>14.1f} {baseline / single:>7.2f}x {many:>30.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
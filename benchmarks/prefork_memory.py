@@ -0,0 +1,101 @@
+"""Benchmark memori server multi-worker (PreforkServer) dengan dan tanpa preload.
+
+Server dijalankan dengan `python main.py` (WEB_CONCURRENCY=N), diberi beberapa
+request /predict dan /predict/batch agar semua model dipakai, lalu memori per
+proses dibaca dari /workers/stats (RSS, PSS, shared, private dari smaps_rollup).
+
+- preload   : model dimuat sekali di master sebelum fork (PREFORK_PRELOAD=1)
+- per-worker: setiap worker memuat model sendiri di lifespan (PREFORK_PRELOAD=0)
+
+PSS total adalah memori nyata seluruh server; private per worker adalah
+tambahan memori untuk setiap worker baru.
+
+Jalankan dari root project (Linux):
+    python benchmarks/prefork_memory.py
+    python benchmarks/prefork_memory.py --workers 2 4 8 --backend native
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from startup import ROOT, SAMPLE, free_port, request
+
+
+def fetch_json(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def measure(workers: int, preload: bool, backend: str, timeout: float) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        WEB_CONCURRENCY=str(workers),
+        PORT=str(port),
+        PREFORK_PRELOAD="1" if preload else "0",
+        PREDICT_BACKEND=backend,
+        PREDICT_CACHE_SIZE="0"
+    )
+    proc = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    started = time.perf_counter()
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError("server did not become ready")
+            try:
+                report = fetch_json(base + "/workers/stats")
+                if len(report["workers"]) == workers:
+                    break
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.05)
+
+        # Spread requests over the workers so every worker touches its models
+        for _ in range(workers * 8):
+            request(base + "/predict", SAMPLE, timeout=timeout)
+            request(base + "/predict/batch", {"data": [SAMPLE] * 16}, timeout=timeout)
+        return fetch_json(base + "/workers/stats")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=15)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark memori PreforkServer")
+    p.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    p.add_argument("--backend", default="sklearn", help="PREDICT_BACKEND untuk server")
+    p.add_argument("--timeout", type=float, default=120.0)
+    p.add_argument("--json", help="Simpan hasil ke file JSON")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    print(f"{'workers':>7} {'mode':<10} {'total RSS':>10} {'total PSS':>10} {'master PSS':>11} {'worker private':>15}  (MiB)")
+    for workers in args.workers:
+        for preload in (True, False):
+            report = measure(workers, preload, args.backend, args.timeout)
+            mode = "preload" if preload else "per-worker"
+            results.append({"workers": workers, "mode": mode, "backend": args.backend, "report": report})
+            print(f"{workers:>7} {mode:<10} {report['total_rss_mib']:>10.1f} {report['total_pss_mib']:>10.1f} "
+                  f"{report['master']['pss_mib']:>11.1f} {report['avg_worker_private_mib']:>15.1f}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
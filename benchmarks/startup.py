@@ -0,0 +1,144 @@
+"""Benchmark cold start server: time-to-first-request dan RSS per worker.
+
+Setiap konfigurasi (format model x backend) dijalankan sebagai proses
+uvicorn baru, lalu diukur:
+- ready      : waktu dari start proses sampai /health menjawab
+               (termasuk import, load model dan warm-up di lifespan)
+- first      : waktu dari start proses sampai /predict pertama selesai
+- first_req  : latensi /predict pertama saja
+- rss        : memori resident proses worker setelah /predict pertama (MiB)
+
+Jalankan dari root project (Linux, RSS dibaca dari /proc):
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 5 --config pickle:sklearn --config ubj:fused
+    python benchmarks/startup.py --no-warmup --json startup.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# format model : backend (fused = FusedPrediction)
+DEFAULT_CONFIGS = ("pickle:sklearn", "ubj:sklearn", "ubj:inplace", "ubj:native", "ubj:fused")
+
+SAMPLE = {
+    "nama": "benchmark",
+    "jenis_kelamin": "L",
+    "bb_lahir": 3.2,
+    "tb_lahir": 50,
+    "tanggal_lahir": (date.today() - timedelta(days=2 * 365)).isoformat(),
+    "berat": 11.5,
+    "tinggi": 84.0
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mib(pid: int) -> float:
+    """VmRSS proses dalam MiB"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def request(url: str, body: dict = None, timeout: float = 30.0) -> int:
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        response.read()
+        return response.status
+
+
+def run_once(model_format: str, backend: str, warmup: bool, timeout: float) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        PREDICT_MODEL_FORMAT=model_format,
+        PREDICT_BACKEND=backend,
+        PREDICT_WARMUP="1" if warmup else "0",
+        PREDICT_CACHE_SIZE="0"
+    )
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError("server did not become ready")
+            try:
+                request(base + "/health", timeout=1.0)
+                break
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.01)
+        ready = time.perf_counter()
+
+        status = request(base + "/predict", SAMPLE, timeout=timeout)
+        if status != 200:
+            raise RuntimeError(f"/predict returned {status}")
+        first = time.perf_counter()
+        rss = rss_mib(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+    return {
+        "ready_ms": (ready - started) * 1000,
+        "first_ms": (first - started) * 1000,
+        "first_request_ms": (first - ready) * 1000,
+        "rss_mib": rss
+    }
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark cold start server ML Stunting")
+    p.add_argument("--config", action="append", help=f"format:backend, boleh berulang (default: {', '.join(DEFAULT_CONFIGS)})")
+    p.add_argument("--runs", type=int, default=3, help="Jumlah start per konfigurasi (diambil median)")
+    p.add_argument("--no-warmup", action="store_true", help="Matikan warm-up lifespan (PREDICT_WARMUP=0)")
+    p.add_argument("--timeout", type=float, default=60.0)
+    p.add_argument("--json", help="Simpan hasil ke file JSON")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configs = args.config or list(DEFAULT_CONFIGS)
+    results = []
+
+    print(f"{'config':<16} {'ready (ms)':>11} {'first (ms)':>11} {'first req (ms)':>15} {'rss (MiB)':>10}")
+    for config in configs:
+        model_format, backend = config.split(":")
+        runs = [run_once(model_format, backend, not args.no_warmup, args.timeout) for _ in range(args.runs)]
+        summary = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        results.append({"format": model_format, "backend": backend, "warmup": not args.no_warmup, "runs": runs, **summary})
+        print(f"{config:<16} {summary['ready_ms']:>11.0f} {summary['first_ms']:>11.0f} "
+              f"{summary['first_request_ms']:>15.1f} {summary['rss_mib']:>10.1f}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""Benchmark WebSocket /ws/data: pesan terkirim, CPU server saat idle dan latensi update.
+
+Server uvicorn dijalankan sebagai proses baru, lalu N klien dashboard
+terhubung ke /ws/data/{device}. Diukur:
+- idle      : selama --idle detik tanpa data baru, jumlah pesan yang diterima
+              semua klien dan waktu CPU proses server
+- update    : --updates kali POST /recive, latensi dari request sampai update
+              diterima semua klien (p50/p95/max) dan latensi respons /recive
+
+Jalankan dari root project (Linux, CPU dibaca dari /proc):
+    python benchmarks/ws_push.py
+    python benchmarks/ws_push.py --clients 500 --idle 30 --updates 50 --json ws.json
+    python benchmarks/ws_push.py --root /path/ke/checkout/lain   # bandingkan versi lain
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import websockets
+
+from startup import ROOT, free_port, request
+
+DEVICE = "IOT_001"
+
+
+def cpu_seconds(pid: int) -> float:
+    """utime + stime proses dari /proc/<pid>/stat"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class Client:
+    def __init__(self):
+        self.received = 0
+        self.updates = {}  # tb (dipakai sebagai nomor update) -> waktu diterima
+
+    async def run(self, url: str, ready: asyncio.Event, stop: asyncio.Event):
+        async with websockets.connect(url, max_queue=None) as ws:
+            ready.set()
+            while not stop.is_set():
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=0.2)
+                except asyncio.TimeoutError:
+                    continue
+                self.received += 1
+                message = json.loads(raw)
+                if message.get("source") == "iot_device":
+                    self.updates.setdefault(message["tb"], time.perf_counter())
+
+
+async def run_benchmark(port: int, pid: int, clients: int, idle: float, updates: int) -> dict:
+    base = f"http://127.0.0.1:{port}"
+    url = f"ws://127.0.0.1:{port}/ws/data/{DEVICE}"
+    stop = asyncio.Event()
+    conns = [Client() for _ in range(clients)]
+    readies = [asyncio.Event() for _ in range(clients)]
+    tasks = [asyncio.create_task(c.run(url, r, stop)) for c, r in zip(conns, readies)]
+    await asyncio.wait_for(asyncio.gather(*(r.wait() for r in readies)), timeout=60)
+    await asyncio.sleep(0.5)
+
+    # Idle: tidak ada data baru
+    received_before = sum(c.received for c in conns)
+    cpu_before = cpu_seconds(pid)
+    await asyncio.sleep(idle)
+    idle_messages = sum(c.received for c in conns) - received_before
+    idle_cpu = cpu_seconds(pid) - cpu_before
+
+    # Update: POST /recive lalu tunggu sampai semua klien menerima
+    latencies = []
+    recive_latencies = []
+    for n in range(1, updates + 1):
+        tb = 1000.0 + n
+        sent_at = time.perf_counter()
+        await asyncio.to_thread(request, base + "/recive", {"did": DEVICE, "tb": tb, "bb": 10.0})
+        recive_latencies.append((time.perf_counter() - sent_at) * 1000)
+        deadline = sent_at + 10
+        while not all(tb in c.updates for c in conns) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.001)
+        received = [c.updates[tb] for c in conns if tb in c.updates]
+        if len(received) == clients:
+            latencies.append((max(received) - sent_at) * 1000)
+
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    latencies.sort()
+    return {
+        "clients": clients,
+        "idle_seconds": idle,
+        "idle_messages": idle_messages,
+        "idle_messages_per_second": round(idle_messages / idle, 1),
+        "idle_cpu_percent": round(idle_cpu / idle * 100, 2),
+        "updates": updates,
+        "updates_delivered": len(latencies),
+        "update_p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+        "update_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else None,
+        "update_max_ms": round(latencies[-1], 2) if latencies else None,
+        "recive_p50_ms": round(statistics.median(recive_latencies), 2) if recive_latencies else None
+    }
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark push WebSocket /ws/data")
+    p.add_argument("--clients", type=int, default=200)
+    p.add_argument("--idle", type=float, default=20.0, help="Detik pengukuran idle")
+    p.add_argument("--updates", type=int, default=30, help="Jumlah POST /recive")
+    p.add_argument("--root", default=str(ROOT), help="Direktori project yang dijalankan")
+    p.add_argument("--json", help="Simpan hasil ke file JSON")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    port = free_port()
+    env = dict(os.environ, PREDICT_WARMUP="0")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=args.root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        started = time.perf_counter()
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+                break
+            except OSError:
+                if proc.poll() is not None or time.perf_counter() - started > 60:
+                    raise RuntimeError("server did not start")
+                time.sleep(0.05)
+        result = asyncio.run(run_benchmark(port, proc.pid, args.clients, args.idle, args.updates))
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+    print(json.dumps(result, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
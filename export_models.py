@@ -0,0 +1,96 @@
+"""Export model XGBoost (.pkl) ke format yang bisa dimuat tanpa unpickle.
+
+Setiap models/model_{tbu,bbu,bbtb}.pkl ditulis ulang menjadi:
+- models/model_{tbu,bbu,bbtb}.ubj: XGBoost UBJSON (termasuk best_iteration)
+- models/model_{tbu,bbu,bbtb}.npz: array NumPy untuk backend native
+  (lihat lib/prediction/native.py), dicek bit-identik dengan margin
+  XGBoost pada data acak
+dan models/encoders.pkl menjadi models/encoders.json (classes_ per encoder).
+
+Jalankan:
+    python export_models.py
+    python export_models.py --models-dir models --check-rows 5000
+
+Backend native dipakai dengan environment variable PREDICT_BACKEND=native.
+File .ubj dan encoders.json dipakai otomatis jika ada (PREDICT_MODEL_FORMAT=auto).
+"""
+from __future__ import annotations
+import argparse
+import sys
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+import xgboost as xgb
+
+from lib.prediction.native import NativeTreeModel
+from lib.prediction.encoders import save_encoders
+
+warnings.filterwarnings('ignore')
+
+MODEL_NAMES = ("tbu", "bbu", "bbtb")
+
+
+def random_inputs(n: int, seed: int = 0) -> np.ndarray:
+    """Data acak dalam rentang fitur model (dengan sebagian nilai NaN)"""
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.integers(0, 2, n),          # jenis kelamin (encoded)
+        rng.uniform(1.5, 4.5, n),       # bb lahir
+        rng.uniform(40, 55, n),         # tb lahir
+        rng.uniform(0, 5, n),           # usia (tahun)
+        rng.uniform(3, 25, n),          # berat
+        rng.uniform(45, 120, n),        # tinggi
+        rng.uniform(-5, 5, (n, 3)),     # z-score BB/U, TB/U, BB/TB
+    ]).astype(float)
+    X[rng.random(X.shape) < 0.02] = np.nan
+    return X
+
+
+def check_identical(booster, native: NativeTreeModel, X: np.ndarray) -> bool:
+    best_iteration = booster.attr("best_iteration")
+    iteration_range = (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+    expected = booster.predict(xgb.DMatrix(X, feature_names=booster.feature_names),
+                               output_margin=True, iteration_range=iteration_range)
+    actual = native.predict_margin(X)
+    return np.array_equal(expected.view(np.uint32), actual.view(np.uint32))
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Export model XGBoost ke format UBJSON (.ubj) dan native (.npz)")
+    p.add_argument("--models-dir", default="models", help="Direktori model .pkl")
+    p.add_argument("--check-rows", type=int, default=2000, help="Jumlah baris acak untuk cek bit-identik (0 = lewati)")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    models_dir = Path(args.models_dir)
+    X = random_inputs(args.check_rows) if args.check_rows else None
+    ok = True
+
+    for name in MODEL_NAMES:
+        model = joblib.load(models_dir / f"model_{name}.pkl")
+        booster = model.get_booster()
+        model.save_model(models_dir / f"model_{name}.ubj")
+        native = NativeTreeModel.from_booster(booster)
+        output = models_dir / f"model_{name}.npz"
+        native.save(output)
+
+        status = "skip check"
+        if X is not None:
+            identical = check_identical(booster, native, X)
+            ok = ok and identical
+            status = "bit-identical" if identical else "MISMATCH"
+        print(f"[{name:>4}] {native.num_trees} trees, depth {native.max_depth} -> {output} ({output.stat().st_size / 1024:.0f} KiB, {status})")
+
+    encoders_file = models_dir / "encoders.json"
+    save_encoders(joblib.load(models_dir / "encoders.pkl"), encoders_file)
+    print(f"[enc ] {encoders_file}")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
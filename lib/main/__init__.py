@@ -1,9 +1,44 @@
-from .models import HealthResponse, DataFromIOT, ResponseMessage
+from .models import HealthResponse, DataFromIOT, DataFromGateway, DeviceReading, RawReading, RawDataFromIOT, ResponseMessage, BatchReceiveResponse
 from .ws_manager import ConnectionManager
+from .worker_pool import InferencePool, PoolRejectedError
+from .batcher import MicroBatcher
+from .prefork import PreforkServer, process_memory, memory_report
+from .device_store import DeviceStore, SQLiteDeviceStore
+from .history import MeasurementHistory
+from .ingest import parse_gateway_batch
+from .device_channel import DeviceChannels
+from .smoothing import ReadingStabilizer, MissingChannelError
+from .metrics import StageMetrics, StageTimer
+from .log_setup import setup_logging, JsonFormatter
+from .profiler import SamplingProfiler, ProfilerBusyError
 
 __all__ = [
     "HealthResponse",
     "DataFromIOT",
+    "DataFromGateway",
+    "DeviceReading",
+    "RawReading",
+    "RawDataFromIOT",
     "ResponseMessage",
-    "ConnectionManager"
+    "BatchReceiveResponse",
+    "ConnectionManager",
+    "InferencePool",
+    "PoolRejectedError",
+    "MicroBatcher",
+    "PreforkServer",
+    "process_memory",
+    "memory_report",
+    "DeviceStore",
+    "SQLiteDeviceStore",
+    "MeasurementHistory",
+    "parse_gateway_batch",
+    "DeviceChannels",
+    "ReadingStabilizer",
+    "MissingChannelError",
+    "StageMetrics",
+    "StageTimer",
+    "setup_logging",
+    "JsonFormatter",
+    "SamplingProfiler",
+    "ProfilerBusyError"
 ]
\ No newline at end of file
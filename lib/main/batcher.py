@@ -0,0 +1,185 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class MicroBatcher:
+    """
+    Collect concurrent single-item requests into one batch.
+
+    A batch is dispatched when max_batch_size items are waiting or when the
+    first item in the batch has waited max_wait_ms, whichever comes first.
+    The batch is processed by handler(items) which must return one result per
+    item, in order; an Exception in the result list is raised to that item's
+    caller only.
+
+    Parameters:
+    - handler: blocking function List[item] -> List[result | Exception]
+    - runner: async function used to call the handler, e.g. InferencePool.run
+      (None = call the handler directly on the event loop)
+    - max_batch_size: maximum items per batch
+    - max_wait_ms: maximum time the first item waits for others to arrive
+    """
+    def __init__(self, handler: Callable[[List[Any]], List[Any]],
+                 runner: Optional[Callable[..., Awaitable[Any]]] = None,
+                 max_batch_size: int = 32, max_wait_ms: float = 2.0):
+        if max_batch_size < 1 or max_wait_ms < 0:
+            raise ValueError("max_batch_size must be >= 1 and max_wait_ms must be >= 0")
+        self.handler = handler
+        self.runner = runner
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+
+        # Metrics
+        self._batches = 0
+        self._items = 0
+        self._max_batch = 0
+        self._size_buckets = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._max_queue = 0
+
+    @classmethod
+    def from_env(cls, handler: Callable[[List[Any]], List[Any]],
+                 runner: Optional[Callable[..., Awaitable[Any]]] = None) -> Optional["MicroBatcher"]:
+        """Create batcher from PREDICT_MICROBATCH* env vars, None if not enabled"""
+        if os.getenv("PREDICT_MICROBATCH", "0").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            handler,
+            runner=runner,
+            max_batch_size=int(os.getenv("PREDICT_MICROBATCH_MAX_SIZE", "32")),
+            max_wait_ms=float(os.getenv("PREDICT_MICROBATCH_WAIT_MS", "2"))
+        )
+
+    def start(self):
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._collect())
+        logger.info(f"Micro-batcher started: max_batch_size={self.max_batch_size}, max_wait_ms={self.max_wait_ms}")
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        # Fail anything still waiting so callers do not hang
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher stopped"))
+        logger.info("Micro-batcher stopped")
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result"""
+        if self._worker is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        self._max_queue = max(self._max_queue, self._queue.qsize())
+        return await future
+
+    async def _collect(self):
+        batch: List[tuple] = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = batch[0][2] + self.max_wait_ms / 1000
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0:
+                        # Take whatever already arrived without waiting further
+                        if self._queue.empty():
+                            break
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                self._start_dispatch(batch)
+                batch = []
+        except asyncio.CancelledError:
+            # Items already taken off the queue are dispatched; stop() waits for them
+            if batch:
+                self._start_dispatch(batch)
+            raise
+
+    def _start_dispatch(self, batch: List[tuple]):
+        # Process the batch in the background so the next one can be collected
+        task = asyncio.create_task(self._dispatch(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[tuple]):
+        now = time.perf_counter()
+        self._record(len(batch), [now - enqueued for _, _, enqueued in batch])
+        items = [item for item, _, _ in batch]
+        try:
+            if self.runner is not None:
+                results = await self.runner(self.handler, items)
+            else:
+                results = self.handler(items)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _record(self, size: int, waits: List[float]):
+        self._batches += 1
+        self._items += size
+        self._max_batch = max(self._max_batch, size)
+        for n, bound in enumerate(BATCH_SIZE_BUCKETS):
+            if size <= bound:
+                self._size_buckets[n] += 1
+                break
+        else:
+            self._size_buckets[-1] += 1
+        self._wait_total += sum(waits)
+        self._wait_max = max(self._wait_max, max(waits))
+
+    def stats(self) -> Dict[str, Any]:
+        buckets = {f"le_{bound}": count for bound, count in zip(BATCH_SIZE_BUCKETS, self._size_buckets)}
+        buckets["gt_{}".format(BATCH_SIZE_BUCKETS[-1])] = self._size_buckets[-1]
+        return {
+            "enabled": True,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+            "max_batch_size_seen": self._max_batch,
+            "batch_size_histogram": buckets,
+            "avg_wait_ms": self._wait_total / self._items * 1000 if self._items else 0.0,
+            "max_wait_ms_seen": self._wait_max * 1000,
+            "queue_length": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_length": self._max_queue
+        }
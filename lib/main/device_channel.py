@@ -0,0 +1,150 @@
+from fastapi import WebSocket
+from fastapi.websockets import WebSocketState
+from typing import Dict, Optional, Union
+import os
+import asyncio
+import logging
+import time
+
+from .ws_manager import SEND_TIMEOUT, encode_message
+
+logger = logging.getLogger(__name__)
+
+# Commands pushed down to a device over /ws/device/{did}
+DEVICE_COMMANDS = ("trigger", "reset")
+
+# How often a worker checks the device store for messages relayed to its device sockets
+RELAY_POLL_SECONDS = 0.1
+
+
+class DeviceChannels:
+    """
+    Long-lived WebSocket connections of IoT devices (/ws/device/{did}).
+
+    A device streams measurements up its socket and receives commands
+    (trigger, reset) down the same socket, instead of one HTTP request per
+    measurement. One connection per device: a reconnecting device replaces
+    its previous socket.
+
+    With a shared `store` (DEVICE_STORE=sqlite and prefork workers) the
+    worker holding a device socket is recorded in the store; a message for
+    a device connected to another worker is queued in the store and sent by
+    that worker's relay() loop within `poll_interval` seconds.
+    """
+    def __init__(self, send_timeout: Optional[float] = SEND_TIMEOUT, store=None,
+                 poll_interval: float = RELAY_POLL_SECONDS):
+        self.send_timeout = send_timeout
+        self.store = store
+        self.poll_interval = poll_interval
+        self.devices: Dict[str, WebSocket] = {}  # {did: websocket}
+        self.connected_at: Dict[str, float] = {}  # {did: time.time() of connect}
+        self.connections = 0
+        self.received = 0
+        self.invalid = 0
+        self.commands_sent = 0
+        self.relayed = 0
+
+    @property
+    def owner(self) -> str:
+        # Taken when used, not at creation: prefork workers are forked after import
+        return str(os.getpid())
+
+    async def connect(self, websocket: WebSocket, did: str):
+        await websocket.accept()
+        previous = self.devices.get(did)
+        self.devices[did] = websocket
+        self.connected_at[did] = time.time()
+        self.connections += 1
+        if self.store is not None:
+            await self.store.claim_channel(did, self.owner)
+        if previous is not None:
+            logger.info("Device %s reconnected, closing previous connection", did)
+            try:
+                await asyncio.wait_for(previous.close(code=1000), 1.0)
+            except Exception:
+                pass
+        logger.info("Device %s connected. Connected devices: %d", did, len(self.devices))
+
+    async def disconnect(self, websocket: WebSocket, did: str):
+        # Only the current socket of the device unregisters it
+        if self.devices.get(did) is websocket:
+            del self.devices[did]
+            del self.connected_at[did]
+            logger.info("Device %s disconnected", did)
+            if self.store is not None:
+                try:
+                    await self.store.release_channel(did, self.owner)
+                except Exception as e:
+                    logger.warning("Could not release device channel %s: %s", did, e)
+
+    def is_connected(self, did: str) -> bool:
+        return did in self.devices
+
+    async def send(self, did: str, message: Union[dict, str]) -> bool:
+        """Send a message to a connected device. Returns False if it is not connected or the send failed"""
+        websocket = self.devices.get(did)
+        if websocket is None or websocket.client_state != WebSocketState.CONNECTED:
+            return False
+        text, _ = encode_message(message)
+        try:
+            await asyncio.wait_for(websocket.send_text(text), self.send_timeout)
+            return True
+        except Exception as e:
+            logger.warning("Error sending to device %s: %s", did, e)
+            await self.disconnect(websocket, did)
+            return False
+
+    async def deliver(self, did: str, message: dict) -> Optional[str]:
+        """
+        Send a message to a device connected to this worker ("sent") or queue
+        it for the worker holding its socket ("relayed"). None if the device
+        is not connected anywhere.
+        """
+        if did in self.devices:
+            return "sent" if await self.send(did, message) else None
+        if self.store is None:
+            return None
+        owner = await self.store.channel_owner(did)
+        if owner is None or owner == self.owner:
+            return None
+        await self.store.relay(did, owner, message)
+        return "relayed"
+
+    async def send_command(self, did: str, command: str, **fields) -> Optional[str]:
+        """Push a command (trigger/reset) to a device; returns how it was delivered (see deliver)"""
+        if command not in DEVICE_COMMANDS:
+            raise ValueError(f"Device command must be one of {DEVICE_COMMANDS}")
+        delivery = await self.deliver(did, {"command": command, "did": did, **fields})
+        if delivery == "sent":
+            self.commands_sent += 1
+        return delivery
+
+    async def relay(self):
+        """Send the messages other workers queued for devices connected here (runs until cancelled)"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not self.devices:
+                continue
+            try:
+                messages = await self.store.take_relayed(self.owner)
+            except Exception as e:
+                logger.error("Could not read relayed device messages: %s", e)
+                continue
+            for did, message in messages:
+                if await self.send(did, message):
+                    self.relayed += 1
+                    if "command" in message:
+                        self.commands_sent += 1
+                else:
+                    logger.warning("Relayed message for device %s dropped, device not connected", did)
+
+    def stats(self) -> Dict[str, Union[int, Dict[str, float]]]:
+        return {
+            "connected_devices": len(self.devices),
+            "connected_at": dict(self.connected_at),
+            "connections": self.connections,
+            "received": self.received,
+            "invalid": self.invalid,
+            "commands_sent": self.commands_sent,
+            "relayed": self.relayed
+        }
@@ -0,0 +1,446 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STORE_KINDS = ("memory", "sqlite")
+
+# Columns of one device record, in table order
+DEVICE_FIELDS = ("tb", "bb", "status", "last_updated", "triggered")
+
+# Seconds a message relayed to another worker's device socket stays deliverable
+RELAY_TTL_SECONDS = 60
+
+
+class DeviceStore:
+    """
+    Latest tb/bb reading and state of every IoT device, the register of
+    known device ids, the measurement session (child profile waiting for
+    a measurement) bound to a device, and which worker holds the
+    /ws/device socket of a device with the messages relayed to it.
+
+    All methods are async so /recive and friends do not care which backend
+    is used. Records are plain dicts with DEVICE_FIELDS; last_updated is a
+    Unix timestamp so it stays meaningful across restarts and workers.
+    """
+    kind = "memory"
+
+    def __init__(self):
+        self._devices: Dict[str, Dict[str, Any]] = {}
+        self._registered = set()
+        self._sessions: Dict[str, Tuple[Dict[str, Any], float]] = {}  # {did: (profile, expires_at)}
+        self._channels: Dict[str, str] = {}  # {did: owner}
+        self._relayed: List[Tuple[str, str, Dict[str, Any]]] = []  # (owner, did, message)
+
+    @classmethod
+    def from_env(cls) -> "DeviceStore":
+        """Create store from DEVICE_STORE, DEVICE_STORE_PATH and DEVICE_STORE_FLUSH_MS"""
+        kind = os.getenv("DEVICE_STORE", "memory")
+        if kind not in STORE_KINDS:
+            raise ValueError(f"Device store must be one of {STORE_KINDS}")
+        if kind == "sqlite":
+            return SQLiteDeviceStore(
+                path=os.getenv("DEVICE_STORE_PATH", "devices.db"),
+                flush_interval=float(os.getenv("DEVICE_STORE_FLUSH_MS", "50")) / 1000
+            )
+        return cls()
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def get(self, did: str) -> Optional[Dict[str, Any]]:
+        device = self._devices.get(did)
+        return dict(device) if device is not None else None
+
+    async def set(self, did: str, data: Dict[str, Any]):
+        self._devices[did] = {field: data.get(field) for field in DEVICE_FIELDS}
+
+    async def set_many(self, devices: Dict[str, Dict[str, Any]]):
+        """Set the data of several devices at once"""
+        for did, data in devices.items():
+            self._devices[did] = {field: data.get(field) for field in DEVICE_FIELDS}
+
+    async def update(self, did: str, **fields) -> bool:
+        """Change some fields of an existing device. Returns False if the device has no data"""
+        device = self._devices.get(did)
+        if device is None:
+            return False
+        device.update(fields)
+        return True
+
+    async def delete(self, did: str) -> bool:
+        """Remove the data of a device. Returns False if it had none"""
+        return self._devices.pop(did, None) is not None
+
+    async def all(self, since: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """All devices with data, optionally only those updated at or after `since`"""
+        return {
+            did: dict(device) for did, device in self._devices.items()
+            if since is None or (device["last_updated"] or 0) >= since
+        }
+
+    async def register(self, dids: Iterable[str]):
+        self._registered.update(dids)
+
+    async def is_registered(self, did: str) -> bool:
+        return did in self._registered
+
+    async def bind_session(self, did: str, profile: Dict[str, Any], expires_at: float):
+        """Bind a child profile to a device until its next measurement (or expires_at)"""
+        self._sessions[did] = (dict(profile), expires_at)
+
+    async def get_session(self, did: str) -> Optional[Dict[str, Any]]:
+        entry = self._sessions.get(did)
+        if entry is None or entry[1] < time.time():
+            return None
+        return dict(entry[0])
+
+    async def take_session(self, did: str) -> Optional[Dict[str, Any]]:
+        """Remove and return the session of a device; only one caller gets it"""
+        entry = self._sessions.pop(did, None)
+        if entry is None or entry[1] < time.time():
+            return None
+        return entry[0]
+
+    async def claim_channel(self, did: str, owner: str):
+        """Record that worker `owner` holds the device socket of `did`"""
+        self._channels[did] = owner
+
+    async def release_channel(self, did: str, owner: str):
+        if self._channels.get(did) == owner:
+            del self._channels[did]
+
+    async def channel_owner(self, did: str) -> Optional[str]:
+        """Worker holding the device socket of `did`, None if the device is not connected"""
+        return self._channels.get(did)
+
+    async def relay(self, did: str, owner: str, message: Dict[str, Any]):
+        """Queue a message for the device socket of `did` held by worker `owner`"""
+        self._relayed.append((owner, did, dict(message)))
+
+    async def take_relayed(self, owner: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Remove and return the (did, message) pairs queued for worker `owner`"""
+        taken = [(did, message) for to, did, message in self._relayed if to == owner]
+        self._relayed = [entry for entry in self._relayed if entry[0] != owner]
+        return taken
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "devices": len(self._devices),
+            "registered": len(self._registered),
+            "sessions": len(self._sessions)
+        }
+
+
+class SQLiteDeviceStore(DeviceStore):
+    """
+    Device store in an embedded SQLite database (WAL mode), shared by all
+    workers of the server and kept across restarts.
+
+    Writes are buffered and flushed by a background task in one transaction
+    every `flush_interval` seconds (or when `batch_size` writes are pending),
+    off the event loop. Reads are primary key lookups that first check the
+    pending writes, so a worker always sees its own updates; other workers
+    see them after the next flush. With WAL, readers never wait for the
+    writer, which keeps a device lookup well under a millisecond.
+    """
+    kind = "sqlite"
+
+    def __init__(self, path: str = "devices.db", flush_interval: float = 0.05, batch_size: int = 500):
+        super().__init__()
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        # Connections are opened in start(): a SQLite connection must not cross a fork
+        self._reader: Optional[sqlite3.Connection] = None
+        self._writer: Optional[sqlite3.Connection] = None
+        # {did: record or None (deleted)} waiting for the next flush
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        # Changes being written by the current flush, still visible to reads
+        self._flushing: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._flush_lock = asyncio.Lock()
+        # Set by writes before start() too: the flusher then writes them right away
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        # Flush started because batch_size writes are pending (at most one at a time)
+        self._batch_flush: Optional[asyncio.Future] = None
+        self._closing = False
+        self._flushes = 0
+        self._flushed_rows = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+
+    async def start(self):
+        if self._writer is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer = self._connect()
+        self._writer.executescript("""
+            CREATE TABLE IF NOT EXISTS devices (
+                did TEXT PRIMARY KEY,
+                tb REAL,
+                bb REAL,
+                status TEXT,
+                last_updated REAL,
+                triggered INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_devices_last_updated ON devices (last_updated);
+            CREATE TABLE IF NOT EXISTS registered_devices (did TEXT PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS sessions (did TEXT PRIMARY KEY, profile TEXT NOT NULL, expires_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS device_channels (did TEXT PRIMARY KEY, owner TEXT NOT NULL, connected_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS relayed_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                owner TEXT NOT NULL,
+                did TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_relayed_messages_owner ON relayed_messages (owner);
+        """)
+        self._reader = self._connect()
+        self._closing = False
+        self._flusher = asyncio.create_task(self._flush_loop())
+        logger.info(f"SQLite device store opened: {self.path}")
+
+    async def close(self):
+        # The flusher is not cancelled: a cancel during the threaded write
+        # would lose the batch and close the connection under the writer thread
+        self._closing = True
+        self._wakeup.set()
+        if self._flusher is not None:
+            await self._flusher
+            self._flusher = None
+        await self.flush()
+        async with self._flush_lock:
+            for connection in (self._reader, self._writer):
+                if connection is not None:
+                    connection.close()
+            self._reader = self._writer = None
+
+    async def _flush_loop(self):
+        while not self._closing:
+            await self._wakeup.wait()
+            if self._closing:
+                break
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Write all pending changes in one transaction"""
+        async with self._flush_lock:
+            if not self._pending or self._writer is None:
+                return
+            self._flushing, self._pending = self._pending, {}
+            self._wakeup.clear()
+            try:
+                await asyncio.to_thread(self._write, self._flushing)
+                self._flushes += 1
+                self._flushed_rows += len(self._flushing)
+            except Exception as e:
+                logger.error(f"Device store flush failed: {e}")
+                # Keep the changes for the next flush unless newer ones arrived
+                for did, record in self._flushing.items():
+                    self._pending.setdefault(did, record)
+                self._wakeup.set()
+            finally:
+                self._flushing = {}
+
+    def _write(self, pending: Dict[str, Optional[Dict[str, Any]]]):
+        upserts = [
+            (did, record["tb"], record["bb"], record["status"], record["last_updated"], int(bool(record["triggered"])))
+            for did, record in pending.items() if record is not None
+        ]
+        deletes = [(did,) for did, record in pending.items() if record is None]
+        with self._writer:
+            self._writer.execute("BEGIN")
+            if upserts:
+                self._writer.executemany(
+                    "INSERT INTO devices (did, tb, bb, status, last_updated, triggered) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(did) DO UPDATE SET tb=excluded.tb, bb=excluded.bb, status=excluded.status, "
+                    "last_updated=excluded.last_updated, triggered=excluded.triggered",
+                    upserts
+                )
+            if deletes:
+                self._writer.executemany("DELETE FROM devices WHERE did = ?", deletes)
+
+    def _queue(self, did: str, record: Optional[Dict[str, Any]]):
+        self._pending[did] = record
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if len(self._pending) >= self.batch_size:
+            if self._batch_flush is None or self._batch_flush.done():
+                self._batch_flush = asyncio.ensure_future(self.flush())
+        else:
+            self._wakeup.set()
+
+    @staticmethod
+    def _record(row) -> Dict[str, Any]:
+        return {"tb": row[0], "bb": row[1], "status": row[2], "last_updated": row[3], "triggered": bool(row[4])}
+
+    def _unflushed(self) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Changes not yet in the database; pending ones override those being flushed"""
+        if not self._flushing:
+            return self._pending
+        return {**self._flushing, **self._pending}
+
+    async def get(self, did: str) -> Optional[Dict[str, Any]]:
+        for changes in (self._pending, self._flushing):
+            if did in changes:
+                record = changes[did]
+                return dict(record) if record is not None else None
+        row = self._reader.execute(
+            "SELECT tb, bb, status, last_updated, triggered FROM devices WHERE did = ?", (did,)
+        ).fetchone()
+        return self._record(row) if row is not None else None
+
+    async def set(self, did: str, data: Dict[str, Any]):
+        self._queue(did, {field: data.get(field) for field in DEVICE_FIELDS})
+
+    async def set_many(self, devices: Dict[str, Dict[str, Any]]):
+        for did, data in devices.items():
+            self._pending[did] = {field: data.get(field) for field in DEVICE_FIELDS}
+        self._schedule_flush()
+
+    async def update(self, did: str, **fields) -> bool:
+        device = await self.get(did)
+        if device is None:
+            return False
+        device.update(fields)
+        self._queue(did, device)
+        return True
+
+    async def delete(self, did: str) -> bool:
+        existed = await self.get(did) is not None
+        self._queue(did, None)
+        return existed
+
+    async def all(self, since: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        if since is None:
+            rows = self._reader.execute(
+                "SELECT did, tb, bb, status, last_updated, triggered FROM devices"
+            ).fetchall()
+        else:
+            rows = self._reader.execute(
+                "SELECT did, tb, bb, status, last_updated, triggered FROM devices WHERE last_updated >= ?", (since,)
+            ).fetchall()
+        devices = {row[0]: self._record(row[1:]) for row in rows}
+        for did, record in self._unflushed().items():
+            if record is None:
+                devices.pop(did, None)
+            elif since is None or (record["last_updated"] or 0) >= since:
+                devices[did] = dict(record)
+            else:
+                devices.pop(did, None)
+        return devices
+
+    async def register(self, dids: Iterable[str]):
+        rows = [(did,) for did in dids]
+        async with self._flush_lock:
+            await asyncio.to_thread(
+                self._writer.executemany, "INSERT OR IGNORE INTO registered_devices (did) VALUES (?)", rows
+            )
+
+    async def is_registered(self, did: str) -> bool:
+        return self._reader.execute("SELECT 1 FROM registered_devices WHERE did = ?", (did,)).fetchone() is not None
+
+    async def bind_session(self, did: str, profile: Dict[str, Any], expires_at: float):
+        async with self._flush_lock:
+            await asyncio.to_thread(
+                self._writer.execute,
+                "INSERT OR REPLACE INTO sessions (did, profile, expires_at) VALUES (?, ?, ?)",
+                (did, json.dumps(profile), expires_at)
+            )
+
+    async def get_session(self, did: str) -> Optional[Dict[str, Any]]:
+        row = self._reader.execute(
+            "SELECT profile FROM sessions WHERE did = ? AND expires_at >= ?", (did, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    async def take_session(self, did: str) -> Optional[Dict[str, Any]]:
+        # Cheap check first: called for every measurement, almost always without a session
+        if self._reader.execute("SELECT 1 FROM sessions WHERE did = ?", (did,)).fetchone() is None:
+            return None
+        async with self._flush_lock:
+            row = await asyncio.to_thread(self._take_session, did)
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def _take_session(self, did: str):
+        # Select and delete in one write transaction so only one worker takes the session
+        with self._writer:
+            self._writer.execute("BEGIN IMMEDIATE")
+            row = self._writer.execute("SELECT profile, expires_at FROM sessions WHERE did = ?", (did,)).fetchone()
+            if row is not None:
+                self._writer.execute("DELETE FROM sessions WHERE did = ?", (did,))
+        return row
+
+    async def _execute(self, sql: str, parameters: tuple = ()):
+        async with self._flush_lock:
+            await asyncio.to_thread(self._writer.execute, sql, parameters)
+
+    async def claim_channel(self, did: str, owner: str):
+        await self._execute(
+            "INSERT OR REPLACE INTO device_channels (did, owner, connected_at) VALUES (?, ?, ?)", (did, owner, time.time())
+        )
+        # Messages queued for a previous connection (e.g. a worker that died) go to the new one
+        await self._execute("UPDATE relayed_messages SET owner = ? WHERE did = ?", (owner, did))
+
+    async def release_channel(self, did: str, owner: str):
+        await self._execute("DELETE FROM device_channels WHERE did = ? AND owner = ?", (did, owner))
+
+    async def channel_owner(self, did: str) -> Optional[str]:
+        row = self._reader.execute("SELECT owner FROM device_channels WHERE did = ?", (did,)).fetchone()
+        return row[0] if row is not None else None
+
+    async def relay(self, did: str, owner: str, message: Dict[str, Any]):
+        await self._execute(
+            "INSERT INTO relayed_messages (owner, did, message, created_at) VALUES (?, ?, ?, ?)",
+            (owner, did, json.dumps(message), time.time())
+        )
+
+    async def take_relayed(self, owner: str) -> List[Tuple[str, Dict[str, Any]]]:
+        # Cheap check first: polled by every worker with connected devices
+        if self._reader.execute("SELECT 1 FROM relayed_messages WHERE owner = ? LIMIT 1", (owner,)).fetchone() is None:
+            return []
+        async with self._flush_lock:
+            rows = await asyncio.to_thread(self._take_relayed, owner)
+        expired = time.time() - RELAY_TTL_SECONDS
+        return [(did, json.loads(message)) for did, message, created_at in rows if created_at >= expired]
+
+    def _take_relayed(self, owner: str):
+        with self._writer:
+            self._writer.execute("BEGIN IMMEDIATE")
+            rows = self._writer.execute(
+                "SELECT did, message, created_at FROM relayed_messages WHERE owner = ? ORDER BY id", (owner,)
+            ).fetchall()
+            self._writer.execute("DELETE FROM relayed_messages WHERE owner = ?", (owner,))
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "path": self.path,
+            "pending": len(self._pending),
+            "flushes": self._flushes,
+            "flushed_rows": self._flushed_rows,
+            "flush_interval": self.flush_interval
+        }
@@ -0,0 +1,320 @@
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Column name -> dtype of one sample: 16 bytes per measurement
+COLUMNS = (("ts", np.float64), ("tb", np.float32), ("bb", np.float32))
+
+# Column files are split per time partition so range queries only read the overlapping ones
+PARTITION_SECONDS = 86400
+
+# Samples allocated for a new device; the ring doubles up to the history capacity
+INITIAL_RING_SIZE = 64
+
+
+class _Ring:
+    """
+    Last `capacity` measurements of one device in NumPy arrays. The arrays
+    start small and double while they are not full, so devices that send
+    few samples do not hold a full ring.
+    """
+    __slots__ = ("ts", "tb", "bb", "capacity", "count", "flushed")
+
+    def __init__(self, capacity: int):
+        size = min(capacity, INITIAL_RING_SIZE)
+        self.ts = np.empty(size, dtype=np.float64)
+        self.tb = np.empty(size, dtype=np.float32)
+        self.bb = np.empty(size, dtype=np.float32)
+        self.capacity = capacity
+        self.count = 0    # Samples appended since start
+        self.flushed = 0  # Samples handed to a flush
+
+    def _grow(self):
+        # Only called while count == len(ts): nothing has wrapped around yet
+        size = min(self.capacity, len(self.ts) * 2)
+        for name in ("ts", "tb", "bb"):
+            old = getattr(self, name)
+            new = np.empty(size, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def append(self, ts: float, tb: float, bb: float):
+        if self.count == len(self.ts) and len(self.ts) < self.capacity:
+            self._grow()
+        i = self.count % len(self.ts)
+        self.ts[i] = ts
+        self.tb[i] = tb
+        self.bb[i] = bb
+        self.count += 1
+
+    def oldest(self) -> int:
+        """Index (since start) of the oldest sample still in memory"""
+        return max(0, self.count - len(self.ts))
+
+    def columns(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Copy of samples [start, stop) counted since start, all still in memory"""
+        capacity = len(self.ts)
+        positions = np.arange(start, stop) % capacity
+        return self.ts[positions], self.tb[positions], self.bb[positions]
+
+
+class MeasurementHistory:
+    """
+    Append-only tb/bb measurement log per device.
+
+    Every device has a ring buffer of the last `capacity` samples (timestamp
+    float64, tb and bb float32). With a `directory`, a background task
+    appends new samples every `flush_interval` seconds to raw column files
+    `<directory>/<device>/<partition>/<writer>.{ts,tb,bb}`: one directory per
+    `partition_seconds` time slice (named by its start timestamp) and one set
+    of files per process, so prefork workers never write the same file.
+    Queries read the column files of all processes in the partitions that
+    overlap the requested range, plus the samples not flushed yet.
+    Without a directory only the ring buffers are kept (oldest samples are
+    overwritten).
+
+    At most `max_devices` rings are kept in memory. When a new device
+    arrives, the ring of the device that sent nothing for the longest time
+    is dropped; its samples not flushed yet still go to the next flush, so
+    with a directory its history stays queryable from disk.
+    """
+    def __init__(self, capacity: int = 4096, directory: Optional[str] = None, flush_interval: float = 5.0,
+                 max_devices: int = 1000, partition_seconds: float = PARTITION_SECONDS):
+        if capacity < 1 or max_devices < 1:
+            raise ValueError("History capacity and max_devices must be >= 1")
+        if partition_seconds <= 0:
+            raise ValueError("History partition_seconds must be > 0")
+        self.capacity = capacity
+        self.directory = Path(directory) if directory else None
+        self.flush_interval = flush_interval
+        self.max_devices = max_devices
+        self.partition_seconds = partition_seconds
+        # Least recently appended device first
+        self._rings: "OrderedDict[str, _Ring]" = OrderedDict()
+        # Serializes flushes with the memory/file-size snapshot of a query, so a
+        # sample is never read twice or missed (the file read itself is unlocked)
+        self._lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._writer_id: Optional[str] = None
+        self._early_flush: Optional[asyncio.Future] = None
+        # Unflushed samples copied out of a full ring, written by the next flush
+        self._spilled: List[Tuple[str, Tuple[np.ndarray, ...]]] = []
+        self._appended = 0
+        self._flushed = 0
+        self._evicted = 0
+
+    @classmethod
+    def from_env(cls) -> "MeasurementHistory":
+        """Create history from the HISTORY_* environment variables"""
+        return cls(
+            capacity=int(os.getenv("HISTORY_CAPACITY", "4096")),
+            directory=os.getenv("HISTORY_DIR") or None,
+            flush_interval=float(os.getenv("HISTORY_FLUSH_SECONDS", "5")),
+            max_devices=int(os.getenv("HISTORY_MAX_DEVICES", "1000")),
+            partition_seconds=float(os.getenv("HISTORY_PARTITION_SECONDS", str(PARTITION_SECONDS)))
+        )
+
+    def start(self):
+        if self.directory is None or self._flusher is not None:
+            return
+        # Writer id is taken after a prefork fork, so every worker gets its own files
+        self._writer_id = str(os.getpid())
+        self._flusher = asyncio.create_task(self._flush_loop())
+        logger.info(f"Measurement history flushing to {self.directory} every {self.flush_interval}s")
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+            await self.flush()
+
+    def append(self, did: str, ts: float, tb: float, bb: float):
+        ring = self._rings.get(did)
+        if ring is None:
+            if len(self._rings) >= self.max_devices:
+                self._evict()
+            ring = self._rings[did] = _Ring(self.capacity)
+        else:
+            self._rings.move_to_end(did)
+        if self.directory is not None and ring.count - ring.flushed >= self.capacity:
+            # Keep unflushed samples for the disk instead of overwriting them
+            self._spilled.append((did, ring.columns(ring.flushed, ring.count)))
+            ring.flushed = ring.count
+        ring.append(ts, tb, bb)
+        self._appended += 1
+        # Flush early instead of overwriting samples that never reached the disk
+        if (self._flusher is not None and ring.count - ring.flushed >= self.capacity // 2
+                and (self._early_flush is None or self._early_flush.done())):
+            self._early_flush = asyncio.ensure_future(self.flush())
+
+    def _evict(self):
+        """Drop the ring of the least recently appended device"""
+        did, ring = self._rings.popitem(last=False)
+        if self.directory is not None and ring.count > ring.flushed:
+            self._spilled.append((did, ring.columns(ring.flushed, ring.count)))
+        self._evicted += 1
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"History flush failed: {e}")
+
+    def _device_dir(self, did: str) -> Path:
+        # Percent-encode everything including dots, so "." and ".." cannot leave
+        # the directory; an empty id gets "%", which no encoded id can produce
+        return self.directory / (quote(did, safe="").replace(".", "%2E") or "%")
+
+    async def flush(self):
+        """Append samples not written yet to the column files"""
+        if self.directory is None:
+            return
+        async with self._lock:
+            batch, self._spilled = self._spilled, []
+            for did, ring in self._rings.items():
+                if ring.count > ring.flushed:
+                    batch.append((did, ring.columns(ring.flushed, ring.count)))
+                    ring.flushed = ring.count
+            if not batch:
+                return
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except Exception:
+                # Retry with the next flush
+                self._spilled[:0] = batch
+                raise
+            self._flushed += sum(len(columns[0]) for _, columns in batch)
+
+    def _write(self, batch: List[Tuple[str, Tuple[np.ndarray, ...]]]):
+        for did, columns in batch:
+            device_dir = self._device_dir(did)
+            partitions = (np.floor(columns[0] / self.partition_seconds) * self.partition_seconds).astype(np.int64)
+            for partition in np.unique(partitions):
+                rows = slice(None) if partitions[0] == partitions[-1] else partitions == partition
+                partition_dir = device_dir / str(partition)
+                partition_dir.mkdir(parents=True, exist_ok=True)
+                for (name, dtype), values in zip(COLUMNS, columns):
+                    with open(partition_dir / f"{self._writer_id}.{name}", "ab") as f:
+                        f.write(values[rows].astype(dtype, copy=False).tobytes())
+
+    def _files(self, did: str, start: Optional[float], end: Optional[float]) -> List[Tuple[Path, int]]:
+        """
+        (column file prefix, samples) of every writer in the partitions that
+        overlap [start, end]. Files are only appended to, so reading that many
+        samples later gives exactly what was flushed at this moment.
+        """
+        device_dir = self._device_dir(did)
+        if not device_dir.is_dir():
+            return []
+        files = []
+        for partition_dir in device_dir.iterdir():
+            try:
+                partition = int(partition_dir.name)
+            except ValueError:
+                continue
+            if (start is not None and partition + self.partition_seconds <= start) \
+                    or (end is not None and partition > end):
+                continue
+            for ts_file in partition_dir.glob("*.ts"):
+                prefix = ts_file.with_suffix("")
+                # A crash during a flush can leave columns of different length
+                n = min(
+                    prefix.with_name(f"{prefix.name}.{name}").stat().st_size // np.dtype(dtype).itemsize
+                    for name, dtype in COLUMNS
+                )
+                if n:
+                    files.append((prefix, n))
+        return files
+
+    @staticmethod
+    def _read(files: List[Tuple[Path, int]]) -> List[Tuple[np.ndarray, ...]]:
+        return [
+            tuple(np.fromfile(prefix.with_name(f"{prefix.name}.{name}"), dtype=dtype, count=n) for name, dtype in COLUMNS)
+            for prefix, n in files
+        ]
+
+    async def query(self, did: str, start: Optional[float] = None, end: Optional[float] = None,
+                    max_points: Optional[int] = None) -> Dict[str, object]:
+        """
+        Measurements of a device with start <= ts <= end, ordered by time.
+        With max_points, samples are averaged into at most max_points equal
+        time buckets.
+        """
+        files = []
+        async with self._lock:
+            ring = self._rings.get(did)
+            parts = [columns for spilled_did, columns in self._spilled if spilled_did == did]
+            if ring is not None:
+                first = ring.flushed if self.directory is not None else ring.oldest()
+                parts.append(ring.columns(first, ring.count))
+            if self.directory is not None:
+                files = await asyncio.to_thread(self._files, did, start, end)
+        if files:
+            parts.extend(await asyncio.to_thread(self._read, files))
+
+        if parts:
+            ts, tb, bb = (np.concatenate([part[i] for part in parts]) for i in range(3))
+        else:
+            ts, tb, bb = np.empty(0), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32)
+        mask = np.ones(len(ts), dtype=bool)
+        if start is not None:
+            mask &= ts >= start
+        if end is not None:
+            mask &= ts <= end
+        order = np.argsort(ts[mask], kind="stable")
+        ts, tb, bb = ts[mask][order], tb[mask][order], bb[mask][order]
+
+        total = len(ts)
+        downsampled = max_points is not None and total > max_points
+        if downsampled:
+            ts, tb, bb = downsample(ts, tb, bb, max_points)
+        return {
+            "device_id": did,
+            "count": total,
+            "downsampled": downsampled,
+            "ts": ts.tolist(),
+            # float32 -> shortest decimal, e.g. 80.2 instead of 80.19999694824219
+            "tb": np.round(tb.astype(np.float64), 3).tolist(),
+            "bb": np.round(bb.astype(np.float64), 3).tolist()
+        }
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "devices": len(self._rings),
+            "max_devices": self.max_devices,
+            "evicted": self._evicted,
+            "capacity": self.capacity,
+            "partition_seconds": self.partition_seconds,
+            "appended": self._appended,
+            "flushed": self._flushed,
+            "spilled": len(self._spilled),
+            "memory_bytes": sum(ring.ts.nbytes + ring.tb.nbytes + ring.bb.nbytes for ring in self._rings.values()),
+            "directory": str(self.directory) if self.directory is not None else None
+        }
+
+
+def downsample(ts: np.ndarray, tb: np.ndarray, bb: np.ndarray, max_points: int) -> Tuple[np.ndarray, ...]:
+    """Average sorted samples into max_points equal time buckets, empty buckets are skipped"""
+    edges = np.linspace(ts[0], ts[-1], max_points + 1)
+    bucket = np.clip(np.searchsorted(edges, ts, side="right") - 1, 0, max_points - 1)
+    counts = np.bincount(bucket, minlength=max_points)
+    used = counts > 0
+    counts = counts[used]
+    return tuple(
+        np.bincount(bucket, weights=values, minlength=max_points)[used] / counts
+        for values in (ts, tb, bb)
+    )
@@ -0,0 +1,22 @@
+from typing import List
+from pydantic import TypeAdapter
+
+from .models import DataFromGateway
+
+# Validates a whole JSON array in one pydantic-core call
+_GATEWAY_BATCH = TypeAdapter(List[DataFromGateway])
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+
+def parse_gateway_batch(body: bytes, content_type: str = "") -> List[DataFromGateway]:
+    """
+    Parse a gateway batch: a JSON array of measurements, or newline-delimited
+    JSON (one measurement object per line).
+    NDJSON lines are joined into one array so the batch is still parsed and
+    validated in a single pass. Raises pydantic.ValidationError.
+    """
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in NDJSON_CONTENT_TYPES or not body.lstrip().startswith(b"["):
+        body = b"[" + b",".join(line for line in body.splitlines() if line.strip()) + b"]"
+    return _GATEWAY_BATCH.validate_json(body)
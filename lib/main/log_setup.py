@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import time
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+LOG_FORMATS = ("json", "text")
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed with extra={...}
+# (uvicorn adds color_message, a copy of the message with ANSI colors)
+_RECORD_FIELDS = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {"message", "asctime", "taskName", "color_message"}
+
+_handler: Optional["_AsyncHandler"] = None
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, pid, message, extra fields and exception"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "message": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _AsyncHandler(QueueHandler):
+    """
+    Put records on a queue; a QueueListener thread formats and writes them.
+    Only the message arguments are merged on the calling thread (they may
+    change later), JSON formatting and stream I/O happen off the hot path.
+    The record is updated in place instead of copied: getMessage() returns
+    the same text for any handler that sees it afterwards.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _start_listener(target: logging.Handler):
+    global _listener
+    _handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(_handler.queue, target, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_after_fork():
+    # The listener thread does not exist in a forked child (prefork workers,
+    # process pool): give the child its own queue and thread
+    if _listener is not None:
+        _start_listener(_listener.handlers[0])
+
+
+def stop_logging():
+    """Write queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def parse_levels(value: str) -> Dict[str, str]:
+    """'lib.prediction=DEBUG,uvicorn.access=WARNING' -> {logger: level}"""
+    levels = {}
+    for item in value.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level: Optional[str] = None, log_format: Optional[str] = None,
+                  use_queue: Optional[bool] = None, levels: Optional[Dict[str, str]] = None):
+    """
+    Configure the root logger once for the whole app.
+
+    Arguments default to the environment:
+    - LOG_LEVEL: root level (INFO)
+    - LOG_FORMAT: json (one object per line) or text
+    - LOG_ASYNC: 1 = records are written by a background thread via a queue
+    - LOG_LEVELS: per-logger levels, e.g. "lib.prediction.zscore=DEBUG,uvicorn.access=WARNING"
+
+    uvicorn's loggers are routed through the same handler. Calling it again
+    only re-applies the levels and the uvicorn routing.
+    """
+    global _handler
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    log_format = log_format or os.getenv("LOG_FORMAT", "json")
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Log format must be one of {LOG_FORMATS}")
+    if use_queue is None:
+        use_queue = os.getenv("LOG_ASYNC", "1").lower() in ("1", "true", "yes")
+    if levels is None:
+        levels = parse_levels(os.getenv("LOG_LEVELS", ""))
+
+    # No caller lookup (stack walk) per record, file/line are not logged
+    logging._srcfile = None
+    logging.logMultiprocessing = False
+
+    root = logging.getLogger()
+    if _handler is None and not any(getattr(h, "_app_handler", False) for h in root.handlers):
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+        if use_queue:
+            _handler = _AsyncHandler(queue.SimpleQueue())
+            _start_listener(stream)
+            os.register_at_fork(after_in_child=_restart_after_fork)
+            atexit.register(stop_logging)
+            handler = _handler
+        else:
+            handler = stream
+        handler._app_handler = True
+        for old in root.handlers[:]:
+            root.removeHandler(old)
+        root.addHandler(handler)
+
+    root.setLevel(level)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+    for name, logger_level in levels.items():
+        logging.getLogger(name).setLevel(logger_level)
@@ -0,0 +1,114 @@
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds (seconds) of the stage latency histogram buckets
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Stages of the /predict pipeline, in order
+PREDICT_STAGES = ("cache", "queue", "batch", "parse", "zscore", "predict", "message", "total")
+
+
+class StageTimer:
+    """
+    Durations of the stages of one request.
+
+    mark(stage) closes the stage that started at the previous mark (or at
+    creation), so one perf_counter() call is taken per stage. The timer is
+    picklable and can be returned from an inference pool worker.
+    """
+    __slots__ = ("started", "last", "stages")
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def add(self, stage: str, seconds: float):
+        """Record a stage measured elsewhere (e.g. in a worker) without moving the mark"""
+        self.stages.append((stage, seconds))
+
+    def restart(self):
+        """Continue marking from now, e.g. after stages were added from a worker"""
+        self.last = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds"""
+        return ", ".join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in self.stages)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "sum")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # Last bucket is +Inf
+        self.sum = 0.0
+
+
+class StageMetrics:
+    """
+    Per-stage latency histograms of the /predict pipeline in Prometheus format.
+
+    Observations are made on the event loop from finished StageTimers, so no
+    locking is needed and timings measured in process pool workers are
+    counted too. With prefork workers every process reports its own
+    histograms.
+
+    Parameters:
+    - enabled: collect timings (timer() returns None when disabled)
+    - server_timing: also attach the timings of a request as Server-Timing header
+    """
+    def __init__(self, enabled: bool = True, server_timing: bool = False):
+        self.enabled = enabled
+        self.server_timing = enabled and server_timing
+        self._histograms: Dict[str, _Histogram] = {stage: _Histogram() for stage in PREDICT_STAGES}
+
+    @classmethod
+    def from_env(cls) -> "StageMetrics":
+        """Create metrics from METRICS_ENABLED and METRICS_SERVER_TIMING"""
+        return cls(
+            enabled=os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes"),
+            server_timing=os.getenv("METRICS_SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+        )
+
+    def timer(self) -> Optional[StageTimer]:
+        return StageTimer() if self.enabled else None
+
+    def observe(self, timer: StageTimer):
+        """Add all stages of a finished request, plus its total time"""
+        timer.stages.append(("total", timer.elapsed()))
+        # Inlined: this runs for every request
+        histograms = self._histograms
+        for stage, seconds in timer.stages:
+            histogram = histograms.get(stage)
+            if histogram is None:
+                histogram = histograms[stage] = _Histogram()
+            histogram.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            histogram.sum += seconds
+
+    def render(self) -> str:
+        """Histograms in the Prometheus text exposition format"""
+        name = "predict_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Duration of each stage of the /predict pipeline",
+            f"# TYPE {name} histogram"
+        ]
+        for stage, histogram in self._histograms.items():
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            count = cumulative + histogram.buckets[-1]
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum:.9f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
@@ -1,3 +1,4 @@
+from typing import Optional, Union
 from pydantic import BaseModel
 
 
@@ -17,9 +18,58 @@ class DataFromIOT(BaseModel):
     tb: float
     bb: float
 
+class DataFromGateway(DataFromIOT):
+    """
+    One measurement in a batch sent by an IOT gateway
+    Parameters:
+    - ts: Unix timestamp of the measurement (default: time the batch is received)
+    """
+    ts: Optional[float] = None
+
+class DeviceReading(BaseModel):
+    """
+    One measurement sent by a device over /ws/device/{did}
+    Parameters:
+    - tb: Tinggi Badan dalam cm
+    - bb: Berat Badan dalam kg
+    - ts: Unix timestamp of the measurement (default: time it is received)
+    - id: Optional message id, the server answers with {"ack": id}
+    """
+    tb: float
+    bb: float
+    ts: Optional[float] = None
+    id: Optional[Union[int, str]] = None
+
+class RawReading(BaseModel):
+    """
+    One raw sensor reading, smoothed on the server until it is stable
+    Parameters:
+    - tb: Tinggi Badan dalam cm (optional, height sensor)
+    - bb: Berat Badan dalam kg (optional, scale)
+    - ts: Unix timestamp of the reading (default: time it is received)
+    """
+    tb: Optional[float] = None
+    bb: Optional[float] = None
+    ts: Optional[float] = None
+
+class RawDataFromIOT(RawReading):
+    """
+    Raw sensor reading sent by an IOT device over HTTP
+    """
+    did: str
+
 class ResponseMessage(BaseModel):
     """
     Response model for API messages
     """
     status: int
-    message: str
\ No newline at end of file
+    message: str
+
+class BatchReceiveResponse(BaseModel):
+    """
+    Response model for batch data from IOT gateway
+    """
+    status: int
+    message: str
+    received: int
+    devices: int
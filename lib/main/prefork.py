@@ -0,0 +1,257 @@
+import gc
+import os
+import time
+import signal
+import socket
+import logging
+import multiprocessing
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+# Fields read from /proc/<pid>/smaps_rollup (kB)
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+# A worker that exits within MIN_WORKER_UPTIME seconds counts as a failed start. Its
+# restart is delayed RESPAWN_BACKOFF * 2^(failures - 1) seconds (up to MAX_RESPAWN_BACKOFF);
+# after MAX_QUICK_FAILURES failed starts within FAILURE_WINDOW seconds the slot is given up
+MIN_WORKER_UPTIME = 10.0
+RESPAWN_BACKOFF = 0.5
+MAX_RESPAWN_BACKOFF = 30.0
+MAX_QUICK_FAILURES = 5
+FAILURE_WINDOW = 120.0
+
+# Server running in this process tree (set in the master before forking workers)
+_current: Optional["PreforkServer"] = None
+
+
+def process_memory(pid: int) -> Dict[str, Any]:
+    """
+    Memory of one process in MiB from /proc/<pid>/smaps_rollup.
+    - rss: resident memory, counting shared pages in full
+    - pss: proportional share, shared pages divided by the number of processes using them
+    - shared / private: pages shared with other processes vs only used by this one
+    Falls back to VmRSS from /proc/<pid>/status when smaps_rollup is unavailable.
+    """
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in SMAPS_FIELDS:
+                    values[key] = int(rest.split()[0])
+    except OSError:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        values["Rss"] = int(line.split()[1])
+        except OSError:
+            return {"pid": pid, "available": False}
+
+    def mib(*keys):
+        if not all(k in values for k in keys):
+            return None
+        return round(sum(values[k] for k in keys) / 1024, 1)
+
+    return {
+        "pid": pid,
+        "available": True,
+        "rss_mib": mib("Rss"),
+        "pss_mib": mib("Pss"),
+        "shared_mib": mib("Shared_Clean", "Shared_Dirty"),
+        "private_mib": mib("Private_Clean", "Private_Dirty")
+    }
+
+
+def memory_report() -> Dict[str, Any]:
+    """
+    Memory of the serving processes. Under PreforkServer this covers the master
+    and every worker; otherwise only the current process.
+    total_pss_mib is the real memory used by the whole server, and the private
+    memory of a worker is its overhead on top of the shared (preloaded) pages.
+    """
+    if _current is None:
+        master = None
+        workers = [process_memory(os.getpid())]
+    else:
+        master = process_memory(_current.master_pid)
+        workers = [process_memory(pid) for pid in _current.worker_pids()]
+
+    processes = ([master] if master else []) + workers
+    private = [w["private_mib"] for w in workers if w.get("private_mib") is not None]
+    return {
+        "prefork": _current is not None,
+        "preload": _current.preload is not None if _current else False,
+        "current_pid": os.getpid(),
+        "master": master,
+        "workers": workers,
+        "total_rss_mib": round(sum(p.get("rss_mib") or 0 for p in processes), 1),
+        "total_pss_mib": round(sum(p.get("pss_mib") or 0 for p in processes), 1),
+        "avg_worker_private_mib": round(sum(private) / len(private), 1) if private else None
+    }
+
+
+class PreforkServer:
+    """
+    Multi-worker server that shares loaded models between workers.
+
+    The master process imports the app, runs `preload` (load models + warm-up),
+    binds the listening socket and then forks `workers` uvicorn servers. Model
+    arrays and XGBoost boosters are read-only after loading, so the forked
+    workers share those pages copy-on-write instead of loading their own copy.
+    Workers that exit unexpectedly are forked again from the master. A worker
+    that keeps dying right after start (lifespan error, bad model file) is
+    restarted with an increasing delay, and its slot is given up after
+    MAX_QUICK_FAILURES failed starts; when no worker is left, run() raises.
+
+    Parameters:
+    - app: ASGI app object (not an import string, workers must use the preloaded module)
+    - workers: number of worker processes
+    - preload: called once in the master before forking (None = each worker loads in its lifespan)
+    - uvicorn_options: extra uvicorn.Config options (log_level, access_log, ...)
+
+    Only available on platforms with os.fork (Linux/macOS).
+    """
+    def __init__(self, app: Any, host: str = "0.0.0.0", port: int = 5000, workers: int = 2,
+                 preload: Optional[Callable[[], None]] = None, **uvicorn_options):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        if not hasattr(os, "fork"):
+            raise RuntimeError("PreforkServer requires os.fork")
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.preload = preload
+        self.uvicorn_options = uvicorn_options
+        self.master_pid = os.getpid()
+        # Worker pid per slot, in shared memory so every worker can see its siblings
+        self._pids = multiprocessing.RawArray("i", workers)
+        self._children: Dict[int, int] = {}
+        self._started = [0.0] * workers  # time.monotonic() of the last fork per slot
+        self._failures = [deque() for _ in range(workers)]  # Quick exits per slot
+        self._respawn_at: Dict[int, float] = {}  # {slot: time.monotonic() to fork again}
+        self._stopping = False
+
+    def worker_pids(self) -> List[int]:
+        return [pid for pid in self._pids if pid]
+
+    def bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def run(self):
+        global _current
+        _current = self
+
+        if self.preload is not None:
+            logger.info("Preloading models in master process")
+            self.preload()
+            # Keep the preloaded objects out of future GC passes, so the cyclic
+            # GC in the workers does not write to (and copy) the shared pages
+            gc.collect()
+            gc.freeze()
+
+        sock = self.bind()
+        logger.info(f"Prefork master {self.master_pid} listening on {self.host}:{self.port}, workers={self.workers}")
+
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        for slot in range(self.workers):
+            self._spawn(slot, sock)
+
+        while self._children or self._respawn_at:
+            self._respawn_due(sock)
+            if self._respawn_at:
+                # Restarts are pending: poll so they are forked on time
+                try:
+                    pid, status = os.waitpid(-1, os.WNOHANG)
+                except ChildProcessError:
+                    pid = 0
+                if pid == 0:
+                    time.sleep(min(0.1, max(0.0, min(self._respawn_at.values()) - time.monotonic())))
+                    continue
+            else:
+                try:
+                    pid, status = os.wait()
+                except ChildProcessError:
+                    break
+            slot = self._children.pop(pid, None)
+            if slot is None:
+                continue
+            self._pids[slot] = 0
+            if not self._stopping:
+                self._worker_exited(slot, pid, status)
+
+        sock.close()
+        if not self._stopping:
+            raise RuntimeError("All prefork workers failed to start")
+        logger.info("Prefork master stopped")
+
+    def _worker_exited(self, slot: int, pid: int, status: int):
+        """Schedule the restart of a slot, with backoff if its workers keep dying at start"""
+        now = time.monotonic()
+        code = os.waitstatus_to_exitcode(status)
+        failures = self._failures[slot]
+        if now - self._started[slot] < MIN_WORKER_UPTIME:
+            failures.append(now)
+            while now - failures[0] > FAILURE_WINDOW:
+                failures.popleft()
+        else:
+            failures.clear()
+
+        if len(failures) >= MAX_QUICK_FAILURES:
+            logger.error("Worker %d exited with status %d; slot %d failed %d starts within %ds, not restarting it",
+                         pid, code, slot, len(failures), FAILURE_WINDOW)
+            return
+        delay = min(MAX_RESPAWN_BACKOFF, RESPAWN_BACKOFF * 2 ** (len(failures) - 1)) if failures else 0.0
+        logger.warning("Worker %d exited with status %d, restarting in %.1fs", pid, code, delay)
+        self._respawn_at[slot] = now + delay
+
+    def _respawn_due(self, sock: socket.socket):
+        now = time.monotonic()
+        for slot, at in list(self._respawn_at.items()):
+            if at <= now:
+                del self._respawn_at[slot]
+                self._spawn(slot, sock)
+
+    def _spawn(self, slot: int, sock: socket.socket):
+        pid = os.fork()
+        if pid == 0:
+            # Worker: uvicorn installs its own SIGINT/SIGTERM handlers in serve()
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                config = uvicorn.Config(self.app, host=self.host, port=self.port, **self.uvicorn_options)
+                uvicorn.Server(config).run(sockets=[sock])
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        self._children[pid] = slot
+        self._pids[slot] = pid
+        self._started[slot] = time.monotonic()
+        logger.info(f"Started worker {pid} (slot {slot})")
+
+    def _handle_stop(self, signum, frame):
+        if self._stopping:
+            return
+        self._stopping = True
+        self._respawn_at.clear()
+        logger.info(f"Received {signal.Signals(signum).name}, stopping workers")
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
@@ -0,0 +1,163 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds between samples (100 Hz)
+SAMPLE_INTERVAL = 0.01
+MAX_STACK_DEPTH = 128
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another one is running"""
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that can be started and stopped in a running server.
+
+    A background thread wakes up every `interval` seconds, reads the current
+    stack of every other thread (sys._current_frames) and counts it. Nothing
+    is hooked into the profiled code, so the overhead is the sampling thread
+    alone (well under 1% CPU at 100 Hz) and it only exists while a profile
+    runs. collapsed() returns the counts in the collapsed-stack format of
+    flamegraph.pl / speedscope: "thread;outer;...;inner count" per line.
+
+    Only threads of this process are sampled: with prefork, the worker that
+    serves the request; with INFERENCE_POOL_KIND=process the inference work
+    runs in other processes.
+    """
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        if interval <= 0:
+            raise ValueError("Sample interval must be > 0")
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.duration = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._labels: Dict[object, str] = {}  # code object -> frame label
+        self._trace_memory = False
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, trace_memory: bool = False):
+        if self._thread is not None:
+            raise ProfilerBusyError("A profile is already running")
+        self.samples = Counter()
+        self.sample_count = 0
+        self._stop.clear()
+        # Only trace allocations if nobody else (e.g. PYTHONTRACEMALLOC) already does
+        self._trace_memory = trace_memory and not tracemalloc.is_tracing()
+        if self._trace_memory:
+            tracemalloc.start()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info("Sampling profiler started (interval %ss, tracemalloc %s)", self.interval, trace_memory)
+
+    def stop(self, top: int = 25) -> Optional[List[Dict[str, object]]]:
+        """
+        Stop sampling; returns the top allocations if memory was traced
+        (allocated since start() and still alive, or everything when
+        tracemalloc was already tracing)
+        """
+        if self._thread is None:
+            return None
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.duration = time.perf_counter() - self._started
+        allocations = None
+        if tracemalloc.is_tracing():
+            allocations = top_allocations(tracemalloc.take_snapshot(), top)
+            if self._trace_memory:
+                tracemalloc.stop()
+        logger.info("Sampling profiler stopped: %d samples in %.1fs", self.sample_count, self.duration)
+        return allocations
+
+    async def profile(self, seconds: float, trace_memory: bool = False, top: int = 25) -> Optional[List[Dict[str, object]]]:
+        """Sample for `seconds` while the event loop keeps serving requests"""
+        self.start(trace_memory)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            # Joining the sampler and the tracemalloc snapshot can take a while
+            # on a large heap: keep them off the event loop
+            allocations = await asyncio.to_thread(self.stop, top)
+        return allocations
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                self.samples[self._stack(names.get(ident, str(ident)), frame)] += 1
+            self.sample_count += 1
+
+    def _stack(self, thread_name: str, frame) -> str:
+        labels = []
+        depth = 0
+        while frame is not None and depth < MAX_STACK_DEPTH:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = f"{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})"
+            labels.append(label)
+            frame = frame.f_back
+            depth += 1
+        labels.append(thread_name)
+        labels.reverse()
+        return ";".join(labels)
+
+    def collapsed(self) -> str:
+        """Samples in the collapsed-stack format, most frequent stack first"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "samples": self.sample_count,
+            "stacks": len(self.samples),
+            "duration": round(self.duration, 3)
+        }
+
+
+def short_path(path: str) -> str:
+    """File path relative to its sys.path entry (stdlib, site-packages, project), ';' removed for the collapsed format"""
+    roots = sorted((os.path.abspath(entry or os.getcwd()) + os.sep for entry in sys.path), key=len, reverse=True)
+    for root in roots:
+        if path.startswith(root):
+            path = path[len(root):]
+            break
+    return path.replace(";", "_")
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, top: int = 25) -> List[Dict[str, object]]:
+    """Source lines holding the most memory in a tracemalloc snapshot"""
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    return [
+        {
+            "file": short_path(stat.traceback[0].filename),
+            "line": stat.traceback[0].lineno,
+            "size_kib": round(stat.size / 1024, 1),
+            "count": stat.count
+        }
+        for stat in snapshot.statistics("lineno")[:top]
+    ]
@@ -0,0 +1,182 @@
+import os
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple, Union
+
+# Defaults follow the "lock" logic in IOT.cpp: a value is locked after 4 s without change
+WINDOW = 5
+EMA_ALPHA = 0.3
+HOLD_SECONDS = 4.0
+TB_TOLERANCE = 0.5   # cm
+BB_TOLERANCE = 0.05  # kg
+MAX_DEVICES = 1000
+
+
+class MissingChannelError(Exception):
+    """Raised when one channel is stable but the device sends no readings of the other one"""
+
+
+class _Channel:
+    """Rolling median + EMA of one sensor (tb or bb) and its stability state"""
+    __slots__ = ("window", "alpha", "tolerance", "hold", "ema", "median", "anchor", "anchor_ts", "last_ts")
+
+    def __init__(self, window: int, alpha: float, tolerance: float, hold: float):
+        self.window = deque(maxlen=window)
+        self.alpha = alpha
+        self.tolerance = tolerance
+        self.hold = hold
+        self.ema: Optional[float] = None
+        self.median = 0.0
+        # Filtered value the signal has stayed close to since anchor_ts
+        self.anchor: Optional[float] = None
+        self.anchor_ts = 0.0
+        self.last_ts: Optional[float] = None  # Time of the last reading
+
+    def add(self, ts: float, value: float):
+        self.window.append(value)
+        self.last_ts = ts
+        # Median of a few samples removes single spikes (ultrasonic echoes, BLE glitches)
+        median = self.median = sorted(self.window)[len(self.window) // 2]
+        self.ema = median if self.ema is None else self.alpha * median + (1 - self.alpha) * self.ema
+        if self.anchor is None or abs(self.ema - self.anchor) > self.tolerance:
+            self.anchor = self.ema
+            self.anchor_ts = ts
+
+    def loaded(self) -> bool:
+        # Like previousBerat > 0 in IOT.cpp, but on the raw median: the EMA
+        # only decays towards 0 after a child steps off and never reaches it
+        return self.median > self.tolerance and self.ema > self.tolerance
+
+    def stable(self, ts: float) -> bool:
+        return self.anchor is not None and self.loaded() and ts - self.anchor_ts >= self.hold
+
+    def missing(self, ts: float) -> bool:
+        """No reading at all, or none within the last hold seconds"""
+        return self.last_ts is None or ts - self.last_ts > self.hold
+
+
+class _DeviceFilter:
+    __slots__ = ("tb", "bb", "settled", "last_ts")
+
+    def __init__(self, stabilizer: "ReadingStabilizer"):
+        self.tb = _Channel(stabilizer.window, stabilizer.alpha, stabilizer.tb_tolerance, stabilizer.hold_seconds)
+        self.bb = _Channel(stabilizer.window, stabilizer.alpha, stabilizer.bb_tolerance, stabilizer.hold_seconds)
+        self.settled: Optional[Tuple[float, float]] = None  # Last emitted (tb, bb)
+        self.last_ts = 0.0
+
+
+class ReadingStabilizer:
+    """
+    Server-side smoothing and stable-reading detection for raw sensor streams.
+
+    Per device, tb and bb readings go through a rolling median of `window`
+    samples and an exponential moving average. A channel is stable when
+    the filtered value stays within its tolerance for `hold_seconds`, like
+    the lock logic of IOT.cpp. When both channels are stable, add() returns
+    the settled (tb, bb) once; it is returned again only after the values
+    move by more than the tolerance (the next child on the scale).
+    An empty scale (median or EMA within the tolerance of 0) is never
+    stable, so a child stepping off does not produce a (0, 0) reading.
+    A measurement needs both tb and bb: when one channel is stable but the
+    device sent no reading of the other for `hold_seconds`, add() raises
+    MissingChannelError instead of waiting forever.
+    Memory per device is constant (two windows of `window` samples) and at
+    most `max_devices` devices are tracked; the device that sent nothing for
+    the longest time is dropped first.
+    """
+    def __init__(self, window: int = WINDOW, alpha: float = EMA_ALPHA, hold_seconds: float = HOLD_SECONDS,
+                 tb_tolerance: float = TB_TOLERANCE, bb_tolerance: float = BB_TOLERANCE,
+                 max_devices: int = MAX_DEVICES):
+        if window < 1 or not (0 < alpha <= 1):
+            raise ValueError("window must be >= 1 and alpha must be in (0, 1]")
+        if max_devices < 1:
+            raise ValueError("max_devices must be >= 1")
+        self.window = window
+        self.alpha = alpha
+        self.hold_seconds = hold_seconds
+        self.tb_tolerance = tb_tolerance
+        self.bb_tolerance = bb_tolerance
+        self.max_devices = max_devices
+        # Least recently updated device first
+        self._devices: "OrderedDict[str, _DeviceFilter]" = OrderedDict()
+        self.readings = 0
+        self.settled = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_env(cls) -> "ReadingStabilizer":
+        """Create stabilizer from STABLE_* environment variables"""
+        return cls(
+            window=int(os.getenv("STABLE_WINDOW", str(WINDOW))),
+            alpha=float(os.getenv("STABLE_EMA_ALPHA", str(EMA_ALPHA))),
+            hold_seconds=float(os.getenv("STABLE_HOLD_SECONDS", str(HOLD_SECONDS))),
+            tb_tolerance=float(os.getenv("STABLE_TB_TOLERANCE", str(TB_TOLERANCE))),
+            bb_tolerance=float(os.getenv("STABLE_BB_TOLERANCE", str(BB_TOLERANCE))),
+            max_devices=int(os.getenv("STABLE_MAX_DEVICES", str(MAX_DEVICES)))
+        )
+
+    def add(self, did: str, ts: float, tb: Optional[float] = None, bb: Optional[float] = None) -> Optional[Tuple[float, float]]:
+        """
+        Feed one raw reading (tb and/or bb) of a device.
+        Returns the settled (tb, bb) when the measurement just became stable, else None.
+        Raises MissingChannelError when one channel is stable and the other one is missing.
+        """
+        device = self._devices.get(did)
+        if device is None:
+            if len(self._devices) >= self.max_devices:
+                self._devices.popitem(last=False)
+                self.evicted += 1
+            device = self._devices[did] = _DeviceFilter(self)
+        else:
+            self._devices.move_to_end(did)
+        self.readings += 1
+        if tb is not None:
+            device.tb.add(ts, tb)
+        if bb is not None:
+            device.bb.add(ts, bb)
+        device.last_ts = ts
+
+        # A channel that stopped sending keeps its last value, which must not be settled
+        tb_stable = device.tb.stable(ts) and not device.tb.missing(ts)
+        bb_stable = device.bb.stable(ts) and not device.bb.missing(ts)
+        if not (tb_stable and bb_stable):
+            if tb_stable and device.bb.missing(ts):
+                raise MissingChannelError(f"Device {did} sends tb but no bb readings")
+            if bb_stable and device.tb.missing(ts):
+                raise MissingChannelError(f"Device {did} sends bb but no tb readings")
+            return None
+        settled = (round(device.tb.ema, 1), round(device.bb.ema, 2))
+        previous = device.settled
+        if previous is not None and abs(settled[0] - previous[0]) <= self.tb_tolerance \
+                and abs(settled[1] - previous[1]) <= self.bb_tolerance:
+            return None
+        device.settled = settled
+        self.settled += 1
+        return settled
+
+    def current(self, did: str) -> Optional[Dict[str, Union[float, bool, None]]]:
+        """Filtered values and stability of a device, None if it sent no raw readings"""
+        device = self._devices.get(did)
+        if device is None:
+            return None
+        return {
+            "tb": round(device.tb.ema, 1) if device.tb.ema is not None else None,
+            "bb": round(device.bb.ema, 2) if device.bb.ema is not None else None,
+            "tb_stable": device.tb.stable(device.last_ts),
+            "bb_stable": device.bb.stable(device.last_ts),
+            "settled": device.settled is not None
+        }
+
+    def reset(self, did: str):
+        """Forget the filter state of a device (new measurement session)"""
+        self._devices.pop(did, None)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        return {
+            "devices": len(self._devices),
+            "max_devices": self.max_devices,
+            "evicted": self.evicted,
+            "readings": self.readings,
+            "settled": self.settled,
+            "window": self.window,
+            "hold_seconds": self.hold_seconds
+        }
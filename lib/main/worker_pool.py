@@ -0,0 +1,136 @@
+import os
+import asyncio
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+POOL_KINDS = ("thread", "process")
+REJECTION_POLICIES = ("reject", "wait")
+
+
+class PoolRejectedError(Exception):
+    """Raised when the inference pool queue is full and the task is rejected"""
+
+
+class InferencePool:
+    """
+    Run blocking inference (Z-score + XGBoost) outside the event loop.
+
+    Parameters:
+    - kind: "thread" or "process" executor
+    - max_workers: number of worker threads/processes
+    - max_queue: number of tasks allowed to wait when all workers are busy
+    - policy: what to do when the queue is full
+        - "reject": fail immediately with PoolRejectedError
+        - "wait": wait for a free slot, up to queue_timeout seconds (None = forever)
+
+    Tasks for the "process" kind must be picklable module-level functions.
+    Worker processes are forked from the server process, so they share the
+    already loaded models instead of loading them again.
+    """
+    def __init__(self, kind: str = "thread", max_workers: int = 2, max_queue: int = 64,
+                 policy: str = "reject", queue_timeout: Optional[float] = None):
+        if kind not in POOL_KINDS:
+            raise ValueError(f"Pool kind must be one of {POOL_KINDS}")
+        if policy not in REJECTION_POLICIES:
+            raise ValueError(f"Rejection policy must be one of {REJECTION_POLICIES}")
+        if max_workers < 1 or max_queue < 0:
+            raise ValueError("max_workers must be >= 1 and max_queue must be >= 0")
+
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.policy = policy
+        self.queue_timeout = queue_timeout
+        self.executor: Optional[Executor] = None
+
+        # Slots for running + queued tasks
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    @classmethod
+    def from_env(cls) -> "InferencePool":
+        """Create pool from INFERENCE_POOL_* environment variables"""
+        timeout = os.getenv("INFERENCE_POOL_QUEUE_TIMEOUT")
+        return cls(
+            kind=os.getenv("INFERENCE_POOL_KIND", "thread"),
+            max_workers=int(os.getenv("INFERENCE_POOL_SIZE", "2")),
+            max_queue=int(os.getenv("INFERENCE_POOL_QUEUE", "64")),
+            policy=os.getenv("INFERENCE_POOL_POLICY", "reject"),
+            queue_timeout=float(timeout) if timeout else None
+        )
+
+    def start(self):
+        if self.executor is not None:
+            return
+        if self.kind == "process":
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+        logger.info(f"Inference pool started: kind={self.kind}, workers={self.max_workers}, queue={self.max_queue}, policy={self.policy}")
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+            logger.info("Inference pool stopped")
+
+    @property
+    def running(self) -> int:
+        """Number of tasks currently executing on a worker"""
+        return min(self._in_flight, self.max_workers)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of admitted tasks waiting for a free worker"""
+        return max(0, self._in_flight - self.max_workers)
+
+    async def _acquire(self):
+        if self.policy == "reject":
+            if self._slots.locked():
+                self._rejected += 1
+                raise PoolRejectedError("Inference queue is full")
+            await self._slots.acquire()
+            return
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise PoolRejectedError("Timed out waiting for inference queue")
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(*args) in the pool and await the result"""
+        if self.executor is None:
+            self.start()
+        await self._acquire()
+        self._in_flight += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+            self._completed += 1
+            return result
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "size": self.max_workers,
+            "max_queue": self.max_queue,
+            "policy": self.policy,
+            "queue_timeout": self.queue_timeout,
+            "running": self.running,
+            "queue_depth": self.queue_depth,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected
+        }
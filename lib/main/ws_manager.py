@@ -1,67 +1,297 @@
 from fastapi import WebSocket
 from fastapi.websockets import WebSocketState
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional, Tuple, Union
+import asyncio
 import json
+import logging
+import os
+import time
+
+try:
+    # Optional faster encoder, output is compact JSON
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Pending messages per connection before the slow client policy applies
+SUBSCRIBER_QUEUE_SIZE = 32
+# Seconds a single send may take before the client is considered stuck
+SEND_TIMEOUT = 5.0
+# What to do when a client's queue is full:
+# - "drop_oldest": drop its oldest pending update and keep the connection
+# - "disconnect": close the connection (code 1013, try again later)
+SLOW_CLIENT_POLICIES = ("drop_oldest", "disconnect")
+
+# Queued instead of a message to make the writer close the connection
+_CLOSE = object()
+
+
+def encode_message(message: Union[dict, str]) -> Tuple[str, int]:
+    """
+    JSON-encode a message once for all recipients (orjson when installed).
+    Returns the text and its size in bytes as sent over the socket.
+    """
+    if isinstance(message, str):
+        return message, len(message.encode())
+    if orjson is not None:
+        data = orjson.dumps(message)
+        return data.decode(), len(data)
+    text = json.dumps(message)  # ASCII only, one byte per character
+    return text, len(text)
+
+
+class ClientConnection:
+    """State and send statistics of one WebSocket client"""
+    # Tens of thousands of dashboard sockets may be open, keep instances small
+    __slots__ = ("websocket", "device_id", "queue", "connected_at",
+                 "messages_sent", "bytes_sent", "last_send_ms", "dropped")
+
+    def __init__(self, websocket: WebSocket, device_id: str, queue: asyncio.Queue):
+        self.websocket = websocket
+        self.device_id = device_id
+        self.queue = queue
+        self.connected_at = time.time()
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.last_send_ms: Optional[float] = None
+        self.dropped = 0
+
+    def info(self) -> Dict[str, Union[int, float, str, None]]:
+        return {
+            "device_id": self.device_id,
+            "client": f"{self.websocket.client.host}:{self.websocket.client.port}" if self.websocket.client else None,
+            "connected_at": self.connected_at,
+            "messages_sent": self.messages_sent,
+            "bytes_sent": self.bytes_sent,
+            "last_send_ms": self.last_send_ms,
+            "dropped": self.dropped,
+            "queued": self.queue.qsize()
+        }
 
 
 class ConnectionManager:
-    """Manager for WebSocket connections"""
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}  # {device_id: [websockets]}
-        self.connection_devices: Dict[WebSocket, str] = {}  # {websocket: device_id}
+    """
+    Manager for WebSocket connections.
+
+    Every connection has its own bounded subscriber queue. publish() encodes a
+    device update once and puts the text into the queues of that device's
+    connections without awaiting any socket, and stream() sends queued updates
+    to one client as they arrive. A send that takes longer than send_timeout
+    closes that connection, so one slow client never delays the others or
+    the ingest request.
+    heartbeat() publishes a keep-alive to devices without recent updates.
 
-    async def connect(self, websocket: WebSocket, device_id: str):
+    Connections are kept in dicts keyed by websocket, so connect, disconnect
+    and the counters in stats() are O(1) regardless of the number of clients.
+    """
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE, send_timeout: Optional[float] = SEND_TIMEOUT,
+                 slow_client_policy: str = "drop_oldest"):
+        if slow_client_policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"Slow client policy must be one of {SLOW_CLIENT_POLICIES}")
+        self.active_connections: Dict[str, Dict[WebSocket, ClientConnection]] = {}  # {device_id: {websocket: connection}}
+        self.connections: Dict[WebSocket, ClientConnection] = {}  # {websocket: connection}
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.slow_client_policy = slow_client_policy
+        self.last_published: Dict[str, float] = {}  # {device_id: time.monotonic() of last publish}
+        self.total_connections = 0
+        self.accepted = 0
+        self.published = 0
+        self.sent = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+        self.timeouts = 0
+        self.slow_disconnects = 0
+
+    @classmethod
+    def from_env(cls) -> "ConnectionManager":
+        """Create manager from WS_QUEUE_SIZE, WS_SEND_TIMEOUT and WS_SLOW_CLIENT_POLICY"""
+        timeout = os.getenv("WS_SEND_TIMEOUT", str(SEND_TIMEOUT))
+        return cls(
+            queue_size=int(os.getenv("WS_QUEUE_SIZE", str(SUBSCRIBER_QUEUE_SIZE))),
+            send_timeout=float(timeout) if timeout else None,
+            slow_client_policy=os.getenv("WS_SLOW_CLIENT_POLICY", "drop_oldest")
+        )
+
+    async def connect(self, websocket: WebSocket, device_id: str) -> asyncio.Queue:
         await websocket.accept()
-        
-        if device_id not in self.active_connections:
-            self.active_connections[device_id] = []
-        
-        self.active_connections[device_id].append(websocket)
-        self.connection_devices[websocket] = device_id
-        print(f"Client connected to device {device_id}. Total connections: {len(self.active_connections[device_id])}")
+
+        connection = ClientConnection(websocket, device_id, asyncio.Queue(maxsize=self.queue_size))
+        device_connections = self.active_connections.setdefault(device_id, {})
+        device_connections[websocket] = connection
+        self.connections[websocket] = connection
+        self.total_connections += 1
+        self.accepted += 1
+        logger.info("Client connected to device %s. Total connections: %d", device_id, len(device_connections))
+        return connection.queue
 
     def disconnect(self, websocket: WebSocket):
-        device_id = self.connection_devices.get(websocket)
-        if device_id and device_id in self.active_connections:
-            self.active_connections[device_id].remove(websocket)
-            if not self.active_connections[device_id]:  # Remove empty device list
+        connection = self.connections.pop(websocket, None)
+        if connection is None:  # Already disconnected
+            return
+        device_id = connection.device_id
+        device_connections = self.active_connections.get(device_id)
+        if device_connections is not None:
+            device_connections.pop(websocket, None)
+            if not device_connections:  # Remove empty device entry
                 del self.active_connections[device_id]
-        
-        if websocket in self.connection_devices:
-            del self.connection_devices[websocket]
-        
-        print(f"Client disconnected from device {device_id}")
+        self.total_connections -= 1
 
-    async def send_personal_message(self, message: dict, websocket: WebSocket):
+        logger.info("Client disconnected from device %s", device_id)
+
+    def is_connected(self, websocket: WebSocket) -> bool:
+        return websocket in self.connections
+
+    def device_connections(self, device_id: str) -> int:
+        """Number of clients connected to a device"""
+        return len(self.active_connections.get(device_id, ()))
+
+    async def _send(self, connection: ClientConnection, text: str, size: int) -> bool:
+        """Send pre-encoded text with the per-send timeout; disconnect the client on failure"""
+        websocket = connection.websocket
         try:
             # Check if websocket is still open before sending
-            if websocket.client_state == WebSocketState.CONNECTED:
-                await websocket.send_text(json.dumps(message))
+            if websocket.client_state != WebSocketState.CONNECTED:
+                self.disconnect(websocket)
+                return False
+            started = time.perf_counter()
+            await asyncio.wait_for(websocket.send_text(text), self.send_timeout)
+            connection.last_send_ms = round((time.perf_counter() - started) * 1000, 3)
+            connection.messages_sent += 1
+            connection.bytes_sent += size
+            self.sent += 1
+            self.bytes_sent += size
+            return True
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning("Send timed out after %ss, closing slow client", self.send_timeout)
+            await self._close(websocket)
+            return False
         except Exception as e:
-            print(f"Error sending personal message: {e}")
-            # Auto-disconnect if websocket is closed
-            self.disconnect(websocket)
+            logger.warning("Error sending message: %s", e)
+        # Auto-disconnect if websocket is closed or stuck
+        self.disconnect(websocket)
+        return False
+
+    async def _close(self, websocket: WebSocket):
+        self.disconnect(websocket)
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), 1.0)
+        except Exception:
+            pass
+
+    async def send_personal_message(self, message: Union[dict, str], websocket: WebSocket):
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            await self._send(connection, *encode_message(message))
 
     async def broadcast_to_device(self, device_id: str, message: dict):
-        """Broadcast message to all clients connected to specific device"""
-        if device_id in self.active_connections:
-            disconnected = []
-            for websocket in self.active_connections[device_id]:
-                try:
-                    # Check if websocket is still connected before sending
-                    if websocket.client_state == WebSocketState.CONNECTED:
-                        await websocket.send_text(json.dumps(message))
-                    else:
-                        disconnected.append(websocket)
-                except Exception as e:
-                    print(f"Error broadcasting to device {device_id}: {e}")
-                    disconnected.append(websocket)
-            
-            # Remove disconnected websockets
-            for ws in disconnected:
-                self.disconnect(ws)
+        """
+        Broadcast message to all clients connected to specific device.
+        The message is encoded once and sent to all clients concurrently,
+        each send limited by send_timeout.
+        """
+        connections = list(self.active_connections.get(device_id, {}).values())
+        if connections:
+            text, size = encode_message(message)
+            await asyncio.gather(*(self._send(connection, text, size) for connection in connections))
 
     async def broadcast_all(self, message: dict):
         """Broadcast message to all connected clients"""
-        for device_id in self.active_connections:
-            await self.broadcast_to_device(device_id, message)
\ No newline at end of file
+        text, size = encode_message(message)
+        await asyncio.gather(*(self._send(connection, text, size) for connection in list(self.connections.values())))
+
+    def publish(self, device_id: str, message: dict) -> int:
+        """
+        Queue a device update for every client of that device. Never blocks:
+        the message is encoded once, and a client whose queue is full is
+        handled by slow_client_policy.
+        Returns the number of clients the update was queued for.
+        """
+        connections = self.active_connections.get(device_id)
+        count = 0
+        if connections:
+            encoded = encode_message(message)
+            count = len(connections)
+            for connection in list(connections.values()):
+                queue = connection.queue
+                if queue.full():
+                    if self.slow_client_policy == "disconnect":
+                        self.slow_disconnects += 1
+                        self.disconnect(connection.websocket)
+                        while not queue.empty():
+                            queue.get_nowait()
+                        queue.put_nowait(_CLOSE)
+                        continue
+                    queue.get_nowait()
+                    connection.dropped += 1
+                    self.dropped += 1
+                queue.put_nowait(encoded)
+        self.last_published[device_id] = time.monotonic()
+        self.published += 1
+        return count
+
+    async def stream(self, websocket: WebSocket):
+        """
+        Send queued updates to one client until it disconnects.
+        A writer task drains the queue while this coroutine reads from the
+        socket only to notice the disconnect; client messages are ignored.
+        """
+        connection = self.connections[websocket]
+        queue = connection.queue
+
+        async def writer():
+            while True:
+                item = await queue.get()
+                if item is _CLOSE:
+                    await self._close(websocket)
+                    return
+                if not await self._send(connection, *item):
+                    return
+
+        writer_task = asyncio.ensure_future(writer())
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            writer_task.cancel()
+
+    async def heartbeat(self, interval: float, message: Callable[[str], dict]):
+        """
+        Publish message(device_id) to every device with clients that had no
+        update in the last `interval` seconds. Runs until cancelled.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for device_id in list(self.active_connections):
+                if now - self.last_published.get(device_id, 0) >= interval:
+                    self.publish(device_id, message(device_id))
+
+    def connection_info(self, device_id: Optional[str] = None) -> List[Dict[str, Union[int, float, str, None]]]:
+        """Per-connection statistics for one device, or for all clients"""
+        if device_id is None:
+            connections = self.connections.values()
+        else:
+            connections = self.active_connections.get(device_id, {}).values()
+        return [connection.info() for connection in connections]
+
+    def stats(self) -> Dict[str, Union[int, float, str, None]]:
+        """Maintained counters only, O(1) for any number of connections"""
+        return {
+            "connections": self.total_connections,
+            "devices": len(self.active_connections),
+            "accepted": self.accepted,
+            "published": self.published,
+            "sent": self.sent,
+            "bytes_sent": self.bytes_sent,
+            "dropped": self.dropped,
+            "timeouts": self.timeouts,
+            "slow_disconnects": self.slow_disconnects,
+            "queue_size": self.queue_size,
+            "send_timeout": self.send_timeout,
+            "slow_client_policy": self.slow_client_policy,
+            "encoder": "orjson" if orjson is not None else "json"
+        }
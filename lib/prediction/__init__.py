@@ -1,18 +1,29 @@
-from .models import PredictionInput, PredictionOutput, PredictionOutputWithMessage, DataAnakInput
+from .models import PredictionInput, PredictionOutput, PredictionOutputWithMessage, DataAnakInput, ProfilAnakInput
+from .models import BatchPredictionInput, BatchPredictionItem, BatchPredictionOutput
 from .prediction import Prediction
+from .fused import FusedPrediction
 from .zscore import ZScoreCalculator
-from .parser import parser_usia_bulan, parser_usia_tahun, parser_gender, parser_usia_from_string, parse_tanggal_lahir
+from .parser import parser_usia_bulan, parser_usia_tahun, parser_gender, parser_usia_from_string, parse_tanggal_lahir, parse_usia_hari
+from .cache import PredictionCache, prediction_cache_key
 
 __all__ = [
     "PredictionInput",
     "PredictionOutput",
     "PredictionOutputWithMessage",
     "Prediction",
+    "FusedPrediction",
     "DataAnakInput",
+    "ProfilAnakInput",
+    "BatchPredictionInput",
+    "BatchPredictionItem",
+    "BatchPredictionOutput",
     "ZScoreCalculator",
     "parser_usia_bulan",
     "parser_usia_tahun",
     "parser_gender",
     "parser_usia_from_string",
-    "parse_tanggal_lahir"
+    "parse_tanggal_lahir",
+    "parse_usia_hari",
+    "PredictionCache",
+    "prediction_cache_key"
 ]
\ No newline at end of file
@@ -0,0 +1,276 @@
+"""
+Scoring massal file CSV (format stunting/data-stunting.csv) tanpa HTTP.
+
+Modul ini memakai pandas sehingga sengaja tidak di-export dari
+lib.prediction (server tidak perlu import pandas). Pakai lewat score_csv.py
+atau `from lib.prediction.bulk import score_csv`.
+"""
+import os
+import time
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .prediction import Prediction, MODEL_NAMES
+from .zscore import ZScoreCalculator
+
+logger = logging.getLogger(__name__)
+
+INPUT_COLUMNS = ("Jenis Kelamin", "BB lahir", "TB lahir", "Usia", "Berat", "Tinggi")
+NUMERIC_COLUMNS = ("BB lahir", "TB lahir", "Berat", "Tinggi")
+OUTPUT_FORMATS = ("csv", "parquet")
+
+# Kolom yang ditambahkan ke setiap baris output
+OUTPUT_COLUMNS = (
+    "usia_tahun", "usia_bulan", "zs_bbu", "zs_tbu", "zs_bbtb",
+    "pred_tbu", "pred_bbu", "pred_bbtb", "rekomendasi", "error"
+)
+
+
+def parse_usia_series(usia: pd.Series) -> pd.DataFrame:
+    """
+    Parse kolom usia "X Tahun - Y Bulan - Z Hari" secara vektor.
+    Bagian yang tidak ada dianggap 0; baris tanpa tahun, bulan maupun hari
+    bernilai NaN di semua kolom.
+
+    Returns:
+        DataFrame dengan kolom tahun, bulan, hari (float)
+    """
+    # Usia 0-5 tahun hanya punya beberapa ribu string berbeda, cukup parse nilai unik
+    codes, uniques = pd.factorize(usia.astype("string").str.lower())
+    text = pd.Series(uniques, dtype="string")
+    parts = pd.DataFrame({
+        unit: pd.to_numeric(text.str.extract(rf"(\d+)\s*{unit}", expand=False)).astype(float)
+        for unit in ("tahun", "bulan", "hari")
+    })
+    valid = parts.notna().any(axis=1)
+    parts = parts.fillna(0).where(valid).to_numpy()
+    # Kode -1 (NaN di input) menjadi baris NaN
+    parts = np.vstack([parts, np.full((1, 3), np.nan)])[codes]
+    return pd.DataFrame(parts, columns=["tahun", "bulan", "hari"], index=usia.index)
+
+
+def calculate_zscores(calculator: ZScoreCalculator, age_months: np.ndarray, weight_kg: np.ndarray,
+                      height_cm: np.ndarray, sex: np.ndarray) -> Dict[str, np.ndarray]:
+    """Z-score BB/U, TB/U, BB/TB dibulatkan 2 desimal seperti API, NaN jika tidak bisa dihitung"""
+    if calculator.engine is not None:
+        zscores = calculator.engine.calculate_zscores(age_months, weight_kg, height_cm, sex)
+        return {key: np.round(value, 2) for key, value in zscores.items()}
+
+    results = calculator.calculate_zscore_batch(
+        [int(a) for a in age_months], list(weight_kg), list(height_cm), list(sex)
+    )
+    return {
+        key: np.array([getattr(r, key) if r.calculated and getattr(r, key) is not None else np.nan for r in results], dtype=float)
+        for key in ("bbu", "tbu", "bbtb")
+    }
+
+
+def score_frame(chunk: pd.DataFrame, prediction: Prediction, calculator: ZScoreCalculator) -> pd.DataFrame:
+    """
+    Prediksi status gizi untuk satu DataFrame dengan kolom INPUT_COLUMNS.
+    Usia dan Z-score dihitung dengan cara yang sama seperti endpoint /predict,
+    ketiga model dipanggil sekali untuk semua baris valid.
+    Baris yang gagal tetap ada di output dengan kolom `error` terisi.
+
+    Returns:
+        DataFrame input ditambah kolom OUTPUT_COLUMNS
+    """
+    prediction.load()
+    n = len(chunk)
+    out = chunk.copy()
+
+    usia = parse_usia_series(chunk["Usia"])
+    usia_bulan = (usia["tahun"] * 12 + usia["bulan"]).to_numpy()
+    usia_tahun = (usia["tahun"] + usia["bulan"] / 12 + usia["hari"] / 365).to_numpy()
+    gender = chunk["Jenis Kelamin"].astype("string").str.strip().str.upper()
+    sex = gender.map({"L": "M", "P": "F"}).to_numpy(dtype=object, na_value=None)
+    numeric = {col: pd.to_numeric(chunk[col], errors="coerce").to_numpy(dtype=float) for col in NUMERIC_COLUMNS}
+
+    # Pesan error pertama yang berlaku untuk setiap baris
+    error = np.full(n, None, dtype=object)
+
+    def fail(mask, message):
+        error[pd.isna(error) & mask] = message
+
+    fail(np.isnan(usia_tahun), "Format usia tidak valid")
+    fail(pd.isna(sex), "Jenis kelamin tidak valid")
+    fail(np.any([np.isnan(v) for v in numeric.values()], axis=0), "Nilai numerik tidak valid")
+
+    zscores = {key: np.full(n, np.nan) for key in ("bbu", "tbu", "bbtb")}
+    rows = np.flatnonzero(pd.isna(error))
+    if len(rows):
+        computed = calculate_zscores(
+            calculator, usia_bulan[rows], numeric["Berat"][rows], numeric["Tinggi"][rows], sex[rows]
+        )
+        for key in zscores:
+            zscores[key][rows] = computed[key]
+    fail(~(np.isfinite(zscores["bbu"]) & np.isfinite(zscores["tbu"]) & np.isfinite(zscores["bbtb"])),
+         "Error calculating Z-scores")
+    fail(~((usia_tahun >= 1) & (usia_tahun <= 5)), "Usia harus antara 1-5 tahun")
+
+    labels = {name: np.full(n, None, dtype=object) for name in MODEL_NAMES}
+    rekomendasi = np.full(n, None, dtype=object)
+    rows = np.flatnonzero(pd.isna(error))
+    if len(rows):
+        input_data = np.column_stack([
+            prediction.encoders["gender"].transform(gender.to_numpy(dtype=object)[rows]),
+            numeric["BB lahir"][rows], numeric["TB lahir"][rows], usia_tahun[rows],
+            numeric["Berat"][rows], numeric["Tinggi"][rows],
+            zscores["bbu"][rows], zscores["tbu"][rows], zscores["bbtb"][rows]
+        ]).astype(float)
+        indices = prediction.predict_indices(input_data)
+        for name in MODEL_NAMES:
+            labels[name][rows] = prediction.encoders[name].inverse_transform(indices[name])
+
+        # Rekomendasi hanya bergantung pada kombinasi label, hitung sekali per kombinasi
+        combos = {}
+        for i in rows:
+            key = (labels["bbu"][i], labels["tbu"][i], labels["bbtb"][i])
+            if key not in combos:
+                combos[key] = prediction.penangana_gejalan(*key)
+            rekomendasi[i] = combos[key]
+
+    out["usia_tahun"] = usia_tahun
+    out["usia_bulan"] = usia_bulan
+    out["zs_bbu"] = zscores["bbu"]
+    out["zs_tbu"] = zscores["tbu"]
+    out["zs_bbtb"] = zscores["bbtb"]
+    out["pred_tbu"] = pd.array(labels["tbu"], dtype="string")
+    out["pred_bbu"] = pd.array(labels["bbu"], dtype="string")
+    out["pred_bbtb"] = pd.array(labels["bbtb"], dtype="string")
+    out["rekomendasi"] = pd.array(rekomendasi, dtype="string")
+    out["error"] = pd.array(error, dtype="string")
+    return out
+
+
+def read_chunks(path: Union[str, Path], chunksize: int, sep: str = ",") -> Iterator[pd.DataFrame]:
+    """
+    Baca CSV per potongan `chunksize` baris. Semua kolom dibaca sebagai string
+    (kolom numerik dikonversi di score_frame) agar tipe kolom output sama di
+    setiap potongan.
+    """
+    reader = pd.read_csv(path, chunksize=chunksize, sep=sep, dtype=str, keep_default_na=False, na_values=[""])
+    for chunk in reader:
+        missing = [col for col in INPUT_COLUMNS if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"Kolom tidak ditemukan di {path}: {', '.join(missing)}")
+        yield chunk.astype("string")
+
+
+class CsvChunkWriter:
+    """Tulis potongan DataFrame ke satu file CSV (header hanya sekali)"""
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.header = True
+
+    def write(self, frame: pd.DataFrame):
+        frame.to_csv(self.path, mode="w" if self.header else "a", header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        if self.header:
+            # Input kosong: tetap buat file kosong
+            self.path.write_text("")
+
+
+class ParquetChunkWriter:
+    """Tulis potongan DataFrame ke satu file Parquet (satu row group per potongan). Butuh pyarrow"""
+    def __init__(self, path: Union[str, Path]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Output Parquet membutuhkan pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.pq = pq
+        self.path = Path(path)
+        self.writer = None
+
+    def write(self, frame: pd.DataFrame):
+        table = self.pa.Table.from_pandas(frame, preserve_index=False)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        else:
+            table = table.cast(self.writer.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def output_format_for(path: Union[str, Path]) -> str:
+    return "parquet" if Path(path).suffix.lower() in (".parquet", ".pq") else "csv"
+
+
+# Model dan kalkulator per proses worker (dibuat di _init_worker)
+_worker_state = None
+
+
+def _init_worker(backend: str):
+    global _worker_state
+    _worker_state = (Prediction(backend=backend, lazy=True), ZScoreCalculator())
+
+
+def _score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    return score_frame(chunk, *_worker_state)
+
+
+def score_csv(input_path: Union[str, Path], output_path: Union[str, Path], chunksize: int = 50000,
+              workers: int = 1, backend: str = "inplace", output_format: Optional[str] = None,
+              sep: str = ",") -> Dict[str, float]:
+    """
+    Scoring file CSV secara streaming.
+
+    Hanya `chunksize` baris per potongan (dan paling banyak 2 potongan per
+    worker yang sedang diproses) yang ada di memori, sehingga pemakaian memori
+    tetap untuk file berapa pun besarnya. Dengan workers > 1 potongan dibagi ke
+    beberapa proses; urutan baris output tetap sama dengan input.
+
+    Returns:
+        dict berisi jumlah baris, baris gagal, potongan dan durasi (detik)
+    """
+    output_format = output_format or output_format_for(output_path)
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Format output harus salah satu dari {OUTPUT_FORMATS}")
+    if workers < 1:
+        workers = os.cpu_count() or 1
+
+    writer = ParquetChunkWriter(output_path) if output_format == "parquet" else CsvChunkWriter(output_path)
+    stats = {"rows": 0, "failed": 0, "chunks": 0}
+    started = time.perf_counter()
+
+    def write(frame: pd.DataFrame):
+        writer.write(frame)
+        stats["rows"] += len(frame)
+        stats["failed"] += int(frame["error"].notna().sum())
+        stats["chunks"] += 1
+        logger.info(f"Chunk {stats['chunks']}: {stats['rows']} baris selesai")
+
+    try:
+        chunks = read_chunks(input_path, chunksize, sep=sep)
+        if workers == 1:
+            _init_worker(backend)
+            for chunk in chunks:
+                write(_score_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(backend,)) as executor:
+                # Batasi potongan yang menunggu agar file tidak terbaca seluruhnya ke memori
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(executor.submit(_score_chunk, chunk))
+                    if len(pending) >= workers * 2:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    finally:
+        writer.close()
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
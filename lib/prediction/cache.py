@@ -0,0 +1,109 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .models import DataAnakInput
+from .parser import parse_usia_hari
+
+
+def prediction_cache_key(data: DataAnakInput) -> Tuple:
+    """
+    Key cache dari field DataAnakInput yang mempengaruhi hasil prediksi.
+    Nilai dipakai apa adanya (tanpa normalisasi atau pembulatan): input yang
+    berbeda bisa memberi hasil atau error yang berbeda, jadi hit cache tidak
+    boleh mengubah response.
+    Usia dihitung dalam hari dari tanggal hari ini (bukan tanggal_lahir),
+    sehingga hasil otomatis tidak dipakai lagi saat hari berganti.
+    Nama anak tidak mempengaruhi hasil sehingga tidak masuk key.
+    """
+    return (
+        data.jenis_kelamin,
+        data.bb_lahir,
+        data.tb_lahir,
+        parse_usia_hari(data.tanggal_lahir),
+        data.berat,
+        data.tinggi
+    )
+
+
+class PredictionCache:
+    """
+    Cache LRU dengan batas ukuran dan TTL untuk hasil prediksi
+    (Z-score + model). Aman dipakai dari beberapa thread.
+
+    Parameters:
+    - max_size: jumlah maksimum entry (0 = cache dimatikan)
+    - ttl: umur maksimum entry dalam detik (None = tanpa batas)
+    """
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls) -> "PredictionCache":
+        """Buat cache dari environment variable PREDICT_CACHE_SIZE dan PREDICT_CACHE_TTL"""
+        ttl = os.getenv("PREDICT_CACHE_TTL", "3600")
+        return cls(
+            max_size=int(os.getenv("PREDICT_CACHE_SIZE", "1024")),
+            ttl=float(ttl) if ttl else None
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Ambil hasil dari cache, None jika tidak ada atau sudah kedaluwarsa"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """Simpan hasil ke cache, buang entry paling lama jika penuh"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,40 @@
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Union
+
+import numpy as np
+
+
+class ClassEncoder:
+    """
+    Pengganti ringan sklearn LabelEncoder untuk inferensi.
+
+    Hanya menyimpan classes_ (urutan sama seperti LabelEncoder) sehingga
+    encoder bisa dimuat dari JSON tanpa unpickle dan tanpa import sklearn.
+    """
+    def __init__(self, classes: Iterable[str]):
+        self.classes_ = np.asarray(list(classes), dtype=object)
+        self._index = {label: i for i, label in enumerate(self.classes_)}
+
+    def transform(self, labels: Iterable[str]) -> np.ndarray:
+        """Label -> index kelas"""
+        try:
+            return np.array([self._index[label] for label in labels], dtype=int)
+        except KeyError as e:
+            raise ValueError(f"y contains previously unseen labels: {e.args[0]!r}")
+
+    def inverse_transform(self, indices: Iterable[int]) -> np.ndarray:
+        """Index kelas -> label"""
+        return self.classes_[np.asarray(indices, dtype=int)]
+
+
+def save_encoders(encoders: Dict, path: Union[str, Path]):
+    """Simpan classes_ setiap encoder (LabelEncoder atau ClassEncoder) ke file JSON"""
+    data = {name: [str(label) for label in encoder.classes_] for name, encoder in encoders.items()}
+    Path(path).write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def load_encoders(path: Union[str, Path]) -> Dict[str, ClassEncoder]:
+    """Load encoder dari file JSON hasil save_encoders()"""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    return {name: ClassEncoder(classes) for name, classes in data.items()}
@@ -0,0 +1,112 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Union
+
+import numpy as np
+
+from .models import PredictionInput, PredictionOutput
+from .native import NativeTreeModel
+from .prediction import Prediction, NATIVE_MAX_ROWS
+
+logger = logging.getLogger(__name__)
+
+TARGETS = ('tbu', 'bbu', 'bbtb')
+
+
+class FusedPrediction(Prediction):
+    """
+    Prediksi TB/U, BB/U dan BB/TB dalam satu pemanggilan.
+
+    Pengganti langsung Prediction.predict / predict_batch:
+    - input divalidasi dan dikonversi ke matriks fitur satu kali
+    - untuk input kecil ketiga ensemble digabung menjadi satu NativeTreeModel
+      sehingga semua pohon ditelusuri dalam satu langkah
+    - untuk batch besar ketiga Booster dipanggil dengan inplace_predict,
+      opsional paralel di thread terpisah (parallel=True)
+    - label didekode dari array index -> string, tanpa LabelEncoder
+    """
+    def __init__(self, parallel: bool = None, lazy: bool = False, model_format: str = None):
+        if parallel is None:
+            parallel = os.getenv("PREDICT_FUSED_PARALLEL", "0").lower() in ("1", "true", "yes")
+        self.parallel = parallel
+        self.executor = ThreadPoolExecutor(max_workers=len(TARGETS), thread_name_prefix="fused") if parallel else None
+        super().__init__(backend='native', lazy=lazy, model_format=model_format)
+
+    def _load_models(self):
+        super()._load_models()
+        self.fused = NativeTreeModel.concatenate([self.native[name] for name in TARGETS])
+        # Kolom margin gabungan untuk setiap target
+        bounds = np.cumsum([0] + [self.native[name].num_class for name in TARGETS])
+        self.target_columns = {name: (bounds[i], bounds[i + 1]) for i, name in enumerate(TARGETS)}
+        self.labels = {name: np.asarray(self.encoders[name].classes_, dtype=object) for name in TARGETS}
+        self.gender_codes = {g: i for i, g in enumerate(self.encoders['gender'].classes_)}
+
+    def __features(self, rows: List[PredictionInput]) -> np.ndarray:
+        return np.array([
+            [
+                self.gender_codes[row.jenis_kelamin], row.bb_lahir, row.tb_lahir, row.usia,
+                row.berat, row.tinggi, row.zs_bbu, row.zs_tbu, row.zs_bbtb
+            ]
+            for row in rows
+        ], dtype=float)
+
+    def __predict_booster(self, name: str, input_data: np.ndarray) -> np.ndarray:
+        proba = self._get_booster(name).inplace_predict(input_data, iteration_range=self.iteration_range[name])
+        return np.argmax(proba, axis=1)
+
+    def predict_indices(self, input_data: np.ndarray) -> dict:
+        """Index kelas untuk ketiga target dari satu matriks fitur N x 9"""
+        self.load()
+        if len(input_data) <= NATIVE_MAX_ROWS:
+            margin = self.fused.predict_margin(input_data)
+            return {
+                name: np.argmax(margin[:, start:end], axis=1)
+                for name, (start, end) in self.target_columns.items()
+            }
+        if self.executor is not None:
+            futures = {name: self.executor.submit(self.__predict_booster, name, input_data) for name in TARGETS}
+            return {name: future.result() for name, future in futures.items()}
+        return {name: self.__predict_booster(name, input_data) for name in TARGETS}
+
+    def predict_batch(self, data: List[PredictionInput]) -> List[Union[PredictionOutput, Exception]]:
+        """Sama seperti Prediction.predict_batch, dengan ketiga model dievaluasi bersamaan"""
+        self.load()
+        results: List[Union[PredictionOutput, Exception]] = [None] * len(data)
+        valid_index = []
+        for i, row in enumerate(data):
+            try:
+                self._validate(row)
+                valid_index.append(i)
+            except Exception as e:
+                results[i] = e
+
+        if not valid_index:
+            return results
+
+        try:
+            indices = self.predict_indices(self.__features([data[i] for i in valid_index]))
+        except Exception as e:
+            logger.error("Error during fused prediction: %s", e)
+            for i in valid_index:
+                results[i] = e
+            return results
+
+        hasil = {name: self.labels[name][indices[name]] for name in TARGETS}
+        for n, i in enumerate(valid_index):
+            results[i] = PredictionOutput(
+                tbu=hasil['tbu'][n],
+                bbu=hasil['bbu'][n],
+                bbtb=hasil['bbtb'][n]
+            )
+        return results
+
+    def predict(self, data: PredictionInput):
+        """
+        Melakukan prediksi status gizi anak berdasarkan input
+        """
+        result = self.predict_batch([data])[0]
+        if isinstance(result, Exception):
+            logger.error("Error during prediction: %s", result)
+            raise result
+        return result
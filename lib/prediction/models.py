@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class DataAnakInput(BaseModel):
     """
@@ -29,6 +29,30 @@ class DataAnakInput(BaseModel):
     berat: float
     tinggi: float
 
+class ProfilAnakInput(BaseModel):
+    """
+    Input model for child profile without current measurement, used by
+    session mode (/trigger/{did}). Berat dan tinggi diambil dari device.
+    Parameters:
+    ```
+    nama : str
+        Nama anak
+    jenis_kelamin : str
+        Jenis kelamin ('L' untuk laki-laki, 'P' untuk perempuan)
+    bb_lahir : float
+        Berat badan lahir dalam kg (contoh: 3.2)
+    tb_lahir : float
+        Tinggi badan lahir dalam cm (contoh: 50)
+    tanggal_lahir : str
+        Format `YYYY-MM-DD`
+    ```
+    """
+    nama: str
+    jenis_kelamin: str
+    bb_lahir: float
+    tb_lahir: float
+    tanggal_lahir: str
+
 class PredictionInput(BaseModel):
     """
     Input model for stunting prediction. Parameters:
@@ -105,4 +129,41 @@ class PredictionOutputWithMessage(BaseModel):
     Output model for prediction results with message
     """
     data: PredictionOutput
-    message: str
\ No newline at end of file
+    message: str
+
+class BatchPredictionInput(BaseModel):
+    """
+    Input model for batch stunting prediction
+    data: List[DataAnakInput]
+        Daftar data anak yang akan diprediksi sekaligus
+    """
+    data: List[DataAnakInput]
+
+class BatchPredictionItem(BaseModel):
+    """
+    Output model for a single row of batch prediction
+    index: int
+        Posisi data pada input batch
+    success: bool
+        Status apakah prediksi untuk baris ini berhasil
+    data: Optional[PredictionOutput]
+        Hasil prediksi (None jika gagal)
+    message: Optional[str]
+        Rekomendasi penanganan (None jika gagal)
+    error: Optional[str]
+        Pesan error (None jika berhasil)
+    """
+    index: int
+    success: bool
+    data: Optional[PredictionOutput] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchPredictionOutput(BaseModel):
+    """
+    Output model for batch stunting prediction results
+    """
+    total: int
+    success: int
+    failed: int
+    results: List[BatchPredictionItem]
@@ -0,0 +1,217 @@
+import json
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+
+
+class NativeTreeModel:
+    """
+    Ensemble pohon XGBoost (multi:softprob) dalam bentuk array NumPy.
+
+    Semua node dari semua pohon disimpan dalam array datar sehingga semua
+    pohon bisa dievaluasi bersamaan, satu langkah kedalaman per iterasi:
+    - feature, threshold: fitur dan batas split (float32 seperti XGBoost)
+    - left, right: index absolut anak; node daun menunjuk ke dirinya sendiri
+      (threshold daun = +inf dan default_left = True sehingga selalu ke kiri)
+    - default_left: arah untuk nilai yang hilang (NaN)
+    - value: nilai daun (0 untuk node non-daun)
+    - roots: index node akar setiap pohon, dikelompokkan per kelas
+      (urutan boosting dalam satu kelas tetap). Pohon pertama setiap kelas
+      adalah daun tunggal berisi base_score.
+    - class_offsets: batas kelompok pohon per kelas pada roots
+
+    Hanya pohon sampai best_iteration yang disimpan, sama seperti
+    XGBClassifier.predict. Margin dijumlahkan berurutan dalam float32
+    sehingga hasilnya bit-identik dengan XGBoost.
+    """
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, default_left: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, class_offsets: np.ndarray, max_depth: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.class_offsets = class_offsets
+        self.num_class = len(class_offsets) - 1
+        self.max_depth = int(max_depth)
+        # XGBoost mengalokasikan anak kanan tepat setelah anak kiri, sehingga
+        # node berikutnya cukup dihitung sebagai left + (tidak ke kiri)
+        internal = left != np.arange(len(left))
+        self.adjacent = bool(np.all(right[internal] == left[internal] + 1))
+
+    @property
+    def num_trees(self) -> int:
+        """Jumlah pohon boosting (tanpa pohon base_score)"""
+        return len(self.roots) - self.num_class
+
+    @classmethod
+    def from_booster(cls, booster, iteration_end: Optional[int] = None) -> "NativeTreeModel":
+        """
+        Kompilasi xgboost.Booster menjadi array.
+        iteration_end: jumlah iterasi boosting yang dipakai
+        (default best_iteration + 1 jika ada, selain itu semua iterasi)
+        """
+        model = json.loads(booster.save_raw("json"))
+        learner = model["learner"]
+        objective = learner["objective"]["name"]
+        if objective != "multi:softprob":
+            raise ValueError(f"Unsupported objective: {objective}")
+
+        num_class = int(learner["learner_model_param"]["num_class"])
+        base_score = np.float32(learner["learner_model_param"]["base_score"])
+        gbtree = learner["gradient_booster"]["model"]
+        trees = gbtree["trees"]
+        tree_info = gbtree["tree_info"]
+
+        if iteration_end is None:
+            best_iteration = booster.attr("best_iteration")
+            iteration_end = int(best_iteration) + 1 if best_iteration is not None else len(trees) // num_class
+        trees = trees[:iteration_end * num_class]
+        tree_info = tree_info[:iteration_end * num_class]
+
+        feature, threshold, left, right, default_left, value = [], [], [], [], [], []
+        roots, class_offsets = [], [0]
+        max_depth = 0
+        offset = 0
+
+        def add_leaf(leaf_value):
+            nonlocal offset
+            feature.append(np.zeros(1, dtype=np.int32))
+            threshold.append(np.full(1, np.inf, dtype=np.float32))
+            left.append(np.array([offset], dtype=np.int32))
+            right.append(np.array([offset], dtype=np.int32))
+            default_left.append(np.ones(1, dtype=bool))
+            value.append(np.array([leaf_value], dtype=np.float32))
+            roots.append(offset)
+            offset += 1
+
+        for c in range(num_class):
+            # Margin awal setiap kelas = base_score
+            add_leaf(base_score)
+            for t in (t for t, group in enumerate(tree_info) if group == c):
+                tree = trees[t]
+                if any(tree["split_type"]):
+                    raise ValueError("Categorical splits are not supported")
+                lc = np.asarray(tree["left_children"], dtype=np.int32)
+                rc = np.asarray(tree["right_children"], dtype=np.int32)
+                n = len(lc)
+                is_leaf = lc == -1
+                nodes = np.arange(n, dtype=np.int32)
+                conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+
+                feature.append(np.where(is_leaf, 0, np.asarray(tree["split_indices"], dtype=np.int32)).astype(np.int32))
+                threshold.append(np.where(is_leaf, np.inf, conditions).astype(np.float32))
+                left.append(np.where(is_leaf, nodes, lc) + offset)
+                right.append(np.where(is_leaf, nodes, rc) + offset)
+                default_left.append(np.asarray(tree["default_left"], dtype=bool) | is_leaf)
+                value.append(np.where(is_leaf, conditions, 0).astype(np.float32))
+                roots.append(offset)
+                offset += n
+
+                # Kedalaman pohon untuk menentukan jumlah langkah evaluasi
+                depth = np.zeros(n, dtype=np.int32)
+                for node in range(n):
+                    if not is_leaf[node]:
+                        depth[lc[node]] = depth[node] + 1
+                        depth[rc[node]] = depth[node] + 1
+                max_depth = max(max_depth, int(depth.max()))
+            class_offsets.append(len(roots))
+
+        return cls(
+            np.concatenate(feature), np.concatenate(threshold),
+            np.concatenate(left).astype(np.int32), np.concatenate(right).astype(np.int32),
+            np.concatenate(default_left), np.concatenate(value),
+            np.asarray(roots, dtype=np.int32), np.asarray(class_offsets, dtype=np.int32), max_depth
+        )
+
+    @classmethod
+    def concatenate(cls, models: List["NativeTreeModel"]) -> "NativeTreeModel":
+        """
+        Gabungkan beberapa model menjadi satu model dengan kelas berurutan,
+        sehingga semua ensemble dievaluasi dalam satu kali penelusuran pohon.
+        Margin model ke-i ada pada kolom setelah kelas semua model sebelumnya.
+        """
+        node_offsets = np.cumsum([0] + [len(m.feature) for m in models])
+        root_offsets = np.cumsum([0] + [len(m.roots) for m in models])
+        return cls(
+            np.concatenate([m.feature for m in models]),
+            np.concatenate([m.threshold for m in models]),
+            np.concatenate([m.left + o for m, o in zip(models, node_offsets)]).astype(np.int32),
+            np.concatenate([m.right + o for m, o in zip(models, node_offsets)]).astype(np.int32),
+            np.concatenate([m.default_left for m in models]),
+            np.concatenate([m.value for m in models]),
+            np.concatenate([m.roots + o for m, o in zip(models, node_offsets)]).astype(np.int32),
+            np.concatenate([[0]] + [m.class_offsets[1:] + o for m, o in zip(models, root_offsets)]).astype(np.int32),
+            max(m.max_depth for m in models)
+        )
+
+    def save(self, path: Union[str, Path]):
+        """Simpan array ke file .npz (tanpa kompresi agar bisa di-mmap)"""
+        np.savez(
+            path,
+            feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+            default_left=self.default_left, value=self.value, roots=self.roots,
+            class_offsets=self.class_offsets, max_depth=np.array(self.max_depth)
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "NativeTreeModel":
+        """Load dari file .npz hasil save()"""
+        with np.load(path) as data:
+            return cls(
+                data["feature"], data["threshold"], data["left"], data["right"],
+                data["default_left"], data["value"], data["roots"],
+                data["class_offsets"], int(data["max_depth"])
+            )
+
+    def leaf_values(self, X: np.ndarray) -> np.ndarray:
+        """Nilai daun setiap pohon untuk setiap baris, shape (n_rows, n_trees + num_class)"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        n_rows, n_features = X.shape
+        flat_x = X.ravel()
+        has_missing = np.isnan(flat_x).any()
+
+        if n_rows == 1:
+            node = self.roots
+            row_offset = 0
+        else:
+            node = np.broadcast_to(self.roots, (n_rows, len(self.roots)))
+            row_offset = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+
+        for _ in range(self.max_depth):
+            x = flat_x[self.feature[node] + row_offset]
+            go_left = x < self.threshold[node]
+            if has_missing:
+                go_left = np.where(np.isnan(x), self.default_left[node], go_left)
+            if self.adjacent:
+                node = self.left[node] + ~go_left
+            else:
+                node = np.where(go_left, self.left[node], self.right[node])
+        values = self.value[node]
+        return values[None, :] if n_rows == 1 else values
+
+    def predict_margin(self, X: np.ndarray) -> np.ndarray:
+        """Margin (sebelum softmax) per kelas, shape (n_rows, num_class)"""
+        leaves = self.leaf_values(X)
+        margin = np.empty((leaves.shape[0], self.num_class), dtype=np.float32)
+        for c in range(self.num_class):
+            start, end = self.class_offsets[c], self.class_offsets[c + 1]
+            # Penjumlahan berurutan float32 (bukan pairwise) seperti XGBoost
+            margin[:, c] = np.cumsum(leaves[:, start:end], axis=1, dtype=np.float32)[:, -1]
+        return margin
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Probabilitas softmax per kelas"""
+        margin = self.predict_margin(X)
+        exp = np.exp(margin - margin.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Index kelas hasil prediksi, sama seperti XGBClassifier.predict"""
+        return np.argmax(self.predict_margin(X), axis=1)
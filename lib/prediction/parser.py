@@ -1,5 +1,9 @@
+import logging
+
 from .models import ParsingUsiaOutput
 
+logger = logging.getLogger(__name__)
+
 def parser_usia_bulan(tahun: int, bulan: int) -> int:
     """Menghitung usia dalam bulan"""
     return tahun * 12 + bulan
@@ -36,28 +40,33 @@ def parser_usia_from_string(usia_str: str) -> ParsingUsiaOutput:
             hari=hari_val
         )      
     except Exception as e:
-        print(f"Error parsing usia '{usia_str}': {e}")
+        logger.warning("Error parsing usia '%s': %s", usia_str, e)
         raise ValueError("Format usia tidak valid")
 
-# parse tanggal lahir (timestamp) return tahun, bulan, hari anak itu sekarang
-def parse_tanggal_lahir(tanggal_lahir: str) -> ParsingUsiaOutput:
-    """Parser tanggal lahir dari string format 'YYYY-MM-DD' menjadi tahun, bulan, hari"""
+# parse tanggal lahir (timestamp) return usia anak dalam hari sampai sekarang
+def parse_usia_hari(tanggal_lahir: str) -> int:
+    """Parser tanggal lahir dari string format 'YYYY-MM-DD' menjadi usia dalam hari"""
     from datetime import datetime
     
     try:
         date_obj = datetime.strptime(tanggal_lahir, '%Y-%m-%d')
         today = datetime.now()
-        delta = today - date_obj
-        
-        tahun = delta.days // 365
-        bulan = (delta.days % 365) // 30
-        hari = (delta.days % 365) % 30
-        
-        return ParsingUsiaOutput(
-            tahun=tahun,
-            bulan=bulan,
-            hari=hari
-        )
+        return (today - date_obj).days
     except ValueError as e:
-        print(f"Error parsing tanggal lahir '{tanggal_lahir}': {e}")
-        raise ValueError("Format tanggal lahir tidak valid")
\ No newline at end of file
+        logger.warning("Error parsing tanggal lahir '%s': %s", tanggal_lahir, e)
+        raise ValueError("Format tanggal lahir tidak valid")
+
+# parse tanggal lahir (timestamp) return tahun, bulan, hari anak itu sekarang
+def parse_tanggal_lahir(tanggal_lahir: str) -> ParsingUsiaOutput:
+    """Parser tanggal lahir dari string format 'YYYY-MM-DD' menjadi tahun, bulan, hari"""
+    days = parse_usia_hari(tanggal_lahir)
+    
+    tahun = days // 365
+    bulan = (days % 365) // 30
+    hari = (days % 365) % 30
+    
+    return ParsingUsiaOutput(
+        tahun=tahun,
+        bulan=bulan,
+        hari=hari
+    )
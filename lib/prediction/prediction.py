@@ -1,84 +1,186 @@
+import os
 import sys
-import joblib
-import numpy as np
-import pandas as pd
+import logging
+import threading
 import warnings
-import os
+import numpy as np
 from pathlib import Path
+from typing import List, Union
 warnings.filterwarnings('ignore')
 
 from .models import PredictionInput, PredictionOutput
+from .native import NativeTreeModel
+from .encoders import load_encoders
+
+logger = logging.getLogger(__name__)
+
+# Backend untuk evaluasi model:
+# - sklearn: XGBClassifier.predict (default)
+# - inplace: Booster.inplace_predict tanpa wrapper sklearn
+# - native: NativeTreeModel (array NumPy hasil export_models.py) untuk input kecil,
+#   inplace_predict untuk batch yang lebih besar dari NATIVE_MAX_ROWS
+BACKENDS = ('sklearn', 'inplace', 'native')
+NATIVE_MAX_ROWS = 8
+
+# Format file model:
+# - ubj: model_{name}.ubj (XGBoost UBJSON) + encoders.json hasil export_models.py,
+#   dimuat tanpa unpickle dan tanpa sklearn LabelEncoder
+# - pickle: model_{name}.pkl + encoders.pkl (format asli notebook training)
+# - auto: ubj jika semua file tersedia, selain itu pickle
+MODEL_FORMATS = ('auto', 'ubj', 'pickle')
+MODEL_NAMES = ('tbu', 'bbu', 'bbtb')
+
+# Navigate to project root and find models directory (2 levels up from lib/prediction/)
+MODELS_DIR = Path(__file__).parent.parent.parent / "models"
 
 class Prediction:
-    def __init__(self):
-        """Inisialisasi class dan load model"""
+    def __init__(self, backend: str = None, lazy: bool = False, model_format: str = None):
+        """
+        Inisialisasi class dan load model.
+        lazy=True menunda load model (dan import xgboost) sampai load()
+        dipanggil atau prediksi pertama, misalnya di lifespan FastAPI
+        """
+        self.backend = backend or os.getenv("PREDICT_BACKEND", "sklearn")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Backend harus salah satu dari {BACKENDS}")
+        self.model_format = model_format or os.getenv("PREDICT_MODEL_FORMAT", "auto")
+        if self.model_format not in MODEL_FORMATS:
+            raise ValueError(f"Format model harus salah satu dari {MODEL_FORMATS}")
+        self.modelpath = MODELS_DIR
         self.models = {}
         self.encoders = {}
-        self.__load_models()
-    
-    def __load_models(self):
-        """Load semua model dan encoder dari file .pkl"""
-        try:
-            print("🔄 Loading model dan encoder...")
-
-            # Auto-detect model path
-            # Get current file directory
-            current_dir = Path(__file__).parent
-            # Navigate to project root and find models directory
-            project_root = current_dir.parent.parent  # Go up 2 levels from lib/prediction/
-            modelpath = project_root / "models"
-            
-            # Convert to string for compatibility
-            modelpath_str = str(modelpath) + os.sep
-            
-            print(f"📁 Model path: {modelpath_str}")
-            
-            # Check if models directory exists
-            if not modelpath.exists():
-                raise FileNotFoundError(f"Models directory not found: {modelpath}")
-            
-            # Load model XGBoost
-            self.models['tbu'] = joblib.load(modelpath_str + "model_tbu.pkl")
-            self.models['bbu'] = joblib.load(modelpath_str + "model_bbu.pkl")
-            self.models['bbtb'] = joblib.load(modelpath_str + "model_bbtb.pkl")
-
-            # Load encoders
-            self.encoders = joblib.load(modelpath_str + "encoders.pkl")
-
-            print("✅ Model dan encoder berhasil dimuat!")
-            print(f"   - Model TB/U: {type(self.models['tbu']).__name__}")
-            print(f"   - Model BB/U: {type(self.models['bbu']).__name__}")
-            print(f"   - Model BB/TB: {type(self.models['bbtb']).__name__}")
-            
-        except FileNotFoundError as e:
-            print(f"❌ Error: File model tidak ditemukan - {e}")
-            print("   Pastikan file .pkl ada di direktori models/")
-            sys.exit(1)
-        except Exception as e:
-            print(f"❌ Error loading model: {e}")
-            sys.exit(1)
-    
+        self.boosters = {}
+        self.iteration_range = {}
+        self.native = {}
+        self.loaded = False
+        self._load_lock = threading.RLock()
+        if not lazy:
+            try:
+                self.load()
+            except Exception:
+                sys.exit(1)
+
+    def load(self):
+        """Load model dan encoder sekali saja, aman dipanggil dari beberapa thread"""
+        if self.loaded:
+            return
+        with self._load_lock:
+            if self.loaded:
+                return
+            try:
+                self._load_models()
+            except FileNotFoundError as e:
+                logger.error(f"File model tidak ditemukan - {e}. Pastikan file model ada di direktori models/")
+                raise
+            except Exception as e:
+                logger.error(f"Error loading model: {e}")
+                raise
+            self.loaded = True
+
+    def _resolve_format(self) -> str:
+        if self.model_format != 'auto':
+            return self.model_format
+        files = [f"model_{name}.ubj" for name in MODEL_NAMES] + ["encoders.json"]
+        return 'ubj' if all((self.modelpath / f).exists() for f in files) else 'pickle'
+
+    def _read_booster(self, name: str):
+        """Load xgboost.Booster untuk model `name` beserta iteration_range-nya"""
+        if self._resolve_format() == 'ubj':
+            import xgboost as xgb
+            booster = xgb.Booster(model_file=str(self.modelpath / f"model_{name}.ubj"))
+        else:
+            import joblib
+            booster = joblib.load(self.modelpath / f"model_{name}.pkl").get_booster()
+        # Sama seperti XGBClassifier.predict: pakai best_iteration jika ada
+        best_iteration = booster.attr("best_iteration")
+        self.iteration_range[name] = (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+        return booster
+
+    def _get_booster(self, name: str):
+        """Booster model `name`; untuk backend native baru dimuat saat batch besar pertama"""
+        booster = self.boosters.get(name)
+        if booster is None:
+            with self._load_lock:
+                if name not in self.boosters:
+                    self.boosters[name] = self._read_booster(name)
+                booster = self.boosters[name]
+        return booster
+
+    def _load_models(self):
+        """Load semua model dan encoder sesuai backend dan format model"""
+        if not self.modelpath.exists():
+            raise FileNotFoundError(f"Models directory not found: {self.modelpath}")
+
+        model_format = self._resolve_format()
+        logger.info(f"Loading model dan encoder dari {self.modelpath} (format: {model_format}, backend: {self.backend})")
+
+        if model_format == 'ubj':
+            self.encoders = load_encoders(self.modelpath / "encoders.json")
+        else:
+            import joblib
+            self.encoders = joblib.load(self.modelpath / "encoders.pkl")
+
+        for name in MODEL_NAMES:
+            if self.backend == 'sklearn':
+                if model_format == 'ubj':
+                    import xgboost as xgb
+                    self.models[name] = xgb.XGBClassifier()
+                    self.models[name].load_model(str(self.modelpath / f"model_{name}.ubj"))
+                else:
+                    import joblib
+                    self.models[name] = joblib.load(self.modelpath / f"model_{name}.pkl")
+            elif self.backend == 'inplace':
+                self.boosters[name] = self._read_booster(name)
+            else:
+                # Pakai hasil export_models.py jika ada, selain itu kompilasi langsung
+                native_file = self.modelpath / f"model_{name}.npz"
+                if native_file.exists():
+                    self.native[name] = NativeTreeModel.load(native_file)
+                else:
+                    self.native[name] = NativeTreeModel.from_booster(self._get_booster(name))
+
+        logger.info(f"Model dan encoder berhasil dimuat: {', '.join(MODEL_NAMES)}")
+
+    def __predict_index(self, name: str, input_data: np.ndarray) -> np.ndarray:
+        """Index kelas hasil prediksi model `name` sesuai backend"""
+        if self.backend == 'native' and len(input_data) <= NATIVE_MAX_ROWS:
+            return self.native[name].predict(input_data)
+        if self.backend in ('inplace', 'native'):
+            proba = self._get_booster(name).inplace_predict(input_data, iteration_range=self.iteration_range[name])
+            return np.argmax(proba, axis=1)
+        return self.models[name].predict(input_data)
+
+    def predict_indices(self, input_data: np.ndarray) -> dict:
+        """Index kelas untuk ketiga target dari satu matriks fitur N x 9"""
+        self.load()
+        return {name: self.__predict_index(name, input_data) for name in MODEL_NAMES}
+
+    def _validate(self, data: PredictionInput):
+        """Validasi input sebelum prediksi"""
+        if data.jenis_kelamin not in ['L', 'P']:
+            raise ValueError("Jenis kelamin harus 'L' atau 'P'")
+        
+        if not (1 <= data.usia <= 5):
+            raise ValueError("Usia harus antara 1-5 tahun")
+
     def predict(self, data: PredictionInput):
         """
         Melakukan prediksi status gizi anak berdasarkan input
         """
         try:
-            if data.jenis_kelamin not in ['L', 'P']:
-                raise ValueError("Jenis kelamin harus 'L' atau 'P'")
-            
-            if not (1 <= data.usia <= 5):
-                raise ValueError("Usia harus antara 1-5 tahun")
+            self.load()
+            self._validate(data)
 
             gender_encoded = self.encoders['gender'].transform([data.jenis_kelamin])[0]
 
             input_data = np.array([[
                 gender_encoded, data.bb_lahir, data.tb_lahir, data.usia,
                 data.berat, data.tinggi, data.zs_bbu, data.zs_tbu, data.zs_bbtb
-            ]])
+            ]], dtype=float)
             
-            pred_tbu = self.models['tbu'].predict(input_data)[0]
-            pred_bbu = self.models['bbu'].predict(input_data)[0]
-            pred_bbtb = self.models['bbtb'].predict(input_data)[0]
+            pred_tbu = self.__predict_index('tbu', input_data)[0]
+            pred_bbu = self.__predict_index('bbu', input_data)[0]
+            pred_bbtb = self.__predict_index('bbtb', input_data)[0]
             
             hasil_tbu = self.encoders['tbu'].inverse_transform([pred_tbu])[0]
             hasil_bbu = self.encoders['bbu'].inverse_transform([pred_bbu])[0]  
@@ -91,9 +193,60 @@ class Prediction:
             )
             
         except Exception as e:
-            print(f"❌ Error during prediction: {e}")
+            logger.error("Error during prediction: %s", e)
             raise
     
+    def predict_batch(self, data: List[PredictionInput]) -> List[Union[PredictionOutput, Exception]]:
+        """
+        Melakukan prediksi status gizi untuk banyak anak sekaligus.
+        Semua baris valid digabung menjadi satu matriks N x 9 sehingga
+        setiap model hanya dipanggil sekali per batch.
+
+        Returns:
+            List dengan panjang sama seperti input. Setiap elemen berisi
+            PredictionOutput jika berhasil, atau Exception jika baris tersebut gagal
+        """
+        self.load()
+        results: List[Union[PredictionOutput, Exception]] = [None] * len(data)
+        valid_index = []
+        for i, row in enumerate(data):
+            try:
+                self._validate(row)
+                valid_index.append(i)
+            except Exception as e:
+                results[i] = e
+
+        if not valid_index:
+            return results
+
+        rows = [data[i] for i in valid_index]
+        gender_encoded = self.encoders['gender'].transform([row.jenis_kelamin for row in rows])
+        input_data = np.array([
+            [
+                gender_encoded[n], row.bb_lahir, row.tb_lahir, row.usia,
+                row.berat, row.tinggi, row.zs_bbu, row.zs_tbu, row.zs_bbtb
+            ]
+            for n, row in enumerate(rows)
+        ], dtype=float)
+
+        try:
+            hasil_tbu = self.encoders['tbu'].inverse_transform(self.__predict_index('tbu', input_data))
+            hasil_bbu = self.encoders['bbu'].inverse_transform(self.__predict_index('bbu', input_data))
+            hasil_bbtb = self.encoders['bbtb'].inverse_transform(self.__predict_index('bbtb', input_data))
+        except Exception as e:
+            logger.error("Error during batch prediction: %s", e)
+            for i in valid_index:
+                results[i] = e
+            return results
+
+        for n, i in enumerate(valid_index):
+            results[i] = PredictionOutput(
+                tbu=hasil_tbu[n],
+                bbu=hasil_bbu[n],
+                bbtb=hasil_bbtb[n]
+            )
+        return results
+    
     def penangana_gejalan(self, bbu: str, tbu: str, bbtb: str):
         """
         Menentukan penanganan berdasarkan hasil prediksi
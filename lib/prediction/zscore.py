@@ -1,17 +1,24 @@
-from pygrowup import Observation
-import pandas as pd
+import os
+import numpy as np
 import logging
+from typing import List
 
 from .models import ZscoreResults
+from .zscore_vector import VectorZScoreCalculator
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 class ZScoreCalculator():
     def __init__(self):
-        # Initialize using pygrowup2 Observation-based approach
-        logger.info("Initializing ZScore calculator using pygrowup2")
+        # Load the WHO LMS tables shipped with pygrowup2 once into NumPy arrays (see zscore_vector.py),
+        # fall back to per-observation pygrowup2 calls if they cannot be loaded.
+        # ZSCORE_GRID=1: L, M, S per usia bulan diambil dari LMSGrid (dibangun pada perhitungan pertama)
+        try:
+            self.engine = VectorZScoreCalculator(use_grid=os.getenv("ZSCORE_GRID", "1").lower() in ("1", "true", "yes"))
+            logger.info("Initializing ZScore calculator using vectorized WHO LMS tables")
+        except Exception as e:
+            self.engine = None
+            logger.warning("WHO LMS tables unavailable (%s), using pygrowup2 Observation", e)
 
     def calculate_zscore(self, age_months: int, weight_kg: float, height_cm: float, sex: str) -> ZscoreResults:
         """
@@ -26,8 +33,14 @@ class ZScoreCalculator():
         Returns:
             ZscoreResults: Z-scores untuk BB/U, TB/U, dan BB/TB
         """
+        if self.engine is not None:
+            return self.calculate_zscore_batch([age_months], [weight_kg], [height_cm], [sex])[0]
+
         try:
-            logger.debug(f"Z-score calculation: age_months={age_months}, weight_kg={weight_kg}, height_cm={height_cm}, sex={sex}")
+            # pygrowup2 hanya di-import jika tabel vektor tidak tersedia
+            from pygrowup import Observation
+
+            logger.debug("Z-score calculation: age_months=%s, weight_kg=%s, height_cm=%s, sex=%s", age_months, weight_kg, height_cm, sex)
             
             # Convert sex to pygrowup2 format
             sex_pygrowup = Observation.MALE if sex.upper() in ['M', 'L', 'MALE', 'LAKI'] else Observation.FEMALE
@@ -37,15 +50,13 @@ class ZScoreCalculator():
             
             # Weight-for-age (BB/U)
             z_wfa = obs.weight_for_age(weight_kg)
-            logger.debug(f"Weight-for-Age Z-score: {z_wfa}")
             
             # Length/Height-for-age (TB/U) 
             z_hfa = obs.length_or_height_for_age(height_cm)
-            logger.debug(f"Height-for-Age Z-score: {z_hfa}")
             
             # Weight-for-height (BB/TB)
             z_wfh = obs.weight_for_height(weight_kg, height_cm)
-            logger.debug(f"Weight-for-Height Z-score: {z_wfh}")
+            logger.debug("Z-scores: BB/U=%s, TB/U=%s, BB/TB=%s", z_wfa, z_hfa, z_wfh)
             
             return ZscoreResults(
                 calculated=True,
@@ -54,10 +65,55 @@ class ZScoreCalculator():
                 bbtb=float(z_wfh) if z_wfh is not None else None
             )
         except Exception as e:
-            logger.error(f"Error calculating z-scores: {e}")
+            logger.error("Error calculating z-scores: %s", e)
             return ZscoreResults(
                 calculated=False,
                 bbu=None,
                 tbu=None,
                 bbtb=None
-            )
\ No newline at end of file
+            )
+
+    def calculate_zscore_batch(self, age_months: List[int], weight_kg: List[float], height_cm: List[float], sex: List[str]) -> List[ZscoreResults]:
+        """
+        Menghitung Z-scores untuk banyak anak sekaligus dengan satu operasi vektor
+
+        Args:
+            age_months: Daftar usia dalam bulan
+            weight_kg: Daftar berat badan dalam kg
+            height_cm: Daftar tinggi badan dalam cm
+            sex: Daftar jenis kelamin ('M' untuk male, 'F' untuk female)
+
+        Returns:
+            List[ZscoreResults]: satu hasil per anak, calculated=False jika
+            salah satu Z-score tidak bisa dihitung
+        """
+        if self.engine is None:
+            return [
+                self.calculate_zscore(a, w, h, s)
+                for a, w, h, s in zip(age_months, weight_kg, height_cm, sex)
+            ]
+
+        try:
+            zscores = self.engine.calculate_zscores(age_months, weight_kg, height_cm, sex)
+        except Exception as e:
+            logger.error("Error calculating z-scores: %s", e)
+            return [ZscoreResults(calculated=False, bbu=None, tbu=None, bbtb=None) for _ in age_months]
+
+        # Bulatkan ke 2 desimal seperti pygrowup
+        bbu = np.round(zscores["bbu"], 2)
+        tbu = np.round(zscores["tbu"], 2)
+        bbtb = np.round(zscores["bbtb"], 2)
+        calculated = np.isfinite(bbu) & np.isfinite(tbu) & np.isfinite(bbtb)
+
+        results = []
+        for i in range(len(calculated)):
+            if calculated[i]:
+                results.append(ZscoreResults(
+                    calculated=True,
+                    bbu=float(bbu[i]),
+                    tbu=float(tbu[i]),
+                    bbtb=float(bbtb[i])
+                ))
+            else:
+                results.append(ZscoreResults(calculated=False, bbu=None, tbu=None, bbtb=None))
+        return results
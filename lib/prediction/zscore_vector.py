@@ -0,0 +1,350 @@
+import logging
+import importlib
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Paket tabel WHO yang dibawa pygrowup2: modul Python berisi
+# DATA = {'male'|'female': {t: {'l', 'm', 's'}}} dengan nilai Decimal
+TABLES_PACKAGE = "pygrowup.tables"
+
+# Tabel yang dipakai: per hari usia 0-1856 (by_day) dan per bulan untuk
+# usia > 1856 hari (by_month); wfh per 0.1 cm tinggi badan (65-120 cm)
+AGE_TABLES = ("wfa", "lfa")
+HEIGHT_TABLE = "wfh"
+
+# Aturan pygrowup2 Observation:
+# - usia bulan -> hari: int(usia * 365.25 / 12), usia 0 tidak valid
+# - usia <= 1856 hari memakai tabel harian, selain itu tabel bulanan pada
+#   round(hari / (365 / 12))
+# - TB/U: +0.7 cm untuk anak < 2 tahun (diukur berdiri, auto_adjust)
+# - BB/TB: tinggi dibulatkan ke 0.1 cm (half-even), hanya 65-120 cm
+DAYS_PER_MONTH = 30.4375
+TABLE_DAYS_PER_MONTH = 365 / 12.
+MAX_DAY_TABLE = 1856
+WFA_MAX_DAYS = 10 * 365.25
+LHFA_MAX_DAYS = 19 * 365.25
+WEIGHT_RANGE_KG = (1.0, 125.0)
+LENGTH_RANGE_CM = (10.0, 200.0)
+STANDING_ADJUST_CM = 0.7
+STANDING_ADJUST_MAX_DAYS = 365 * 2
+
+# Batas tinggi badan tabel BB/TB (cm), sama seperti pygrowup2
+MIN_HEIGHT_CM = 65.0
+MAX_HEIGHT_CM = 120.0
+HEIGHT_STEP_CM = 0.1
+
+# Rentang usia LMSGrid: 0-60 bulan bulat (semua di tabel harian)
+MAX_AGE_MONTHS = 60
+
+MALE_CODES = ('M', 'L', 'MALE', 'LAKI')
+SEXES = (('M', 'male'), ('F', 'female'))
+
+
+class LMSTable:
+    """
+    Satu tabel LMS WHO dalam bentuk array NumPy.
+    axis: nilai sumbu (hari, bulan, atau cm) dengan jarak tetap, terurut naik
+    L, M, S: parameter Box-Cox untuk setiap nilai sumbu
+    """
+    def __init__(self, axis: np.ndarray, L: np.ndarray, M: np.ndarray, S: np.ndarray):
+        self.axis = axis
+        self.L = L
+        self.M = M
+        self.S = S
+        self.start = float(axis[0])
+        self.step = float(axis[1] - axis[0])
+
+    def index(self, values: np.ndarray) -> np.ndarray:
+        """Index baris untuk nilai sumbu yang tepat ada di tabel, -1 jika di luar tabel"""
+        with np.errstate(invalid='ignore'):
+            idx = np.rint((values - self.start) / self.step)
+            valid = np.isfinite(idx) & (idx >= 0) & (idx < len(self.axis))
+        return np.where(valid, idx, -1).astype(np.intp)
+
+    def lookup(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Ambil L, M, S untuk nilai sumbu yang tepat ada di tabel (NaN jika di luar tabel)"""
+        idx = self.index(values)
+        valid = idx >= 0
+        return tuple(np.where(valid, column[idx], np.nan) for column in (self.L, self.M, self.S))
+
+    def interpolate(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Interpolasi linear L, M, S untuk nilai sumbu pecahan (NaN jika di luar tabel)"""
+        with np.errstate(invalid='ignore'):
+            valid = (values >= self.axis[0]) & (values <= self.axis[-1])
+        return tuple(np.where(valid, np.interp(values, self.axis, column), np.nan) for column in (self.L, self.M, self.S))
+
+
+def _table_from_data(data: Dict[object, Dict[str, Decimal]]) -> LMSTable:
+    axis = np.array(sorted(float(key) for key in data))
+    steps = np.diff(axis)
+    if len(axis) < 2 or not np.allclose(steps, steps[0]):
+        raise ValueError("WHO table axis is not evenly spaced")
+    by_axis = {float(key): row for key, row in data.items()}
+    L = np.array([float(by_axis[a]["l"]) for a in axis])
+    M = np.array([float(by_axis[a]["m"]) for a in axis])
+    S = np.array([float(by_axis[a]["s"]) for a in axis])
+    return LMSTable(axis, L, M, S)
+
+
+@lru_cache(maxsize=None)
+def load_who_tables(package: str = TABLES_PACKAGE) -> Dict[str, Dict[str, LMSTable]]:
+    """
+    Load tabel LMS WHO dari pygrowup2 sekali saja.
+    Returns dict {'M'|'F': {'wfa_day', 'wfa_month', 'lfa_day', 'lfa_month', 'wfh': LMSTable}}
+    """
+    modules = {f"{name}_day": f"{package}.by_day.{name}" for name in AGE_TABLES}
+    modules.update({f"{name}_month": f"{package}.by_month.{name}" for name in AGE_TABLES})
+    modules[HEIGHT_TABLE] = f"{package}.by_day.{HEIGHT_TABLE}"
+    data = {key: importlib.import_module(module).DATA for key, module in modules.items()}
+
+    tables = {}
+    for sex, sex_name in SEXES:
+        tables[sex] = {key: _table_from_data(table[sex_name]) for key, table in data.items()}
+    logger.info("WHO LMS tables loaded from %s", package)
+    return tables
+
+
+def age_in_days(age_months: np.ndarray) -> np.ndarray:
+    """
+    Usia bulan -> hari seperti pygrowup2: int(Decimal(usia) * 365.25 / 12),
+    terpotong ke arah 0. Usia 0 (dianggap tidak diisi) dan NaN -> NaN.
+    """
+    with np.errstate(invalid='ignore'):
+        product = age_months * DAYS_PER_MONTH
+        days = np.trunc(product)
+        # Perkalian float bisa membulatkan hasil pecahan tepat ke bilangan bulat
+        near = np.isfinite(product) & (age_months != np.rint(age_months)) & (np.abs(product - np.rint(product)) < 1e-6)
+    for i in np.flatnonzero(near):
+        days[i] = int(Decimal(float(age_months[i])) * Decimal(DAYS_PER_MONTH))
+    return np.where((age_months != 0) & (days >= 0), days, np.nan)
+
+
+def round_height(height_cm: np.ndarray) -> np.ndarray:
+    """
+    Tinggi dibulatkan ke 0.1 cm seperti Decimal(tinggi).quantize(Decimal("1.0")):
+    half-even pada nilai biner float yang sebenarnya
+    """
+    rounded = np.round(height_cm, 1)
+    with np.errstate(invalid='ignore'):
+        scaled = height_cm * 10
+        # np.round bisa salah hanya untuk nilai (hampir) tepat di tengah
+        near = np.isfinite(scaled) & (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in np.flatnonzero(near):
+        rounded[i] = round(float(height_cm[i]), 1)
+    return rounded
+
+
+def lms_zscore(y: np.ndarray, L: np.ndarray, M: np.ndarray, S: np.ndarray) -> np.ndarray:
+    """
+    Rumus LMS WHO:
+              [y/M]^L - 1
+        Z =  -------------      (L != 0)
+                 S * L
+        Z = ln(y/M) / S         (L == 0)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = y / M
+        safe_L = np.where(L == 0, 1.0, L)
+        z = np.where(L == 0, np.log(ratio) / S, (np.power(ratio, safe_L) - 1) / (S * safe_L))
+    return z
+
+
+def lms_value(z: float, L: np.ndarray, M: np.ndarray, S: np.ndarray) -> np.ndarray:
+    """Nilai pengukuran pada z-score tertentu: M * (1 + L*S*z)^(1/L)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        safe_L = np.where(L == 0, 1.0, L)
+        return np.where(L == 0, M * np.exp(S * z), M * np.power(1 + safe_L * S * z, 1 / safe_L))
+
+
+def restrict_zscore(z: np.ndarray, y: np.ndarray, L: np.ndarray, M: np.ndarray, S: np.ndarray) -> np.ndarray:
+    """
+    Restricted LMS untuk indikator berbasis berat: z-score di luar +/-3 SD
+    dihitung dengan jarak tetap antara SD2 dan SD3 (WHO technical report, bab 7).
+    Seperti pygrowup2, batas +/-3 diuji pada z yang sudah dibulatkan ke 2 desimal.
+    """
+    sd2pos = lms_value(2, L, M, S)
+    sd3pos = lms_value(3, L, M, S)
+    sd2neg = lms_value(-2, L, M, S)
+    sd3neg = lms_value(-3, L, M, S)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        upper = 3 + (y - sd3pos) / (sd3pos - sd2pos)
+        lower = -3 + (y - sd3neg) / (sd2neg - sd3neg)
+    return np.where(z > 3, upper, np.where(z < -3, lower, z))
+
+
+def weight_zscore(y: np.ndarray, L: np.ndarray, M: np.ndarray, S: np.ndarray) -> np.ndarray:
+    """Z-score indikator berbasis berat (BB/U, BB/TB), dibulatkan ke 2 desimal"""
+    z = np.round(lms_zscore(y, L, M, S), 2)
+    return np.round(restrict_zscore(z, y, L, M, S), 2)
+
+
+class LMSGrid:
+    """
+    L, M, S yang sudah dihitung sebelumnya untuk input alat ukur:
+    - wfa, lfa: per (jenis kelamin, usia bulan bulat 0-60), shape (2, 61, 3),
+      dengan koreksi +0.7 cm TB/U per bulan (lfa_offset)
+    - wfh: per (jenis kelamin, tinggi 65.0-120.0 cm per 0.1 cm), shape (2, 551, 3)
+    Index jenis kelamin 0 = perempuan, 1 = laki-laki; kolom terakhir L, M, S.
+
+    Grid diambil dari tabel yang sama (konversi bulan -> hari sudah
+    dilakukan), jadi hasilnya sama persis dengan jalur tabel. Saat request,
+    L, M, S cukup diambil dengan indexing array (total sekitar 30 KB).
+    """
+    def __init__(self, tables: Dict[str, Dict[str, LMSTable]]):
+        months = np.arange(MAX_AGE_MONTHS + 1, dtype=float)
+        days = age_in_days(months)  # Bulan 0 -> NaN, seperti pygrowup2
+        self.lfa_offset = np.where(days < STANDING_ADJUST_MAX_DAYS, STANDING_ADJUST_CM, 0.0)
+        self.wfa = np.empty((2, len(months), 3))
+        self.lfa = np.empty((2, len(months), 3))
+        self.wfh = np.empty((2, len(tables['M'][HEIGHT_TABLE].axis), 3))
+        for index, (sex, _) in ((0, SEXES[1]), (1, SEXES[0])):
+            self.wfa[index] = np.column_stack(tables[sex]["wfa_day"].lookup(days))
+            self.lfa[index] = np.column_stack(tables[sex]["lfa_day"].lookup(days))
+            wfh = tables[sex][HEIGHT_TABLE]
+            self.wfh[index] = np.column_stack((wfh.L, wfh.M, wfh.S))
+        self.height_table = tables['M'][HEIGHT_TABLE]
+
+    @property
+    def nbytes(self) -> int:
+        return self.wfa.nbytes + self.lfa.nbytes + self.wfh.nbytes + self.lfa_offset.nbytes
+
+    @staticmethod
+    def _take(grid: np.ndarray, sex: np.ndarray, index: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """L, M, S untuk setiap baris, NaN jika index -1"""
+        lms = grid[sex, index]
+        lms[index < 0] = np.nan
+        return lms[:, 0], lms[:, 1], lms[:, 2]
+
+    def lms(self, age_months: np.ndarray, height_key: np.ndarray, male: np.ndarray):
+        """
+        (wfa, lfa, lfa_offset, wfh) dari grid, atau None jika ada usia yang
+        bukan bulan bulat 0-60; input seperti itu dihitung dengan tabel.
+        height_key: tinggi yang sudah dibulatkan ke 0.1 cm (NaN = tidak valid)
+        """
+        with np.errstate(invalid='ignore'):
+            if not np.all((age_months == np.rint(age_months)) & (age_months >= 0) & (age_months <= MAX_AGE_MONTHS)):
+                return None
+        age_index = age_months.astype(np.intp)
+        sex = male.astype(np.intp)
+        return (
+            self._take(self.wfa, sex, age_index),
+            self._take(self.lfa, sex, age_index),
+            self.lfa_offset[age_index],
+            self._take(self.wfh, sex, self.height_table.index(height_key))
+        )
+
+
+class VectorZScoreCalculator:
+    """
+    Kalkulator Z-score WHO berbasis NumPy untuk banyak anak sekaligus.
+
+    Tabel LMS dibaca sekali dari paket pygrowup2 (pygrowup.tables.by_day /
+    by_month) lalu disimpan sebagai array. Aturan mengikuti
+    pygrowup2 Observation(sex, age_in_months=...) dengan weight_for_age,
+    length_or_height_for_age dan weight_for_height:
+    - usia dikonversi ke hari; tabel harian sampai 1856 hari, selain itu
+      tabel bulanan; BB/U sampai 10 tahun, TB/U sampai 19 tahun
+    - TB/U: +0.7 cm untuk usia < 2 tahun (pengukuran berdiri)
+    - BB/TB: tinggi dibulatkan ke 0.1 cm, hanya 65-120 cm
+    - BB/U dan BB/TB: restricted LMS di luar +/-3 SD
+    - setiap z-score dibulatkan ke 2 desimal; berat di luar 1-125 kg atau
+      tinggi di luar 10-200 cm -> NaN
+
+    Hasilnya sama dengan pygrowup2 (lihat test/zscore_vector_test.py);
+    pygrowup2 menghitung dengan Decimal, jadi hanya nilai yang tepat di
+    tengah pembulatan 2 desimal yang bisa berbeda 0.01.
+
+    Dengan interpolate=True, L, M, S diinterpolasi linear pada usia (hari
+    pecahan) dan tinggi yang sebenarnya, bukan dibulatkan ke baris tabel.
+    Hasil ini lebih halus tetapi tidak lagi sama dengan pygrowup2.
+
+    Dengan use_grid=True (tanpa interpolate), L, M, S untuk usia bulan bulat
+    0-60 diambil dari LMSGrid, yang dibangun pada perhitungan pertama.
+    """
+    def __init__(self, package: str = TABLES_PACKAGE, interpolate: bool = False, use_grid: bool = False):
+        self.tables = load_who_tables(package)
+        self.interpolate = interpolate
+        self.use_grid = use_grid and not interpolate
+        self._grid: Optional[LMSGrid] = None
+
+    @property
+    def grid(self) -> Optional[LMSGrid]:
+        if self.use_grid and self._grid is None:
+            self._grid = LMSGrid(self.tables)
+        return self._grid
+
+    @staticmethod
+    def is_male(sex) -> np.ndarray:
+        """Konversi array jenis kelamin ('M'/'F', 'L'/'P', ...) menjadi boolean laki-laki"""
+        sex = np.char.upper(np.asarray(sex, dtype=str))
+        return np.isin(sex, MALE_CODES)
+
+    def _lms_by_sex(self, name: str, male: np.ndarray, values: np.ndarray):
+        """Ambil L, M, S dari tabel laki-laki atau perempuan sesuai baris"""
+        method = 'interpolate' if self.interpolate else 'lookup'
+        boys = getattr(self.tables['M'][name], method)(values)
+        girls = getattr(self.tables['F'][name], method)(values)
+        return tuple(np.where(male, b, g) for b, g in zip(boys, girls))
+
+    def _age_lms(self, table: str, days: np.ndarray, male: np.ndarray, max_days: float):
+        """L, M, S untuk indikator berbasis usia (wfa / lfa), NaN di luar rentang usia"""
+        with np.errstate(invalid='ignore'):
+            in_range = days <= max_days
+            daily = days <= MAX_DAY_TABLE
+        by_day = self._lms_by_sex(f"{table}_day", male, days)
+        if self.interpolate:
+            months = days / TABLE_DAYS_PER_MONTH
+        else:
+            months = np.round(days / TABLE_DAYS_PER_MONTH)
+        by_month = self._lms_by_sex(f"{table}_month", male, months)
+        return tuple(np.where(in_range, np.where(daily, d, m), np.nan) for d, m in zip(by_day, by_month))
+
+    def calculate_zscores(self, age_months, weight_kg, height_cm, sex) -> Dict[str, np.ndarray]:
+        """
+        Menghitung Z-scores untuk array anak
+
+        Args:
+            age_months: Array usia dalam bulan
+            weight_kg: Array berat badan dalam kg
+            height_cm: Array tinggi badan dalam cm
+            sex: Array jenis kelamin ('M' untuk male, 'F' untuk female)
+
+        Returns:
+            dict {'bbu', 'tbu', 'bbtb'} berisi array float (2 desimal), NaN jika tidak bisa dihitung
+        """
+        age_months = np.asarray(age_months, dtype=float)
+        weight_kg = np.asarray(weight_kg, dtype=float)
+        height_cm = np.asarray(height_cm, dtype=float)
+        male = self.is_male(sex)
+
+        # Rentang pengukuran yang diterima pygrowup2
+        with np.errstate(invalid='ignore'):
+            weight = np.where((weight_kg >= WEIGHT_RANGE_KG[0]) & (weight_kg <= WEIGHT_RANGE_KG[1]), weight_kg, np.nan)
+            length = np.where((height_cm >= LENGTH_RANGE_CM[0]) & (height_cm <= LENGTH_RANGE_CM[1]), height_cm, np.nan)
+            height_key = height_cm if self.interpolate else round_height(height_cm)
+            height_key = np.where((height_key >= MIN_HEIGHT_CM) & (height_key <= MAX_HEIGHT_CM), height_key, np.nan)
+
+        lms = self.grid.lms(age_months, height_key, male) if self.use_grid else None
+        if lms is None:
+            days = age_in_days(age_months)
+            if self.interpolate:
+                days = np.where(np.isfinite(days), age_months * DAYS_PER_MONTH, np.nan)
+            with np.errstate(invalid='ignore'):
+                offset = np.where(days < STANDING_ADJUST_MAX_DAYS, STANDING_ADJUST_CM, 0.0)
+            lms = (
+                self._age_lms("wfa", days, male, WFA_MAX_DAYS),
+                self._age_lms("lfa", days, male, LHFA_MAX_DAYS),
+                offset,
+                self._lms_by_sex(HEIGHT_TABLE, male, height_key)
+            )
+        wfa, lfa, offset, wfh = lms
+
+        bbu = weight_zscore(weight, *wfa)
+        tbu = np.round(lms_zscore(length + offset, *lfa), 2)
+        bbtb = weight_zscore(weight, *wfh)
+        return {"bbu": bbu, "tbu": tbu, "bbtb": bbtb}
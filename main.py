@@ -1,29 +1,81 @@
+import os
+import hmac
+import time
 import asyncio
 import logging
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.websockets import WebSocketState
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from typing import List, Optional, Tuple, Union
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+from pydantic import ValidationError
 
-# Set up logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from lib.main import setup_logging
+
+# Set up logging: JSON lines written by a background thread (LOG_LEVEL / LOG_FORMAT / LOG_ASYNC / LOG_LEVELS)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 from lib.prediction import  ZScoreCalculator
 from lib.prediction import parse_tanggal_lahir, parser_usia_bulan, parser_gender, parser_usia_tahun
 from lib.main import HealthResponse
 from lib.prediction import PredictionInput, PredictionOutput, Prediction, PredictionOutputWithMessage, DataAnakInput
+from lib.prediction import FusedPrediction
+from lib.prediction import ProfilAnakInput
+from lib.prediction import BatchPredictionInput, BatchPredictionItem, BatchPredictionOutput
+from lib.prediction import PredictionCache, prediction_cache_key
 from lib.main import ConnectionManager
 from lib.main import DataFromIOT, ResponseMessage
+from lib.main import DataFromGateway, BatchReceiveResponse, parse_gateway_batch
+from lib.main import DeviceChannels, DeviceReading
+from lib.main import ReadingStabilizer, MissingChannelError, RawReading, RawDataFromIOT
+from lib.main import InferencePool, PoolRejectedError
+from lib.main import MicroBatcher
+from lib.main import PreforkServer, memory_report
+from lib.main import DeviceStore
+from lib.main import MeasurementHistory
+from lib.main import StageMetrics, StageTimer
+from lib.main import SamplingProfiler, ProfilerBusyError
+
+# Blocking inference (Z-score + XGBoost) runs in this pool so the event loop
+# stays free for /recive and WebSocket traffic. Configured by INFERENCE_POOL_* env vars
+inference_pool = InferencePool.from_env()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load models before the pool starts so process workers inherit them on fork
+    if os.getenv("PREDICT_WARMUP", "1").lower() in ("1", "true", "yes"):
+        await asyncio.to_thread(warm_up)
+    inference_pool.start()
+    await device_store.start()
+    await device_store.register(device_register)
+    history.start()
+    if batcher is not None:
+        batcher.start()
+    heartbeat = asyncio.create_task(manager.heartbeat(WS_HEARTBEAT_SECONDS, heartbeat_message)) if WS_HEARTBEAT_SECONDS > 0 else None
+    # The memory store is per process, there is no other worker to relay from
+    relay = asyncio.create_task(device_channels.relay()) if device_store.kind != "memory" else None
+    yield
+    if heartbeat is not None:
+        heartbeat.cancel()
+    if relay is not None:
+        relay.cancel()
+    for task in list(session_tasks):
+        task.cancel()
+    if batcher is not None:
+        await batcher.stop()
+    await device_store.close()
+    await history.close()
+    inference_pool.shutdown()
 
 # Create FastAPI app instance
 app = FastAPI(
     title="ML Stunting API",
     description="Simple FastAPI template for ML Stunting predictions",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -35,17 +87,54 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-prediction = Prediction()
+# PREDICT_BACKEND=fused evaluates the three models in one call (see lib/prediction/fused.py).
+# Models are loaded lazily: in the lifespan warm-up, or on the first prediction
+prediction = FusedPrediction(lazy=True) if os.getenv("PREDICT_BACKEND") == "fused" else Prediction(lazy=True)
 calculator = ZScoreCalculator()
 
+# Cache for repeated submissions of the same child (PREDICT_CACHE_SIZE / PREDICT_CACHE_TTL)
+prediction_cache = PredictionCache.from_env()
+
+# Per-stage /predict latency histograms for /metrics (METRICS_ENABLED / METRICS_SERVER_TIMING)
+stage_metrics = StageMetrics.from_env()
+
+# Token for the /admin endpoints, sent as X-Admin-Token (unset = admin endpoints disabled)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None
+profiler = SamplingProfiler()
+
 
-manager = ConnectionManager()
+# WebSocket clients; queue size, send timeout and slow client policy from WS_* env vars
+manager = ConnectionManager.from_env()
 
-# TODO
-# should store in databases
-data_devices = {}
+# Smoothing and stable-reading detection for raw sensor streams (STABLE_* env vars)
+stabilizer = ReadingStabilizer.from_env()
+
+# Latest data of every IoT device: in memory, or SQLite shared by all workers (DEVICE_STORE_* env vars)
+device_store = DeviceStore.from_env()
 device_register = ['IOT_001']
 
+# Devices streaming measurements over /ws/device/{did}; trigger/reset are pushed down the same socket.
+# With a shared store, messages for a device connected to another worker are relayed through it
+device_channels = DeviceChannels(store=device_store, poll_interval=float(os.getenv("DEVICE_RELAY_MS", "100")) / 1000)
+
+# Every tb/bb measurement per device: ring buffers, flushed to column files in HISTORY_DIR
+history = MeasurementHistory.from_env()
+
+# Seconds a child profile bound by /trigger/{did} waits for a measurement
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "900"))
+
+# Background session predictions (kept referenced until they finish)
+session_tasks = set()
+
+# Seconds without updates before a heartbeat is pushed to /ws/data clients (0 = no heartbeat)
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", "30"))
+
+# Maximum number of children accepted by /predict/batch in one request
+MAX_BATCH_SIZE = 1000
+
+# Maximum number of measurements accepted by /recive/batch in one request
+MAX_INGEST_BATCH_SIZE = 10000
+
 
 # Health check endpoint
 @app.get("/", response_model=HealthResponse)
@@ -64,11 +153,14 @@ async def health_check():
         message="API is working properly"
     )
 
-# Reset data in data_devices by did
+# Reset data in device store by did
 @app.post("/reset/{did}", response_model=ResponseMessage)
 async def reset_data(did: str):
-    if did in data_devices:
-        del data_devices[did]
+    stabilizer.reset(did)
+    deleted = await device_store.delete(did)
+    sent = await device_channels.send_command(did, "reset")
+    if deleted or sent:
+        manager.publish(did, device_snapshot(did, None))
         return ResponseMessage(
             status=200,
             message="Data reset successfully"
@@ -81,12 +173,32 @@ async def reset_data(did: str):
 
 # trigger IOT for start collecting data
 @app.post("/trigger/{did}", response_model=ResponseMessage)
-async def trigger_iot(did: str):
+async def trigger_iot(did: str, profile: Optional[ProfilAnakInput] = None):
     """
-    Trigger IOT device to start collecting data
+    Trigger IOT device to start collecting data.
+    A device connected to /ws/device/{did} receives the command immediately
+    (through the device store when it is connected to another worker).
+    With a child profile in the body (session mode), the next measurement of
+    the device is predicted for that child and the result is pushed to the
+    /ws/data/{did} and /ws/device/{did} clients.
     """
-    if did in data_devices:
-        data_devices[did]["triggered"] = True
+    stabilizer.reset(did)
+    updated = await device_store.update(did, triggered=True)
+    if profile is not None:
+        await device_store.bind_session(did, profile.model_dump(), time.time() + SESSION_TTL_SECONDS)
+    delivery = await device_channels.send_command(did, "trigger")
+    delivered = {"sent": " (sent to device)", "relayed": " (relayed to the worker connected to the device)"}.get(delivery, "")
+    if profile is not None:
+        return ResponseMessage(
+            status=200,
+            message=f"Device {did} triggered, waiting for measurement of {profile.nama}{delivered}"
+        )
+    if delivery is not None:
+        return ResponseMessage(
+            status=200,
+            message=f"Device {did} triggered to start collecting data{delivered}"
+        )
+    if updated:
         return ResponseMessage(
             status=200,
             message=f"Device {did} triggered to start collecting data"
@@ -129,31 +241,388 @@ async def trigger_iot(did: str):
 )
 async def recive_form_device(data: DataFromIOT):
     """Receive data (bb/tb) from IOT device"""
-    data_devices[data.did] = {
-        "tb": data.tb,
-        "bb": data.bb,
+    await record_measurement(data.did, data.tb, data.bb)
+    return ResponseMessage(
+        status=200,
+        message=f"Data received successfully for device {data.did}"
+    )
+
+async def record_measurement(did: str, tb: float, bb: float, ts: Optional[float] = None, source: str = "iot_device"):
+    """Store a measurement as the device's latest data, add it to the history and push it to /ws/data clients"""
+    last_updated = ts if ts is not None else time.time()
+    await device_store.set(did, {
+        "tb": tb,
+        "bb": bb,
         "status": "updated",
-        "last_updated": asyncio.get_event_loop().time(),
+        "last_updated": last_updated,
         "triggered": False  # Set to False initially, can be updated later
+    })
+    history.append(did, last_updated, tb, bb)
+
+    # Push the update to clients subscribed to this device (no polling, no waiting on slow clients)
+    manager.publish(did, {
+        "did": did,
+        "tb": tb,
+        "bb": bb,
+        "timestamp": asyncio.get_event_loop().time(),
+        "status": "updated",
+        "source": source,
+        "last_updated": last_updated
+    })
+    await start_session_prediction(did, tb, bb)
+
+async def start_session_prediction(did: str, tb: float, bb: float):
+    """Predict in the background for the child bound to the device, if any"""
+    profile = await device_store.take_session(did)
+    if profile is None:
+        return
+    task = asyncio.create_task(run_session_prediction(did, profile, tb, bb))
+    session_tasks.add(task)
+    task.add_done_callback(session_tasks.discard)
+
+async def run_session_prediction(did: str, profile: dict, tb: float, bb: float):
+    """Z-scores and prediction for a session measurement, pushed to /ws/data and /ws/device clients"""
+    message = {
+        "did": did,
+        "timestamp": asyncio.get_event_loop().time(),
+        "nama": profile.get("nama"),
+        "berat": bb,
+        "tinggi": tb
     }
-    
-    # Broadcast updated data to clients connected to this specific device
-    if manager.active_connections:
-        broadcast_data = {
-            "did": data.did,
-            "tb": data.tb,
-            "bb": data.bb,
-            "timestamp": asyncio.get_event_loop().time(),
-            "status": "updated",
-            "source": "iot_device"
-        }
-        await manager.broadcast_to_device(data.did, broadcast_data)
-    
+    try:
+        result = await predict_cached(DataAnakInput(**profile, berat=bb, tinggi=tb))
+        message.update(status="prediction", prediction=result.model_dump())
+        logger.info("Session prediction for device %s: %s", did, result.data)
+    except Exception as e:
+        logger.error("Session prediction failed for device %s: %s", did, e)
+        message.update(status="prediction_failed", error=str(e))
+    manager.publish(did, message)
+    await device_channels.deliver(did, message)
+
+async def record_raw_reading(did: str, reading: RawReading) -> Optional[tuple]:
+    """
+    Feed a raw sensor reading to the stabilizer. Only a settled (tb, bb) is
+    recorded like a /recive measurement; returns it, or None while the reading is not stable.
+    """
+    ts = reading.ts if reading.ts is not None else time.time()
+    settled = stabilizer.add(did, ts, reading.tb, reading.bb)
+    if settled is not None:
+        await record_measurement(did, settled[0], settled[1], ts, source="stable_filter")
+    return settled
+
+# Raw (unfiltered) readings from IOT device
+@app.post(
+    "/recive/raw",
+    response_model=ResponseMessage,
+    responses={
+        202: {"description": "Reading received, the measurement is not stable yet", "model": ResponseMessage},
+        422: {"description": "The device sends only tb or only bb readings, a measurement needs both"}
+    }
+)
+async def recive_raw_from_device(data: RawDataFromIOT, response: Response):
+    """
+    Receive a raw tb and/or bb reading. The server smooths the stream per
+    device and stores the measurement once it is stable (see STABLE_* settings).
+    Returns HTTP 200 with the stable reading, or 202 while it is not stable yet.
+    Returns 422 when one value is stable but the device sends no readings of the other.
+    """
+    try:
+        settled = await record_raw_reading(data.did, data)
+    except MissingChannelError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if settled is not None:
+        return ResponseMessage(
+            status=200,
+            message=f"Stable reading for device {data.did}: tb={settled[0]}, bb={settled[1]}"
+        )
+    response.status_code = 202
     return ResponseMessage(
+        status=202,
+        message=f"Reading received for device {data.did}, waiting for a stable value"
+    )
+
+# Batch data from IOT gateway (many devices / measurements in one request)
+@app.post(
+    "/recive/batch",
+    response_model=BatchReceiveResponse,
+    summary="Receive a batch of data from IOT gateway",
+    description=(
+        "Receive many {did, tb, bb, ts} measurements as a JSON array or newline-delimited JSON "
+        "(Content-Type: application/x-ndjson). The batch is validated in one pass, device data "
+        "is updated in bulk and each device gets at most one WebSocket push."
+    ),
+    responses={
+        400: {
+            "description": "Batch too large or empty",
+            "content": {
+                "application/json": {
+                    "example": {"detail": f"Batch size must be between 1 and {MAX_INGEST_BATCH_SIZE}"}
+                }
+            }
+        },
+        422: {"description": "Invalid measurement in the batch"}
+    },
+    # Body is parsed by parse_gateway_batch, document it for /docs
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": DataFromGateway.model_json_schema()}},
+                "application/x-ndjson": {"schema": {"type": "string"}}
+            }
+        }
+    }
+)
+async def recive_batch_from_gateway(request: Request):
+    """Receive data (bb/tb) of many IOT devices at once"""
+    try:
+        measurements = parse_gateway_batch(await request.body(), request.headers.get("content-type", ""))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False, include_input=False))
+
+    if not (1 <= len(measurements) <= MAX_INGEST_BATCH_SIZE):
+        raise HTTPException(status_code=400, detail=f"Batch size must be between 1 and {MAX_INGEST_BATCH_SIZE}")
+
+    # Every measurement goes to the history, only the newest per device becomes the device data
+    received_at = time.time()
+    latest = {}
+    samples = {}
+    for item in measurements:
+        ts = item.ts if item.ts is not None else received_at
+        history.append(item.did, ts, item.tb, item.bb)
+        samples[item.did] = samples.get(item.did, 0) + 1
+        if item.did not in latest or ts >= latest[item.did][0]:
+            latest[item.did] = (ts, item)
+
+    await device_store.set_many({
+        did: {"tb": item.tb, "bb": item.bb, "status": "updated", "last_updated": ts, "triggered": False}
+        for did, (ts, item) in latest.items()
+    })
+    for did, (ts, item) in latest.items():
+        await start_session_prediction(did, item.tb, item.bb)
+
+    # One push per device for the whole batch
+    timestamp = asyncio.get_event_loop().time()
+    for did, (ts, item) in latest.items():
+        manager.publish(did, {
+            "did": did,
+            "tb": item.tb,
+            "bb": item.bb,
+            "timestamp": timestamp,
+            "status": "updated",
+            "source": "iot_gateway",
+            "last_updated": ts,
+            "samples": samples[did]
+        })
+
+    return BatchReceiveResponse(
         status=200,
-        message=f"Data received successfully for device {data.did}"
+        message=f"Batch received successfully for {len(latest)} devices",
+        received=len(measurements),
+        devices=len(latest)
+    )
+
+def build_prediction_inputs(requests: List[DataAnakInput], timer: Optional[StageTimer] = None) -> List[Union[PredictionInput, Exception]]:
+    """
+    Convert DataAnakInput rows to PredictionInput, calculating age and Z-scores.
+    Z-scores for all rows are calculated in one vectorized call.
+    Rows that fail are returned as the Exception instead of PredictionInput.
+    With a timer, the "parse" and "zscore" stages are marked.
+    """
+    results: List[Union[PredictionInput, Exception]] = [None] * len(requests)
+    parsed = []
+    for i, request in enumerate(requests):
+        try:
+            data_anak = parse_tanggal_lahir(request.tanggal_lahir)
+            parsed.append((
+                i,
+                parser_usia_bulan(data_anak.tahun, data_anak.bulan),
+                parser_usia_tahun(data_anak.tahun, data_anak.bulan, data_anak.hari),
+                parser_gender(request.jenis_kelamin)
+            ))
+        except Exception as e:
+            results[i] = e
+    if timer is not None:
+        timer.mark("parse")
+
+    if not parsed:
+        return results
+
+    zscore_results = calculator.calculate_zscore_batch(
+        age_months=[age_in_months for _, age_in_months, _, _ in parsed],
+        weight_kg=[requests[i].berat for i, _, _, _ in parsed],
+        height_cm=[requests[i].tinggi for i, _, _, _ in parsed],
+        sex=[gender for _, _, _, gender in parsed]
+    )
+    if timer is not None:
+        timer.mark("zscore")
+
+    for (i, _, age, _), zscore_result in zip(parsed, zscore_results):
+        request = requests[i]
+        if not zscore_result.calculated:
+            results[i] = ValueError("Error calculating Z-scores")
+            continue
+        results[i] = PredictionInput(
+            usia=age,
+            jenis_kelamin=request.jenis_kelamin,
+            bb_lahir=request.bb_lahir,
+            tb_lahir=request.tb_lahir,
+            tanggal_lahir=request.tanggal_lahir,
+            berat=request.berat,
+            tinggi=request.tinggi,
+            zs_bbu=zscore_result.bbu,
+            zs_tbu=zscore_result.tbu,
+            zs_bbtb=zscore_result.bbtb
+        )
+    return results
+
+def build_prediction_input(request: DataAnakInput, timer: Optional[StageTimer] = None) -> PredictionInput:
+    """Convert a single DataAnakInput to PredictionInput, raising on error"""
+    result = build_prediction_inputs([request], timer)[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+def run_prediction(request: DataAnakInput) -> PredictionOutputWithMessage:
+    """Blocking prediction pipeline for one child, executed in the inference pool"""
+    return run_prediction_timed(request)[0]
+
+def run_prediction_timed(request: DataAnakInput) -> Tuple[PredictionOutputWithMessage, StageTimer]:
+    """run_prediction that also returns the duration of each pipeline stage"""
+    timer = StageTimer()
+    # Convert request to PredictionInput
+    data_anak = build_prediction_input(request, timer)
+
+    # Perform prediction
+    result = prediction.predict(data_anak)
+    timer.mark("predict")
+    logger.debug("Prediction result: %s", result)
+    
+    msg = prediction.penangana_gejalan(
+        result.bbu,
+        result.tbu,
+        result.bbtb
+    )
+    timer.mark("message")
+    
+    return PredictionOutputWithMessage(
+        data=result,
+        message=msg
+    ), timer
+
+def predict_rows(rows: List[DataAnakInput]) -> List[Union[PredictionOutputWithMessage, Exception]]:
+    """
+    Blocking prediction pipeline for many children: Z-scores are calculated in
+    one vectorized call and each model runs once. Failed rows hold the Exception.
+    """
+    results: List[Union[PredictionOutputWithMessage, Exception]] = [None] * len(rows)
+
+    # Calculate age and Z-scores for all rows, keep track of valid rows
+    inputs = []
+    valid_index = []
+    for i, row in enumerate(build_prediction_inputs(rows)):
+        if isinstance(row, Exception):
+            results[i] = row
+            continue
+        inputs.append(row)
+        valid_index.append(i)
+
+    # Run all valid rows through the models at once
+    predictions = prediction.predict_batch(inputs) if inputs else []
+    for i, result in zip(valid_index, predictions):
+        if isinstance(result, Exception):
+            results[i] = result
+            continue
+        results[i] = PredictionOutputWithMessage(
+            data=result,
+            message=prediction.penangana_gejalan(
+                result.bbu,
+                result.tbu,
+                result.bbtb
+            )
+        )
+    return results
+
+def warm_up():
+    """
+    Load models and run one prediction through the whole pipeline so the
+    first real request does not pay for loading or first-call overhead.
+    """
+    started = time.perf_counter()
+    prediction.load()
+    sample = DataAnakInput(
+        nama="warmup",
+        jenis_kelamin="L",
+        bb_lahir=3.2,
+        tb_lahir=50,
+        tanggal_lahir=(date.today() - timedelta(days=3 * 365)).isoformat(),
+        berat=14.0,
+        tinggi=95.0
+    )
+    result = predict_rows([sample])[0]
+    if isinstance(result, Exception):
+        raise result
+    logger.info(f"Warm-up finished in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+def build_batch_output(rows: List[Union[PredictionOutputWithMessage, Exception]]) -> BatchPredictionOutput:
+    """Convert per-row results (or errors) to the /predict/batch response"""
+    results = []
+    for i, result in enumerate(rows):
+        if isinstance(result, Exception):
+            results.append(BatchPredictionItem(index=i, success=False, error=str(result)))
+        else:
+            results.append(BatchPredictionItem(index=i, success=True, data=result.data, message=result.message))
+
+    success = sum(1 for r in results if r.success)
+    logger.info("Batch prediction: %d/%d rows succeeded", success, len(results))
+    return BatchPredictionOutput(
+        total=len(results),
+        success=success,
+        failed=len(results) - success,
+        results=results
     )
 
+def get_cache_key(request: DataAnakInput):
+    """Cache key for a request, None if it cannot be built (the pipeline will report the error)"""
+    try:
+        return prediction_cache_key(request)
+    except Exception:
+        return None
+
+# Optional micro-batcher for concurrent /predict calls, enabled with PREDICT_MICROBATCH=1
+batcher = MicroBatcher.from_env(predict_rows, runner=inference_pool.run)
+
+async def predict_cached(request: DataAnakInput, timer: Optional[StageTimer] = None) -> PredictionOutputWithMessage:
+    """
+    Prediction for one child through the cache and the micro-batcher or inference pool.
+    With a timer, the stages are marked: "cache", then "batch" for the
+    micro-batcher or "queue" (waiting for a worker) and the worker stages.
+    """
+    key = get_cache_key(request)
+    if key is not None:
+        cached = prediction_cache.get(key)
+        if timer is not None:
+            timer.mark("cache")
+        if cached is not None:
+            return cached
+
+    if batcher is not None:
+        result = await batcher.submit(request)
+        if timer is not None:
+            timer.mark("batch")
+    elif timer is not None:
+        queued = time.perf_counter()
+        result, worker = await inference_pool.run(run_prediction_timed, request)
+        elapsed = time.perf_counter() - queued
+        timer.add("queue", max(0.0, elapsed - sum(seconds for _, seconds in worker.stages)))
+        timer.stages.extend(worker.stages)
+        timer.restart()
+    else:
+        result = await inference_pool.run(run_prediction, request)
+    if key is not None:
+        prediction_cache.put(key, result)
+    return result
+
 # Prediction endpoint
 # used for calculating Z-score and predicting stunting status
 @app.post("/predict", 
@@ -180,10 +649,18 @@ async def recive_form_device(data: DataFromIOT):
                             "example": {"detail": "Internal server error"}
                         }
                     }
+                },
+                503: {
+                    "description": "Inference queue is full",
+                    "content": {
+                        "application/json": {
+                            "example": {"detail": "Server busy: Inference queue is full"}
+                        }
+                    }
                 }
           }
 )
-async def predict_stunting(request: DataAnakInput):
+async def predict_stunting(request: DataAnakInput, response: Response):
     """
     Predict stunting based on input features
     - **tanggal_lahir**: Child's birth date (YYYY-MM-DD format)
@@ -193,54 +670,77 @@ async def predict_stunting(request: DataAnakInput):
     - **berat**: Current weight in kg
     - **tinggi**: Current height in cm  
     Returns prediction result with stunting status and confidence score.
+    Stage durations are recorded for /metrics and, with METRICS_SERVER_TIMING=1,
+    returned in the Server-Timing header.
     """
+    timer = stage_metrics.timer()
     try:
-        # Convert request to PredictionInput
-        data_anak = parse_tanggal_lahir(request.tanggal_lahir)
-        age_in_months = parser_usia_bulan(data_anak.tahun, data_anak.bulan)
-        age = parser_usia_tahun(data_anak.tahun, data_anak.bulan, data_anak.hari)
-        gender = parser_gender(request.jenis_kelamin)
-        zscore_result = calculator.calculate_zscore(
-            age_months=age_in_months,
-            weight_kg=request.berat,
-            height_cm=request.tinggi,
-            sex=gender
-        )
-        
-        if not zscore_result.calculated:
-            raise HTTPException(status_code=400, detail="Error calculating Z-scores")
-        
-        data_anak = PredictionInput(
-            usia=age,
-            jenis_kelamin=request.jenis_kelamin,
-            bb_lahir=request.bb_lahir,
-            tb_lahir=request.tb_lahir,
-            tanggal_lahir=request.tanggal_lahir,
-            berat=request.berat,
-            tinggi=request.tinggi,
-            zs_bbu=zscore_result.bbu,
-            zs_tbu=zscore_result.tbu,
-            zs_bbtb=zscore_result.bbtb
-        )
-
-        # Perform prediction
-        result = prediction.predict(data_anak)
-        logger.info(f"Prediction result: {result}")
-        
-        msg = prediction.penangana_gejalan(
-            result.bbu,
-            result.tbu,
-            result.bbtb
-        )
-        
-        return PredictionOutputWithMessage(
-            data=result,
-            message=msg
-        )
-         
+        result = await predict_cached(request, timer)
+        if timer is not None:
+            stage_metrics.observe(timer)
+            if stage_metrics.server_timing:
+                response.headers["Server-Timing"] = timer.server_timing()
+        return result
+    except PoolRejectedError as e:
+        raise HTTPException(status_code=503, detail=f"Server busy: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+# Batch prediction endpoint
+# runs each model once for the whole batch, errors are reported per row
+@app.post("/predict/batch",
+          response_model=BatchPredictionOutput,
+          summary="Predict stunting status for many children",
+          description="Predict stunting status for a batch of children. Each model is evaluated once for the whole batch and errors are reported per row",
+          responses={
+                200: {
+                    "description": "Batch processed, check each row for its own status",
+                    "model": BatchPredictionOutput
+                },
+                400: {
+                    "description": "Invalid batch",
+                    "content": {
+                        "application/json": {
+                            "example": {"detail": f"Batch size must be between 1 and {MAX_BATCH_SIZE}"}
+                        }
+                    }
+                },
+                503: {
+                    "description": "Inference queue is full",
+                    "content": {
+                        "application/json": {
+                            "example": {"detail": "Server busy: Inference queue is full"}
+                        }
+                    }
+                }
+          }
+)
+async def predict_stunting_batch(request: BatchPredictionInput):
+    """
+    Predict stunting for a batch of children
+    - **data**: List of child data, same fields as `/predict`
+    Returns one result per input row, in the same order as the input.
+    """
+    if not (1 <= len(request.data) <= MAX_BATCH_SIZE):
+        raise HTTPException(status_code=400, detail=f"Batch size must be between 1 and {MAX_BATCH_SIZE}")
+
+    # Serve repeated children from the cache, run the rest in one pass
+    keys = [get_cache_key(row) for row in request.data]
+    results = [prediction_cache.get(key) if key is not None else None for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+
+    if missing:
+        try:
+            computed = await inference_pool.run(predict_rows, [request.data[i] for i in missing])
+        except PoolRejectedError as e:
+            raise HTTPException(status_code=503, detail=f"Server busy: {str(e)}")
+        for i, result in zip(missing, computed):
+            results[i] = result
+            if keys[i] is not None and not isinstance(result, Exception):
+                prediction_cache.put(keys[i], result)
+
+    return build_batch_output(results)
+
 # Get model info
 @app.get("/model/info")
 async def get_model_info():
@@ -252,98 +752,277 @@ async def get_model_info():
         "description": "Model for predicting stunting in children"
     }
 
+# Get inference pool status
+@app.get("/pool/stats")
+async def get_pool_stats():
+    """Get inference worker pool size, queue depth and counters"""
+    return inference_pool.stats()
+
+# Get prediction cache status
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Get prediction cache size and hit/miss/eviction counters"""
+    return prediction_cache.stats()
+
+# Get memory of the server processes
+@app.get("/workers/stats")
+async def get_workers_stats():
+    """Get RSS/PSS/shared/private memory of the master and each worker process"""
+    return memory_report()
+
+# Prometheus metrics
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Per-stage latency histograms of /predict in the Prometheus text format"""
+    return PlainTextResponse(stage_metrics.render(), media_type="text/plain; version=0.0.4")
+
+def check_admin(token: Optional[str]):
+    """Admin endpoints are hidden without ADMIN_TOKEN and need the matching X-Admin-Token header"""
+    if ADMIN_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+# Sampling profiler, switchable at runtime
+@app.post("/admin/profile")
+async def profile_server(
+    seconds: float = Query(10.0, ge=1, le=300, description="How long to sample"),
+    interval_ms: float = Query(10.0, ge=1, le=1000, description="Time between samples"),
+    memory: bool = Query(False, description="Also return the top allocations (tracemalloc)"),
+    top: int = Query(25, ge=1, le=200, description="Number of allocation lines with memory=true"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Sample the stacks of all threads of this worker process for `seconds` and
+    return them in the collapsed-stack format (flamegraph.pl, speedscope).
+    With memory=true the response is JSON with the collapsed stacks and a
+    tracemalloc top-allocations list. Requests keep being served meanwhile.
+    """
+    check_admin(x_admin_token)
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    profiler.interval = interval_ms / 1000
+    try:
+        allocations = await profiler.profile(seconds, trace_memory=memory, top=top)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not memory:
+        return PlainTextResponse(
+            profiler.collapsed(),
+            headers={"Content-Disposition": f'attachment; filename="profile-{os.getpid()}.collapsed"'}
+        )
+    return {
+        "stats": profiler.stats(),
+        "collapsed": profiler.collapsed(),
+        "allocations": allocations
+    }
+
+# Get micro-batcher status
+@app.get("/batcher/stats")
+async def get_batcher_stats():
+    """Get micro-batching metrics: batch sizes, wait time and queue length"""
+    if batcher is None:
+        return {"enabled": False}
+    return batcher.stats()
+
 # Get WebSocket connection status
 @app.get("/ws/status")
 async def get_websocket_status():
-    """Get current WebSocket connection status for all devices"""
-    total_connections = sum(len(connections) for connections in manager.active_connections.values()) if hasattr(manager.active_connections, 'values') else len(manager.active_connections)
-    
+    """
+    Get current WebSocket connection status for all devices.
+    Connection counts come from counters kept by the manager, so the cost
+    does not grow with the number of open sockets.
+    """
+    total_connections = manager.total_connections
+    devices = await device_store.all()
+
     devices_status = {}
-    for device_id, device_data in data_devices.items():
+    for device_id, device_data in devices.items():
         devices_status[device_id] = {
             "data": device_data,
-            "connections": len(manager.active_connections.get(device_id, [])) if hasattr(manager.active_connections, 'get') else 0
+            "connections": manager.device_connections(device_id)
         }
-    
+
     return {
         "total_connections": total_connections,
         "devices": devices_status,
-        "total_devices": len(data_devices),
-        "status": "active" if total_connections > 0 else "no_connections"
+        "total_devices": len(devices),
+        "status": "active" if total_connections > 0 else "no_connections",
+        "broadcast": manager.stats(),
+        "device_channels": device_channels.stats(),
+        "stabilizer": stabilizer.stats()
+    }
+
+# Get per-connection statistics of a device's WebSocket clients
+@app.get("/ws/connections/{device_id}")
+async def get_websocket_connections(device_id: str):
+    """Connected-at time, messages and bytes sent, last send latency and dropped updates per client"""
+    connections = manager.connection_info(device_id)
+    return {
+        "device_id": device_id,
+        "connections": connections,
+        "total_connections": len(connections)
     }
 
 @app.get("/devices")
-async def get_all_devices():
-    """Get all registered devices"""
+async def get_all_devices(since: Optional[float] = None):
+    """Get all devices with data, optionally only those updated since a Unix timestamp"""
+    devices = await device_store.all(since=since)
     return {
-        "devices": data_devices,
-        "total_devices": len(data_devices)
+        "devices": devices,
+        "total_devices": len(devices)
     }
 
 @app.get("/devices/{device_id}")
 async def get_device_data(device_id: str):
     """Get specific device data"""
-    device_data = data_devices.get(device_id)
-    if device_id and device_id in device_register:
+    if device_id and await device_store.is_registered(device_id):
+        device_data = await device_store.get(device_id)
         return {
             "device_id": device_id,
             "data": device_data,
-            "connections": len(manager.active_connections.get(device_id, [])) if hasattr(manager.active_connections, 'get') else 0
+            "connections": manager.device_connections(device_id),
+            "filter": stabilizer.current(device_id),
+            "session": await device_store.get_session(device_id)
         }
     else:
         raise HTTPException(status_code=404, detail=f"Device {device_id} not found")
 
+@app.get("/devices/{device_id}/history")
+async def get_device_history(
+    device_id: str,
+    start: Optional[float] = Query(None, alias="from", description="Unix timestamp, inclusive"),
+    end: Optional[float] = Query(None, alias="to", description="Unix timestamp, inclusive"),
+    max_points: Optional[int] = Query(None, ge=1, le=10000, description="Average into at most this many time buckets")
+):
+    """Get tb/bb measurements of a device in a time range, as columns ordered by time"""
+    return await history.query(device_id, start=start, end=end, max_points=max_points)
+
+def device_snapshot(device_id: str, device_data: Optional[dict]) -> dict:
+    """Data of a device from the device store in the format sent to /ws/data clients"""
+    if device_data is not None:
+        return {
+            "did": device_id,
+            "tb": device_data["tb"],
+            "bb": device_data["bb"],
+            "timestamp": asyncio.get_event_loop().time(),
+            "status": device_data["status"],
+            "last_updated": device_data["last_updated"]
+        }
+    return {
+        "did": device_id,
+        "tb": 0,
+        "bb": 0,
+        "timestamp": asyncio.get_event_loop().time(),
+        "status": "no_data",
+        "message": f"No data available for device {device_id}"
+    }
+
+def heartbeat_message(device_id: str) -> dict:
+    """Keep-alive pushed to /ws/data clients of a device without recent updates"""
+    return {
+        "did": device_id,
+        "timestamp": asyncio.get_event_loop().time(),
+        "status": "heartbeat"
+    }
+
 # fetch data from IOT device (data_device) using websocket
 @app.websocket("/ws/data/{device_id}")
 async def websocket_data(websocket: WebSocket, device_id: str):
-    """WebSocket endpoint to fetch data from specific IOT device"""
+    """
+    WebSocket endpoint to fetch data from specific IOT device.
+    Sends the current data on connect, then every update published by
+    /recive and /reset as it happens, plus the heartbeat (WS_HEARTBEAT_SECONDS).
+    """
     await manager.connect(websocket, device_id)
     try:
-        while True:
-            
-            # Check if websocket is still connected
-            if websocket.client_state != WebSocketState.CONNECTED:
-                break
-                
-            # Send current device data if exists
-            if device_id in data_devices:
-                device_data = data_devices[device_id]
-                data_with_timestamp = {
-                    "did": device_id,
-                    "tb": device_data["tb"],
-                    "bb": device_data["bb"],
-                    "timestamp": asyncio.get_event_loop().time(),
-                    "status": device_data["status"],
-                    "last_updated": device_data["last_updated"]
-                }
-            else:
-                data_with_timestamp = {
-                    "did": device_id,
-                    "tb": 0,
-                    "bb": 0,
-                    "timestamp": asyncio.get_event_loop().time(),
-                    "status": "no_data",
-                    "message": f"No data available for device {device_id}"
-                }
-            
-            await manager.send_personal_message(data_with_timestamp, websocket)
-            await asyncio.sleep(5)  # Send every 5 seconds
-            
+        await manager.send_personal_message(device_snapshot(device_id, await device_store.get(device_id)), websocket)
+        await manager.stream(websocket)
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
-        logger.info(f"Client disconnected from device {device_id}")
+        pass
     except Exception as e:
-        logger.error(f"WebSocket error for device {device_id}: {e}")
+        logger.error("WebSocket error for device %s: %s", device_id, e)
+    finally:
         manager.disconnect(websocket)
+        logger.info("Client disconnected from device %s", device_id)
+
+# Measurements from an IOT device over one long-lived connection
+@app.websocket("/ws/device/{did}")
+async def websocket_device(websocket: WebSocket, did: str, raw: bool = False):
+    """
+    WebSocket endpoint for IOT devices.
+    The device sends {"tb", "bb", "ts"?, "id"?} messages; each one is handled
+    like POST /recive and acknowledged with {"ack": id} when an id is given.
+    With ?raw=1 the device streams raw {"tb"?, "bb"?, "ts"?} readings instead;
+    they are smoothed on the server and {"settled": {"tb", "bb"}} is sent back
+    once the measurement is stable.
+    The server pushes {"command": "trigger" | "reset"} down the same socket
+    when /trigger/{did} or /reset/{did} is called.
+    """
+    await device_channels.connect(websocket, did)
+    try:
+        while True:
+            text = await websocket.receive_text()
+            if raw:
+                try:
+                    raw_reading = RawReading.model_validate_json(text)
+                except ValidationError as e:
+                    device_channels.invalid += 1
+                    await websocket.send_json({"error": "Invalid reading", "detail": e.errors(include_url=False, include_context=False, include_input=False)})
+                    continue
+                device_channels.received += 1
+                try:
+                    settled = await record_raw_reading(did, raw_reading)
+                except MissingChannelError as e:
+                    await websocket.send_json({"error": "Missing reading", "detail": str(e)})
+                    continue
+                if settled is not None:
+                    await websocket.send_json({"settled": {"tb": settled[0], "bb": settled[1]}})
+                continue
+            try:
+                reading = DeviceReading.model_validate_json(text)
+            except ValidationError as e:
+                device_channels.invalid += 1
+                await websocket.send_json({"error": "Invalid measurement", "detail": e.errors(include_url=False, include_context=False, include_input=False)})
+                continue
+            device_channels.received += 1
+            await record_measurement(did, reading.tb, reading.bb, reading.ts, source="iot_device_ws")
+            if reading.id is not None:
+                await websocket.send_json({"ack": reading.id})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error("Device WebSocket error for %s: %s", did, e)
+    finally:
+        await device_channels.disconnect(websocket, did)
 
 # Run the app
 if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",  # Allow access from all network interfaces
-        port=5000,
-        reload=False,
-        workers=1,  # Number of worker processes
-        access_log=True,  # Enable access logging
-        log_level="info"  # Set log level
-    )
\ No newline at end of file
+    port = int(os.getenv("PORT", "5000"))
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    if workers > 1:
+        # Load models once in this process and fork workers that share them
+        # copy-on-write (see lib/main/prefork.py). PREFORK_PRELOAD=0 lets each
+        # worker load its own copy in the lifespan instead
+        preload = os.getenv("PREFORK_PRELOAD", "1").lower() in ("1", "true", "yes")
+        PreforkServer(
+            app,
+            host="0.0.0.0",
+            port=port,
+            workers=workers,
+            preload=warm_up if preload else None,
+            access_log=True,
+            log_level="info",
+            log_config=None  # Keep the logging set up by setup_logging()
+        ).run()
+    else:
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",  # Allow access from all network interfaces
+            port=port,
+            reload=False,
+            workers=1,  # Number of worker processes
+            access_log=True,  # Enable access logging
+            log_level="info",  # Set log level
+            log_config=None  # Keep the logging set up by setup_logging()
+        )
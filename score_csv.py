@@ -0,0 +1,59 @@
+"""Scoring massal file CSV tanpa lewat HTTP /predict.
+
+Input berformat seperti stunting/data-stunting.csv (kolom Jenis Kelamin,
+BB lahir, TB lahir, Usia "X Tahun - Y Bulan - Z Hari", Berat, Tinggi).
+File dibaca per potongan, usia dan Z-score dihitung secara vektor, lalu
+ketiga model dipanggil sekali per potongan. Output berisi semua kolom input
+ditambah usia, Z-score, prediksi TB/U, BB/U, BB/TB, rekomendasi dan error.
+
+Jalankan:
+    python score_csv.py stunting/data-stunting.csv -o hasil.csv
+    python score_csv.py data.csv -o hasil.parquet --chunksize 100000 --workers 0
+
+Output Parquet membutuhkan pyarrow. --workers 0 memakai semua core.
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+from lib.prediction.bulk import score_csv, OUTPUT_FORMATS
+from lib.prediction.prediction import BACKENDS
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Scoring massal file CSV data anak")
+    p.add_argument("input", help="File CSV input")
+    p.add_argument("-o", "--output", help="File output .csv atau .parquet (default: <input>-scored.csv)")
+    p.add_argument("--format", choices=OUTPUT_FORMATS, help="Format output (default: dari ekstensi output)")
+    p.add_argument("--chunksize", type=int, default=50000, help="Jumlah baris per potongan")
+    p.add_argument("--workers", type=int, default=1, help="Jumlah proses (0 = semua core)")
+    p.add_argument("--backend", choices=BACKENDS, default="inplace", help="Backend evaluasi model")
+    p.add_argument("--sep", default=",", help="Pemisah kolom CSV input")
+    p.add_argument("--quiet", action="store_true", help="Jangan tampilkan progres per potongan")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format="%(message)s", force=True)
+    input_path = Path(args.input)
+    output_path = Path(args.output) if args.output else input_path.with_name(f"{input_path.stem}-scored.csv")
+
+    stats = score_csv(
+        input_path, output_path,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        backend=args.backend,
+        output_format=args.format,
+        sep=args.sep
+    )
+    rate = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    print(json.dumps({**stats, "output": str(output_path), "rows_per_second": round(rate)}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Cek MicroBatcher (lib/main/batcher.py): stop() saat banyak request masih
+menunggu tidak boleh membuat caller menggantung. Setiap item mendapat hasil
+atau RuntimeError("Micro-batcher stopped").
+
+    python -m pytest test/batcher_test.py
+"""
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.main.batcher import MicroBatcher  # noqa: E402
+
+
+def slow_handler(items):
+    time.sleep(0.01)
+    return [item * 2 for item in items]
+
+
+async def run_thread(handler, items):
+    return await asyncio.to_thread(handler, items)
+
+
+async def stop_under_load(max_batch_size, max_wait_ms, n=500):
+    batcher = MicroBatcher(slow_handler, runner=run_thread, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    batcher.start()
+    tasks = [asyncio.create_task(batcher.submit(i)) for i in range(n)]
+    # Beri waktu collector mengambil sebagian item dari queue
+    await asyncio.sleep(0.02)
+    await batcher.stop()
+    # Semua caller harus selesai tanpa menunggu timeout
+    results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 2)
+    for i, result in enumerate(results):
+        if isinstance(result, Exception):
+            assert isinstance(result, RuntimeError) and "stopped" in str(result), result
+        else:
+            assert result == i * 2
+    return results
+
+
+def test_stop_while_collecting_dispatches_taken_items():
+    # Collector masih menunggu max_wait_ms dengan item di batch lokalnya saat stop()
+    results = asyncio.run(stop_under_load(max_batch_size=10000, max_wait_ms=5000))
+    assert all(not isinstance(result, Exception) for result in results)
+
+
+def test_stop_under_load():
+    results = asyncio.run(stop_under_load(max_batch_size=8, max_wait_ms=1))
+    assert any(not isinstance(result, Exception) for result in results)
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,46 @@
+"""
+Cek prediction_cache_key (lib/prediction/cache.py): input yang berbeda harus
+mendapat key berbeda, sehingga hit cache tidak pernah mengubah response.
+
+    python -m pytest test/cache_test.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.prediction.cache import PredictionCache, prediction_cache_key  # noqa: E402
+from lib.prediction.models import DataAnakInput  # noqa: E402
+
+
+def anak(**changes):
+    data = dict(nama="Budi", jenis_kelamin="L", bb_lahir=3.2, tb_lahir=50.0,
+                tanggal_lahir="2023-05-01", berat=12.5, tinggi=87.0)
+    data.update(changes)
+    return DataAnakInput(**data)
+
+
+@pytest.mark.parametrize("changes", [
+    {"jenis_kelamin": "l"},
+    {"jenis_kelamin": " L"},
+    {"jenis_kelamin": "L "},
+    {"berat": 12.501},
+    {"tinggi": 87.004},
+    {"bb_lahir": 3.2049},
+    {"tb_lahir": 50.001},
+])
+def test_different_input_different_key(changes):
+    assert prediction_cache_key(anak(**changes)) != prediction_cache_key(anak())
+
+
+def test_invalid_gender_not_served_from_cache():
+    cache = PredictionCache(max_size=8, ttl=None)
+    cache.put(prediction_cache_key(anak()), "hasil L")
+    assert cache.get(prediction_cache_key(anak(jenis_kelamin="l"))) is None
+    assert cache.get(prediction_cache_key(anak(nama="Ani"))) == "hasil L"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
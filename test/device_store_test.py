@@ -0,0 +1,164 @@
+"""
+Cek SQLiteDeviceStore (lib/main/device_store.py) dengan dua instance pada
+file database yang sama, seperti dua worker prefork atau server yang restart:
+- tulisan yang masih di buffer tetap ditulis saat close()
+- instance lain melihat data setelah flush (interval atau batch_size)
+- session dan pesan relay bisa dibaca dan diambil dari instance lain
+
+    python -m pytest test/device_store_test.py
+"""
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.main.device_store import SQLiteDeviceStore  # noqa: E402
+
+
+def device(tb, bb, last_updated=1000.0):
+    return {"tb": tb, "bb": bb, "status": "updated", "last_updated": last_updated, "triggered": False}
+
+
+async def open_store(path, **kwargs):
+    store = SQLiteDeviceStore(str(path), **kwargs)
+    await store.start()
+    return store
+
+
+def test_close_flushes_buffered_writes(tmp_path):
+    path = tmp_path / "devices.db"
+
+    async def write():
+        # Interval panjang: tanpa close() tidak ada yang ditulis ke database
+        store = await open_store(path, flush_interval=3600)
+        await store.set("A", device(85.0, 12.0))
+        await store.set_many({f"D{i}": device(80.0 + i, 10.0 + i) for i in range(50)})
+        await store.update("A", triggered=True)
+        await store.delete("D0")
+        assert store.stats()["pending"] == 51
+        await store.close()
+
+    async def read():
+        store = await open_store(path)
+        try:
+            return await store.get("A"), await store.get("D0"), await store.all()
+        finally:
+            await store.close()
+
+    asyncio.run(write())
+    a, d0, devices = asyncio.run(read())
+    assert a == {**device(85.0, 12.0), "triggered": True}
+    assert d0 is None
+    assert len(devices) == 50
+    assert devices["D49"] == device(129.0, 59.0)
+
+
+def test_other_instance_reads_after_flush(tmp_path):
+    async def run():
+        writer = await open_store(tmp_path / "devices.db", flush_interval=3600, batch_size=100)
+        reader = await open_store(tmp_path / "devices.db")
+        try:
+            await writer.set("A", device(85.0, 12.0))
+            # Instance sendiri langsung melihat perubahannya, instance lain setelah flush
+            assert await writer.get("A") == device(85.0, 12.0)
+            assert await reader.get("A") is None
+            await writer.flush()
+            assert await reader.get("A") == device(85.0, 12.0)
+
+            # batch_size tulisan yang tertunda memicu flush tanpa menunggu interval
+            await writer.set_many({f"D{i}": device(80.0, 10.0, last_updated=2000.0 + i) for i in range(100)})
+            for _ in range(100):
+                if writer.stats()["pending"] == 0:
+                    break
+                await asyncio.sleep(0.01)
+            assert len(await reader.all(since=2000.0)) == 100
+            assert len(await reader.all(since=2090.0)) == 10
+        finally:
+            await writer.close()
+            await reader.close()
+
+    asyncio.run(run())
+
+
+def test_sessions_across_instances(tmp_path):
+    async def run():
+        a = await open_store(tmp_path / "devices.db")
+        b = await open_store(tmp_path / "devices.db")
+        try:
+            profile = {"nama": "Budi", "jenis_kelamin": "L", "bb_lahir": 3.2, "tb_lahir": 50.0, "tanggal_lahir": "2023-05-01"}
+            await a.bind_session("IOT_1", profile, time.time() + 60)
+            await a.bind_session("IOT_2", profile, time.time() - 1)
+            assert await b.get_session("IOT_1") == profile
+            # Hanya satu instance yang bisa mengambil session
+            assert await b.take_session("IOT_1") == profile
+            assert await a.take_session("IOT_1") is None
+            # Session kedaluwarsa tidak dipakai
+            assert await b.get_session("IOT_2") is None
+            assert await b.take_session("IOT_2") is None
+
+            await a.register(["IOT_1", "IOT_3"])
+            assert await b.is_registered("IOT_3")
+            assert not await b.is_registered("IOT_4")
+        finally:
+            await a.close()
+            await b.close()
+
+    asyncio.run(run())
+
+
+def test_relayed_messages_across_instances(tmp_path):
+    async def run():
+        a = await open_store(tmp_path / "devices.db")
+        b = await open_store(tmp_path / "devices.db")
+        try:
+            await a.claim_channel("IOT_1", "worker-a")
+            assert await b.channel_owner("IOT_1") == "worker-a"
+            for n in range(3):
+                await b.relay("IOT_1", "worker-a", {"command": "trigger", "n": n})
+            assert await b.take_relayed("worker-b") == []
+            assert await a.take_relayed("worker-a") == [("IOT_1", {"command": "trigger", "n": n}) for n in range(3)]
+            assert await a.take_relayed("worker-a") == []
+
+            # Device pindah ke worker lain: pesan yang belum diambil ikut pindah
+            await b.relay("IOT_1", "worker-a", {"command": "reset"})
+            await b.claim_channel("IOT_1", "worker-b")
+            assert await a.take_relayed("worker-a") == []
+            assert await b.take_relayed("worker-b") == [("IOT_1", {"command": "reset"})]
+
+            # Release oleh pemilik lama tidak menghapus pemilik baru
+            await a.release_channel("IOT_1", "worker-a")
+            assert await a.channel_owner("IOT_1") == "worker-b"
+            await b.release_channel("IOT_1", "worker-b")
+            assert await a.channel_owner("IOT_1") is None
+        finally:
+            await a.close()
+            await b.close()
+
+    asyncio.run(run())
+
+
+def test_restart_keeps_sessions_and_relayed_messages(tmp_path):
+    path = tmp_path / "devices.db"
+
+    async def before():
+        store = await open_store(path)
+        await store.bind_session("IOT_1", {"nama": "Ani"}, time.time() + 60)
+        await store.relay("IOT_1", "worker-a", {"command": "trigger"})
+        await store.close()
+
+    async def after():
+        store = await open_store(path)
+        try:
+            return await store.take_session("IOT_1"), await store.take_relayed("worker-a")
+        finally:
+            await store.close()
+
+    asyncio.run(before())
+    assert asyncio.run(after()) == ({"nama": "Ani"}, [("IOT_1", {"command": "trigger"})])
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,54 @@
+"""
+Cek MeasurementHistory (lib/main/history.py): device id seperti ".." atau
+"../x" tidak boleh menulis di luar HISTORY_DIR, dan setiap device tetap
+membaca datanya sendiri dari disk.
+
+    python -m pytest test/history_test.py
+"""
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.main.history import MeasurementHistory  # noqa: E402
+
+DEVICE_IDS = ["..", ".", "...", "../escape", "a/../..", "", "a.b", "a%2Eb", "%", "normal"]
+
+
+@pytest.mark.parametrize("did", DEVICE_IDS)
+def test_device_dir_stays_inside_directory(tmp_path, did):
+    history = MeasurementHistory(directory=str(tmp_path / "history"))
+    device_dir = history._device_dir(did).resolve()
+    assert device_dir.parent == (tmp_path / "history").resolve()
+
+
+def test_device_ids_written_and_read_separately(tmp_path):
+    directory = tmp_path / "history"
+
+    async def write():
+        history = MeasurementHistory(directory=str(directory), flush_interval=3600)
+        history.start()
+        for i, did in enumerate(DEVICE_IDS):
+            history.append(did, 1000.0 + i, 80.0 + i, 10.0 + i)
+        await history.close()
+
+    async def read():
+        # Instance baru: ring kosong, semua data dari file
+        history = MeasurementHistory(directory=str(directory))
+        return [await history.query(did) for did in DEVICE_IDS]
+
+    asyncio.run(write())
+    results = asyncio.run(read())
+    for i, result in enumerate(results):
+        assert result["ts"] == [1000.0 + i]
+        assert result["tb"] == [80.0 + i]
+    # Tidak ada file di luar directory
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["history"]
+    assert len(list(directory.iterdir())) == len(DEVICE_IDS)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,94 @@
+"""
+Bandingkan backend prediksi (lib/prediction/native.py dan prediction.py)
+pada semua baris anak usia 1-5 tahun di stunting/data-stunting.csv:
+- sklearn : XGBClassifier.predict
+- inplace : Booster.inplace_predict
+- native  : NativeTreeModel (models/model_*.npz dan kompilasi langsung dari booster)
+Kelas dan margin harus sama persis, tanpa toleransi.
+
+    python -m pytest test/native_test.py
+"""
+import sys
+import csv
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+pytest.importorskip("xgboost")
+joblib = pytest.importorskip("joblib")
+
+from lib.prediction import Prediction, PredictionInput  # noqa: E402
+from lib.prediction import parser_usia_from_string, parser_usia_tahun  # noqa: E402
+from lib.prediction.native import NativeTreeModel  # noqa: E402
+from lib.prediction.prediction import MODEL_NAMES, MODELS_DIR  # noqa: E402
+
+FIXTURE_CSV = ROOT / "stunting" / "data-stunting.csv"
+
+
+@pytest.fixture(scope="module")
+def fixture_rows():
+    """PredictionInput untuk setiap anak usia 1-5 tahun (batas validasi Prediction)"""
+    rows = []
+    with open(FIXTURE_CSV, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            usia = parser_usia_from_string(row["Usia"])
+            if not 1 <= usia.tahun < 5:
+                continue
+            rows.append(PredictionInput(
+                usia=parser_usia_tahun(usia.tahun, usia.bulan, usia.hari), jenis_kelamin=row["Jenis Kelamin"],
+                bb_lahir=float(row["BB lahir"]), tb_lahir=float(row["TB lahir"]), tanggal_lahir="",
+                berat=float(row["Berat"]), tinggi=float(row["Tinggi"]), zs_bbu=float(row["ZS BB/U"]),
+                zs_tbu=float(row["ZS TB/U"]), zs_bbtb=float(row["ZS BB/TB"])
+            ))
+    assert len(rows) > 500
+    return rows
+
+
+@pytest.fixture(scope="module")
+def features(fixture_rows):
+    """Matriks fitur N x 9 dengan urutan kolom yang sama seperti Prediction"""
+    encoders = joblib.load(MODELS_DIR / "encoders.pkl")
+    gender = encoders['gender'].transform([row.jenis_kelamin for row in fixture_rows])
+    return np.array([
+        [gender[n], row.bb_lahir, row.tb_lahir, row.usia, row.berat, row.tinggi, row.zs_bbu, row.zs_tbu, row.zs_bbtb]
+        for n, row in enumerate(fixture_rows)
+    ], dtype=float)
+
+
+@pytest.mark.parametrize("name", MODEL_NAMES)
+def test_backends_equal_on_fixture(name, features):
+    model = joblib.load(MODELS_DIR / f"model_{name}.pkl")
+    booster = model.get_booster()
+    best_iteration = booster.attr("best_iteration")
+    iteration_range = (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+    exported = NativeTreeModel.load(MODELS_DIR / f"model_{name}.npz")
+    compiled = NativeTreeModel.from_booster(booster)
+
+    expected = model.predict(features)
+    np.testing.assert_array_equal(np.argmax(booster.inplace_predict(features, iteration_range=iteration_range), axis=1), expected)
+    margin = booster.inplace_predict(features, iteration_range=iteration_range, predict_type="margin")
+    for native in (exported, compiled):
+        np.testing.assert_array_equal(native.predict(features), expected)
+        np.testing.assert_array_equal(native.predict_margin(features), margin)
+        # Satu baris per panggilan (jalur /predict)
+        np.testing.assert_array_equal(np.concatenate([native.predict(features[i:i + 1]) for i in range(len(features))]), expected)
+
+
+def test_prediction_backends_equal(fixture_rows):
+    results = {}
+    for backend in ("sklearn", "inplace", "native"):
+        predictor = Prediction(backend)
+        # Batch kecil memakai NativeTreeModel, batch besar inplace_predict
+        small = [result for i in range(0, len(fixture_rows), 8) for result in predictor.predict_batch(fixture_rows[i:i + 8])]
+        results[backend] = [result.model_dump() for result in small]
+        assert [result.model_dump() for result in predictor.predict_batch(fixture_rows)] == results[backend]
+    assert results["inplace"] == results["sklearn"]
+    assert results["native"] == results["sklearn"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
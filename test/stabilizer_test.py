@@ -0,0 +1,104 @@
+"""
+Cek ReadingStabilizer (lib/main/smoothing.py) tanpa server:
+anak naik ke timbangan -> satu hasil stabil, anak turun -> tidak ada hasil (0, 0),
+device yang hanya mengirim satu sensor ditolak, dan jumlah device dibatasi.
+
+    python test/stabilizer_test.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.main.smoothing import ReadingStabilizer, MissingChannelError
+
+
+def feed(stabilizer, did, start, seconds, tb, bb, rate=10):
+    """Kirim pembacaan tb/bb konstan selama `seconds` detik, kembalikan hasil stabil yang keluar"""
+    emitted = []
+    for i in range(int(seconds * rate)):
+        settled = stabilizer.add(did, start + i / rate, tb, bb)
+        if settled is not None:
+            emitted.append(settled)
+    return emitted
+
+
+def test_child_on_scale_settles_once():
+    stabilizer = ReadingStabilizer()
+    emitted = feed(stabilizer, "IOT_TEST", 0.0, 10, 85.0, 12.0)
+    assert emitted == [(85.0, 12.0)], emitted
+
+
+def test_child_leaves_scale_no_emit():
+    stabilizer = ReadingStabilizer()
+    feed(stabilizer, "IOT_TEST", 0.0, 10, 85.0, 12.0)
+    # Timbangan kosong selama 60 detik: EMA turun mendekati 0 tetapi tidak boleh dianggap stabil
+    emitted = feed(stabilizer, "IOT_TEST", 10.0, 60, 0.0, 0.0)
+    assert emitted == [], emitted
+    assert not stabilizer.current("IOT_TEST")["bb_stable"]
+
+
+def test_next_child_settles_after_empty_scale():
+    stabilizer = ReadingStabilizer()
+    feed(stabilizer, "IOT_TEST", 0.0, 10, 85.0, 12.0)
+    feed(stabilizer, "IOT_TEST", 10.0, 20, 0.0, 0.0)
+    emitted = feed(stabilizer, "IOT_TEST", 30.0, 10, 92.5, 13.4)
+    assert emitted == [(92.5, 13.4)], emitted
+
+
+def test_separate_tb_and_bb_messages_settle():
+    stabilizer = ReadingStabilizer()
+    emitted = []
+    for i in range(100):
+        # Sensor tb dan bb dikirim bergantian dalam pesan terpisah
+        tb, bb = (85.0, None) if i % 2 == 0 else (None, 12.0)
+        settled = stabilizer.add("IOT_TEST", i / 10, tb, bb)
+        if settled is not None:
+            emitted.append(settled)
+    assert emitted == [(85.0, 12.0)], emitted
+
+
+def test_bb_only_device_rejected():
+    stabilizer = ReadingStabilizer()
+    # Belum stabil: masih menunggu (202), belum ditolak
+    assert feed(stabilizer, "IOT_BB", 0.0, 3, None, 12.0) == []
+    try:
+        feed(stabilizer, "IOT_BB", 3.0, 5, None, 12.0)
+    except MissingChannelError as e:
+        assert "no tb" in str(e)
+    else:
+        raise AssertionError("bb-only device was not rejected")
+
+
+def test_stale_channel_not_settled():
+    stabilizer = ReadingStabilizer()
+    feed(stabilizer, "IOT_TEST", 0.0, 10, 85.0, 12.0)
+    feed(stabilizer, "IOT_TEST", 10.0, 10, 0.0, 0.0)
+    # Sensor tb berhenti mengirim: anak berikutnya tidak boleh memakai tb lama
+    try:
+        emitted = feed(stabilizer, "IOT_TEST", 20.0, 10, None, 13.4)
+    except MissingChannelError:
+        pass
+    else:
+        raise AssertionError(f"stale tb was not rejected, emitted {emitted}")
+
+
+def test_max_devices_drops_least_recent():
+    stabilizer = ReadingStabilizer(max_devices=2)
+    stabilizer.add("A", 0.0, 85.0, 12.0)
+    stabilizer.add("B", 0.0, 85.0, 12.0)
+    stabilizer.add("A", 0.1, 85.0, 12.0)
+    stabilizer.add("C", 0.2, 85.0, 12.0)
+    assert stabilizer.current("B") is None
+    assert stabilizer.current("A") is not None and stabilizer.current("C") is not None
+    assert stabilizer.stats()["devices"] == 2
+    assert stabilizer.stats()["evicted"] == 1
+
+
+if __name__ == "__main__":
+    for test in (test_child_on_scale_settles_once, test_child_leaves_scale_no_emit,
+                 test_next_child_settles_after_empty_scale, test_separate_tb_and_bb_messages_settle,
+                 test_bb_only_device_rejected, test_stale_channel_not_settled,
+                 test_max_devices_drops_least_recent):
+        test()
+        print(f"✅ {test.__name__}")
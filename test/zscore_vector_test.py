@@ -0,0 +1,113 @@
+"""
+Bandingkan VectorZScoreCalculator (lib/prediction/zscore_vector.py) dengan
+pygrowup2 Observation, library yang di-pin di requirements.txt, di seluruh
+rentang input: usia 0-228 bulan, tinggi 9-205 cm, berat 0.5-130 kg, kedua
+jenis kelamin. Hasil harus sama persis (2 desimal), termasuk input yang
+ditolak pygrowup2 (NaN di sisi vektor).
+
+    python -m pytest test/zscore_vector_test.py
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("pygrowup.tables.by_day", reason="pygrowup2 (requirements.txt) is not installed")
+from pygrowup import Observation  # noqa: E402
+
+from lib.prediction.zscore_vector import VectorZScoreCalculator  # noqa: E402
+
+
+def reference(age_months, weight_kg, height_cm, sex):
+    """Z-score pygrowup2 dengan panggilan yang sama seperti fallback ZScoreCalculator; None jika ditolak"""
+    try:
+        obs = Observation(sex=Observation.MALE if sex == 'L' else Observation.FEMALE, age_in_months=age_months)
+        return (
+            float(obs.weight_for_age(weight_kg)),
+            float(obs.length_or_height_for_age(height_cm)),
+            float(obs.weight_for_height(weight_kg, height_cm))
+        )
+    except Exception:
+        return None
+
+
+def vector_rows(calculator, ages, weights, heights, sexes):
+    zscores = calculator.calculate_zscores(ages, weights, heights, sexes)
+    rows = []
+    for bbu, tbu, bbtb in zip(zscores["bbu"], zscores["tbu"], zscores["bbtb"]):
+        rows.append(None if not np.isfinite([bbu, tbu, bbtb]).all() else (float(bbu), float(tbu), float(bbtb)))
+    return rows
+
+
+def full_range_inputs(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    # Usia bulan bulat (seperti parse_tanggal_lahir) dan pecahan, termasuk 0 dan > 60 bulan
+    ages = np.where(rng.random(n) < 0.7, rng.integers(0, 229, n), np.round(rng.uniform(-0.05, 228.5, n), 3))
+    # Sebagian besar di rentang BB/TB (65-120 cm), sisanya di seluruh rentang TB/U dan di luarnya
+    heights = np.where(rng.random(n) < 0.75, rng.uniform(60, 125, n), rng.uniform(9, 205, n))
+    heights = [round(h, int(d)) for h, d in zip(heights, rng.integers(0, 3, n))]
+    # Berat sesuai tinggi agar sebagian besar baris valid, plus nilai ekstrem
+    weights = np.where(rng.random(n) < 0.8, np.square(heights) * rng.uniform(0.0008, 0.0025, n), rng.uniform(0.5, 130, n))
+    weights = [round(w, int(d)) for w, d in zip(weights, rng.integers(1, 3, n))]
+    sexes = rng.choice(['L', 'P'], n)
+    return ages.tolist(), weights, heights, sexes.tolist()
+
+
+def assert_same_as_pygrowup(calculator, ages, weights, heights, sexes):
+    expected = [reference(*row) for row in zip(ages, weights, heights, sexes)]
+    actual = vector_rows(calculator, ages, weights, heights, sexes)
+    mismatches = [(row, e, a) for row, e, a in zip(zip(ages, weights, heights, sexes), expected, actual) if e != a]
+    assert not mismatches, f"{len(mismatches)} rows differ, e.g. {mismatches[:5]}"
+    return expected
+
+
+def test_matches_pygrowup_full_range():
+    ages, weights, heights, sexes = full_range_inputs()
+    expected = assert_same_as_pygrowup(VectorZScoreCalculator(), ages, weights, heights, sexes)
+    # Rentang acak harus mencakup baris valid dan baris yang ditolak
+    assert sum(e is not None for e in expected) > 5000
+    assert sum(e is None for e in expected) > 2000
+
+
+def test_matches_pygrowup_edges():
+    ages, weights, heights, sexes = [], [], [], []
+    for sex in ('L', 'P'):
+        for age in (0, 0.01, 1, 23, 24, 60, 61, 120, 121, 228, 229):
+            for height in (9.9, 10, 64.94, 64.95, 65, 65.05, 85.25, 85.35, 119.95, 120, 120.05, 200, 200.1):
+                for weight in (0.9, 1, 2.5, 12.0, 40, 125, 125.1):
+                    ages.append(age)
+                    weights.append(weight)
+                    heights.append(height)
+                    sexes.append(sex)
+    assert_same_as_pygrowup(VectorZScoreCalculator(), ages, weights, heights, sexes)
+
+
+def test_grid_matches_tables():
+    """LMSGrid (usia bulan bulat 0-60, setiap tinggi 0.1 cm) sama dengan jalur tabel"""
+    months = np.arange(0, 61, dtype=float)
+    heights = np.round(np.arange(600, 1260) / 10, 1)
+    ages, hs = (a.ravel() for a in np.meshgrid(months, heights))
+    weights = np.round(np.random.default_rng(1).uniform(0.5, 40, ages.size), 1)
+    tables = VectorZScoreCalculator(use_grid=False)
+    grid = VectorZScoreCalculator(use_grid=True)
+    assert grid.grid.lms(ages, hs, np.ones(ages.size, dtype=bool)) is not None
+    for sex in ('L', 'P'):
+        sexes = np.full(ages.size, sex)
+        expected = tables.calculate_zscores(ages, weights, hs, sexes)
+        actual = grid.calculate_zscores(ages, weights, hs, sexes)
+        for key in expected:
+            np.testing.assert_array_equal(actual[key], expected[key])
+
+
+def test_grid_falls_back_outside_grid():
+    grid = VectorZScoreCalculator(use_grid=True)
+    ages = np.array([12.5, 61, 24])
+    assert grid.grid.lms(ages, np.array([80.0, 90.0, 85.0]), np.ones(3, dtype=bool)) is None
+    assert_same_as_pygrowup(grid, ages.tolist(), [10.0, 18.0, 12.0], [80.05, 110.0, 85.3], ['L', 'P', 'L'])
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))